@@ -0,0 +1,17 @@
+# ASGI 프로파일의 gunicorn 설정 (uvicorn 워커)
+# gunicorn -c /code/config/gunicorn/asgi.py educa.asgi:application
+import multiprocessing
+
+bind = '0.0.0.0:8000'
+chdir = '/code/educa/'
+worker_class = 'uvicorn.workers.UvicornWorker'
+# 워커마다 이벤트 루프 하나로 많은 연결을 처리하므로 CPU 코어 수만큼 실행
+workers = multiprocessing.cpu_count()
+# 메모리 누수에 대비하여 일정 요청마다 워커를 다시 시작
+max_requests = 10000
+max_requests_jitter = 1000
+# WebSocket 연결이 종료될 때까지 기다리는 시간
+graceful_timeout = 30
+timeout = 60
+keepalive = 5
+accesslog = '-'
@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import CourseDailyStats
+
+# Register your models here.
+
+# rollup_analytics 명령으로 집계한 값이므로 읽기만 한다.
+@admin.register(CourseDailyStats)
+class CourseDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['course','date','students','modules','contents','messages','chatters']
+    list_filter = ['date']
+    search_fields = ['course__title']
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
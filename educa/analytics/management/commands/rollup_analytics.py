@@ -0,0 +1,16 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from analytics.rollup import rollup
+
+# 강사 대시보드의 강좌 통계를 집계 (cron 등으로 주기적으로 실행)
+class Command(BaseCommand):
+    help = 'Aggregate daily course statistics for the instructor dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=datetime.date.fromisoformat, help='Aggregate up to this date (YYYY-MM-DD) instead of today')
+
+    def handle(self, *args, **options):
+        days = rollup(options['date'])
+        self.stdout.write(f'Aggregated {days[0]} - {days[-1]}')
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.4 on 2026-10-18 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('courses', '0013_content_progress_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('students', models.PositiveIntegerField(default=0)),
+                ('modules', models.PositiveIntegerField(default=0)),
+                ('contents', models.PositiveIntegerField(default=0)),
+                ('messages', models.PositiveIntegerField(default=0)),
+                ('chatters', models.PositiveIntegerField(default=0)),
+                ('module_contents', models.JSONField(default=list)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='courses.course')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('course', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import models
+
+from courses.models import Course
+
+# Create your models here.
+
+# 강좌의 하루 통계 (analytics.rollup 에서 집계)
+# students, modules, contents - 그날 마지막으로 집계했을 때의 값
+# messages, chatters - 그날 보낸 채팅 메시지 수와 메시지를 보낸 사용자 수
+# module_contents - 모듈 순서대로 [모듈 id, 제목, 콘텐츠 수] 목록
+class CourseDailyStats(models.Model):
+    course = models.ForeignKey(Course, related_name='daily_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    students = models.PositiveIntegerField(default=0)
+    modules = models.PositiveIntegerField(default=0)
+    contents = models.PositiveIntegerField(default=0)
+    messages = models.PositiveIntegerField(default=0)
+    chatters = models.PositiveIntegerField(default=0)
+    module_contents = models.JSONField(default=list)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['course','date']
+        ordering = ['date']
+
+    def __str__(self) -> str:
+        return f'{self.course} {self.date}'
@@ -0,0 +1,106 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from chat.models import Message
+from courses.models import Course, Module
+from .models import CourseDailyStats
+
+# 강사 대시보드의 강좌 통계
+# 대시보드와 API는 요청마다 Course.students 의 중간 테이블이나 채팅 메시지를 집계하지 않고 CourseDailyStats만 읽는다.
+# rollup_analytics 명령을 주기적으로(예: 한시간마다) 실행하면 마지막으로 집계한 날부터 오늘까지만 집계한다.
+# - 학생, 모듈, 콘텐츠 수는 카운터 컬럼에서 가져오므로 등록된 학생 수와 관계없이 강좌와 모듈 수에 비례한다.
+# - 채팅은 집계할 날의 메시지만 읽는다. 메시지는 모아서 저장되므로 마지막으로 집계한 날도 다시 집계한다.
+# - 학생 수 등은 집계할 때의 값이므로 명령을 실행하지 못한 날은 마지막으로 집계한 날의 값을 이어서 사용한다.
+
+SNAPSHOT_FIELDS = ['students','modules','contents','module_contents']
+CHAT_FIELDS = ['messages','chatters']
+BATCH_SIZE = 1000
+
+def get_setting(name):
+    return settings.ANALYTICS[name]
+
+def _day_range(day):
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+# 하루의 강좌별 채팅 활동 {강좌 id: {'messages': 메시지 수, 'chatters': 보낸 사용자 수}}
+def chat_activity(day):
+    start, end = _day_range(day)
+    rows = Message.objects.filter(sent_on__gte=start, sent_on__lt=end).order_by().values('course_id').annotate(messages=Count('id'), chatters=Count('user_id', distinct=True))
+    return {row.pop('course_id'): row for row in rows}
+
+# 현재 강좌별 학생, 모듈, 콘텐츠 수 {강좌 id: {'students': ..., 'modules': ..., 'contents': ..., 'module_contents': [...]}}
+def snapshot():
+    courses = {course_id: {'students': students, 'modules': modules, 'contents': 0, 'module_contents': []}
+               for course_id, students, modules in Course.objects.order_by().values_list('id','num_students','num_modules')}
+    modules = Module.objects.order_by('course_id','order','id').values_list('id','course_id','title','num_contents')
+    for module_id, course_id, title, contents in modules.iterator(chunk_size=BATCH_SIZE):
+        stats = courses.get(course_id)
+        if stats is not None:
+            stats['contents'] += contents
+            stats['module_contents'].append([module_id, title, contents])
+    return courses
+
+def _save(day, stats, chat, fields):
+    rows = [CourseDailyStats(course_id=course_id, date=day, **values, **chat.get(course_id, {})) for course_id, values in stats.items()]
+    CourseDailyStats.objects.bulk_create(rows, batch_size=BATCH_SIZE, update_conflicts=True, unique_fields=['course','date'], update_fields=fields + ['updated'])
+
+# 마지막으로 집계한 날부터 today까지 집계하고 집계한 날 목록을 반환
+# 집계하지 않은 날이 많아도 최근 DAYS일만 집계한다.
+# 처음 집계할 때는 최근 DAYS일의 채팅 활동을 채우고, 과거의 학생 수 등은 알 수 없으므로 현재 값을 사용한다.
+def rollup(today=None):
+    today = today or timezone.localdate()
+    last = CourseDailyStats.objects.filter(date__lte=today).aggregate(last=Max('date'))['last']
+    earliest = today - datetime.timedelta(days=get_setting('DAYS'))
+    start = earliest if last is None else max(last, earliest)
+    current = snapshot()
+    carried = current
+    if last is not None and last < today:
+        carried = {row.pop('course_id'): row for row in CourseDailyStats.objects.filter(date=last).values('course_id', *SNAPSHOT_FIELDS)}
+    days = [start + datetime.timedelta(days=i) for i in range((today - start).days + 1)]
+    for day in days:
+        chat = chat_activity(day)
+        with transaction.atomic():
+            if day == today:
+                _save(day, current, chat, SNAPSHOT_FIELDS + CHAT_FIELDS)
+            elif day == last:
+                # 이미 집계한 날은 늦게 저장된 메시지만 반영한다.
+                _save(day, carried, chat, CHAT_FIELDS)
+            else:
+                _save(day, carried, chat, SNAPSHOT_FIELDS + CHAT_FIELDS)
+    return days
+
+
+# 통계 조회
+
+# 강좌의 최근 days일 통계, 모듈별 콘텐츠 수는 마지막으로 집계한 날의 값
+# students_change - 이전에 집계한 날보다 늘어난 학생 수 (이전 값이 없으면 None)
+def course_stats(course_id, days=None):
+    days = days or get_setting('DAYS')
+    since = timezone.localdate() - datetime.timedelta(days=days - 1)
+    rows = list(CourseDailyStats.objects.filter(course_id=course_id, date__gte=since - datetime.timedelta(days=1)).order_by('date'))
+    history, previous = [], None
+    for row in rows:
+        if row.date >= since:
+            history.append({
+                'date': row.date,
+                'students': row.students,
+                'students_change': None if previous is None else row.students - previous.students,
+                'messages': row.messages,
+                'chatters': row.chatters,
+            })
+        previous = row
+    latest = rows[-1] if rows else None
+    return {
+        'course': course_id,
+        'updated': latest.updated if latest else None,
+        'students': latest.students if latest else 0,
+        'contents': latest.contents if latest else 0,
+        'messages': sum(day['messages'] for day in history),
+        'days': history,
+        'modules': [{'id': module_id, 'title': title, 'contents': contents} for module_id, title, contents in (latest.module_contents if latest else [])],
+    }
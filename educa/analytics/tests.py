@@ -0,0 +1,89 @@
+import datetime
+
+from django.contrib.auth.models import User, Permission
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from chat.models import Message
+from courses.models import Subject, Course, Module, Content, Text
+from courses.enrollment import enroll_users
+from .models import CourseDailyStats
+from .rollup import rollup, course_stats
+
+# Create your tests here.
+
+class RollupTest(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.owner = User.objects.create(username='instructor')
+        self.owner.user_permissions.add(Permission.objects.get(codename='view_course'))
+        self.course = Course.objects.create(owner=self.owner, subject=Subject.objects.create(title='Programming', slug='programming'), title='Python', slug='python')
+        self.modules = [Module.objects.create(course=self.course, title=f'Module {i}') for i in range(2)]
+        for i in range(3):
+            Content.objects.create(module=self.modules[0], item=Text.objects.create(owner=self.owner, title=f'Text {i}', content=''))
+        self.students = User.objects.bulk_create([User(username=f'student{i}') for i in range(5)])
+        enroll_users(self.course, [student.id for student in self.students[:2]])
+
+    def days_ago(self, days):
+        return self.today - datetime.timedelta(days=days)
+
+    def send(self, user, day, count=1):
+        sent_on = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+        Message.objects.bulk_create([Message(user=user, course=self.course, content='hi', sent_on=sent_on) for i in range(count)])
+
+    def test_rollup_is_incremental(self):
+        self.send(self.students[0], self.days_ago(3), 2)
+        self.send(self.students[0], self.days_ago(10))
+        # 처음 집계할 때는 최근 DAYS일을 채운다.
+        self.assertEqual(rollup(self.days_ago(3)), [self.days_ago(i) for i in range(33, 2, -1)])
+        self.assertEqual(CourseDailyStats.objects.get(date=self.days_ago(10)).messages, 1)
+        enroll_users(self.course, [student.id for student in self.students[2:]])
+        self.send(self.students[1], self.days_ago(3))
+        self.send(self.students[2], self.today)
+        self.send(self.students[3], self.today)
+        # 등록된 학생은 중간 테이블이 아닌 카운터 컬럼에서 가져온다.
+        with CaptureQueriesContext(connection) as queries:
+            days = rollup()
+        self.assertEqual(days, [self.days_ago(i) for i in range(3, -1, -1)])
+        self.assertFalse(any('courses_course_students' in query['sql'] for query in queries.captured_queries))
+
+        rows = {row.date: row for row in CourseDailyStats.objects.filter(course=self.course)}
+        # 마지막으로 집계한 날은 늦게 저장된 메시지만 반영하고, 집계하지 못한 날은 그 값을 이어서 사용한다.
+        self.assertEqual((rows[self.days_ago(3)].students, rows[self.days_ago(3)].messages, rows[self.days_ago(3)].chatters), (2, 3, 2))
+        self.assertEqual((rows[self.days_ago(1)].students, rows[self.days_ago(1)].messages), (2, 0))
+        self.assertEqual((rows[self.today].students, rows[self.today].messages, rows[self.today].chatters), (5, 2, 2))
+        self.assertEqual(rows[self.today].module_contents, [[self.modules[0].id, 'Module 0', 3], [self.modules[1].id, 'Module 1', 0]])
+
+        # 같은 날 다시 집계하면 행을 갱신한다.
+        self.modules[1].delete()
+        rollup()
+        self.assertEqual(CourseDailyStats.objects.count(), 34)
+        stats = course_stats(self.course.id)
+        self.assertEqual((stats['students'], stats['contents'], stats['messages']), (5, 3, 6))
+        self.assertEqual([day['students_change'] for day in stats['days']], [0] * 29 + [3])
+        self.assertEqual(stats['modules'], [{'id': self.modules[0].id, 'title': 'Module 0', 'contents': 3}])
+
+    # 등록된 학생 수와 관계없이 집계된 행만 읽는다.
+    def test_dashboard_reads_rollups(self):
+        rollup()
+        self.client.force_login(self.owner)
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(f'/analytics/course/{self.course.id}/')
+        self.assertContains(response, '2 students, 3 contents')
+        enroll_users(self.course, [user.id for user in User.objects.bulk_create([User(username=f'user{i}') for i in range(300)])])
+        rollup()
+        with self.assertNumQueries(len(few)):
+            self.assertContains(self.client.get(f'/analytics/course/{self.course.id}/'), '302 students')
+        self.assertContains(self.client.get('/course/mine/'), f'/analytics/course/{self.course.id}/')
+
+        api = APIClient()
+        api.force_authenticate(self.owner)
+        data = api.get(f'/api/courses/{self.course.id}/analytics/').json()
+        self.assertEqual((data['students'], len(data['days']), len(data['modules'])), (302, 30, 2))
+        api.force_authenticate(self.students[0])
+        self.assertEqual(api.get(f'/api/courses/{self.course.id}/analytics/').status_code, 403)
+        self.client.force_login(self.students[0])
+        self.assertNotEqual(self.client.get(f'/analytics/course/{self.course.id}/').status_code, 200)
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import views
+
+
+urlpatterns = [
+    path('course/<int:pk>/', views.CourseAnalyticsView.as_view(), name='course_analytics'),
+]
@@ -0,0 +1,16 @@
+from django.views import generic
+
+from courses.views import OwnerCourseMixin
+from monitoring.budget import QueryBudgetMixin
+from .rollup import course_stats
+
+# Create your views here.
+
+# 강사가 만든 강좌의 통계 (rollup_analytics 명령으로 집계한 값만 읽는다)
+class CourseAnalyticsView(QueryBudgetMixin, OwnerCourseMixin, generic.DetailView):
+    query_budget = 6
+    template_name = 'analytics/course.html'
+    permission_required = 'courses.view_course'
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(stats=course_stats(self.object.id), **kwargs)
@@ -1,4 +1,6 @@
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import os, json
 
@@ -11,19 +13,39 @@ username = secret['USERNAME']
 password = secret['PASSWORD']
 
 base_url = 'http://127.0.0.1:8000/api/'
+# 한번의 요청으로 등록할 강좌 수와 동시에 보낼 요청 수
+chunk_size = 500
+workers = 4
+
+# 연결을 재사용하기 위해 커넥션 풀을 가진 세션을 사용
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+session.auth = (username, password)
 
 # retrieve all courese
-r = requests.get(f'{base_url}courses/')
-courses = r.json()
+# 강좌 목록은 커서로 페이지가 나뉘므로 next 링크를 따라가며 모든 페이지를 가져온다.
+courses = []
+url = f'{base_url}courses/?fields=id,title'
+while url:
+    r = session.get(url)
+    data = r.json()
+    courses += data['results']
+    url = data['next']
 
 available_courses = ', '.join([course['title'] for course in courses])
 print(f'Available courses : {available_courses}')
 
-for course in courses:
-    course_id = course['id']
-    course_title = course['title']
+titles = {course['id'] : course['title'] for course in courses}
+course_ids = list(titles)
 
-    r = requests.post(f'{base_url}courses/{course_id}/enroll/',auth=(username,password))
+# 강좌 id를 나누어 일괄 등록 요청을 동시에 보낸다.
+def enroll(ids):
+    r = session.post(f'{base_url}courses/enroll/', json={'courses':ids})
+    r.raise_for_status()
+    return r.json()['enrolled']
 
-    if r.status_code == 200:
-        print(f'Successfully enrolled in {course_title}')
\ No newline at end of file
+chunks = [course_ids[i:i + chunk_size] for i in range(0, len(course_ids), chunk_size)]
+with ThreadPoolExecutor(max_workers=workers) as executor:
+    for enrolled in executor.map(enroll, chunks):
+        for course_id in enrolled:
+            print(f'Successfully enrolled in {titles[course_id]}')
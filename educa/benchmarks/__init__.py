@@ -0,0 +1,30 @@
+# 성능 측정 스크립트
+# educa 디렉터리에서 python -m benchmarks.<이름> 으로 실행한다.
+# 각 스크립트는 테스트 데이터베이스를 만들어 측정하고 종료할 때 삭제한다.
+# 데이터베이스와 Redis는 benchmarks/settings.py의 환경 변수로 선택한다.
+
+import os, sys, contextlib
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django
+django.setup()
+
+# 측정용 테스트 데이터베이스를 생성하고 종료하면 삭제
+@contextlib.contextmanager
+def test_database():
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
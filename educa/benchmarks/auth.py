@@ -0,0 +1,69 @@
+# API 인증 방식별 요청 하나의 CPU 시간 측정
+# 등록한 강좌의 contents API를 BasicAuthentication과 토큰으로 요청하고
+# 요청마다 프로세스 CPU 시간(time.process_time)과 응답 시간을 측정한다.
+# 토큰은 프로세스 LRU에 있는 경우(warm), 공유 캐시에만 있는 경우(shared), 캐시에 없는 경우(cold)를 나누어 측정한다.
+# python -m benchmarks.auth [--scale small|medium|large] [--requests 200]
+
+import argparse
+import base64
+import random
+import time
+
+from . import test_database
+from .data import PASSWORD, add_scale_arguments, generate, get_scale, get_student
+
+from django.core.cache import cache
+from django.test import Client
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+# before(i)를 실행한 뒤 send(i)의 CPU 시간과 응답 시간을 측정
+def measure(send, num_requests, before=None):
+    cpu, latencies = [], []
+    for i in range(num_requests):
+        if before is not None:
+            before(i)
+        cpu_start, start = time.process_time(), time.perf_counter()
+        response = send(i)
+        cpu.append(time.process_time() - cpu_start)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    return {'cpu_ms': sum(cpu) / num_requests * 1000, 'p50_ms': percentile(latencies, 0.5) * 1000, 'p99_ms': percentile(latencies, 0.99) * 1000}
+
+def run(scale, num_requests, seed=0):
+    from courses import tokens
+
+    rng = random.Random(seed)
+    generate(**scale, seed=seed)
+    student = get_student()
+    course_ids = list(student.courses_joined.values_list('id', flat=True))
+    path = lambda i: f'/api/courses/{rng.choice(course_ids)}/contents/'
+
+    credentials = base64.b64encode(f'{student.username}:{PASSWORD}'.encode()).decode()
+    basic = Client(HTTP_AUTHORIZATION=f'Basic {credentials}')
+    token, api_token = tokens.create_token(student, 'benchmark')
+    client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+    # 렌더링된 콘텐츠 조각을 미리 저장하여 인증 방식의 차이만 측정한다.
+    for course_id in course_ids:
+        client.get(f'/api/courses/{course_id}/contents/')
+
+    results = {
+        'basic': measure(lambda i: basic.get(path(i)), num_requests),
+        'token (warm)': measure(lambda i: client.get(path(i)), num_requests),
+        'token (shared)': measure(lambda i: client.get(path(i)), num_requests, lambda i: tokens._local.clear()),
+        'token (cold)': measure(lambda i: client.get(path(i)), num_requests, lambda i: (tokens._local.clear(), cache.delete(tokens.token_key(api_token.digest)))),
+    }
+    print(f"{'authentication':<16} {'cpu/request':>12} {'p50':>9} {'p99':>9}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['cpu_ms']:>10.2f}ms {result['p50_ms']:>7.2f}ms {result['p99_ms']:>7.2f}ms")
+    print(f"basic / token (warm) cpu: {results['basic']['cpu_ms'] / results['token (warm)']['cpu_ms']:.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    add_scale_arguments(parser)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    with test_database():
+        run(get_scale(args), args.requests)
@@ -0,0 +1,88 @@
+# 채팅방 크기별 메시지 전송 성능 측정
+# 메모리 채널 레이어를 사용하여 한 명이 메시지를 보내고 채팅방의 모든 참여자가 받을 때까지의
+# 초당 전달 메시지 수와 전달 지연 시간(p50, p99)을 측정한다.
+# python -m benchmarks.chat_fanout [--sizes 10 100 500] [--messages 50]
+
+import argparse
+import asyncio
+import json
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import override_settings
+from channels.testing import WebsocketCommunicator
+
+from chat.consumer import ChatConsumer
+
+# 인증, 최근 메시지, 저장을 생략하고 전송 경로만 측정하는 컨슈머
+class LoadTestConsumer(ChatConsumer):
+    async def is_authorized(self):
+        return True
+
+    async def send_history(self):
+        pass
+
+    async def persist(self, uid, message, now):
+        pass
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+async def receive_all(communicator, expected, latencies):
+    received = 0
+    while received < expected:
+        data = json.loads(await communicator.receive_from(timeout=30))
+        now = time.perf_counter()
+        for event in data if isinstance(data, list) else [data]:
+            latencies.append(now - float(event['message']))
+            received += 1
+
+async def run_room(size, messages, interval):
+    application = LoadTestConsumer.as_asgi()
+    communicators = []
+    for _ in range(size):
+        communicator = WebsocketCommunicator(application, '/ws/chat/room/1/')
+        communicator.scope['user'] = AnonymousUser()
+        communicator.scope['url_route'] = {'kwargs': {'course_id': '1'}}
+        connected, _ = await communicator.connect()
+        assert connected
+        communicators.append(communicator)
+
+    latencies = []
+    receivers = [asyncio.ensure_future(receive_all(c, messages, latencies)) for c in communicators]
+    start = time.perf_counter()
+    for _ in range(messages):
+        # 보낸 시간을 메시지로 전송하여 받은 쪽에서 지연 시간을 계산
+        await communicators[0].send_to(text_data=json.dumps({'message': repr(time.perf_counter())}))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*receivers)
+    elapsed = time.perf_counter() - start
+
+    for communicator in communicators:
+        await communicator.disconnect()
+    return {
+        'room_size': size,
+        'messages': messages,
+        'deliveries_per_sec': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+def run(sizes, messages, interval):
+    results = []
+    with override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer', 'CONFIG': {'capacity': messages * 2}}}):
+        for size in sizes:
+            results.append(asyncio.run(run_room(size, messages, interval)))
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--interval', type=float, default=0.001, help='Seconds between messages')
+    args = parser.parse_args()
+
+    print(f"{'room':>6} {'deliveries/s':>14} {'p50 ms':>8} {'p99 ms':>8}")
+    for result in run(args.sizes, args.messages, args.interval):
+        print(f"{result['room_size']:>6} {result['deliveries_per_sec']:>14.0f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
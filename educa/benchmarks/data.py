@@ -0,0 +1,106 @@
+# 성능 측정용 데이터 생성
+# 주제, 강좌, 모듈, 텍스트 콘텐츠, 학생과 등록을 bulk_create()로 만들고 카운터 컬럼을 맞춘다.
+# 강사는 instructor<번호>, 학생은 student<번호> 이름으로 만들며 학생의 비밀번호는 PASSWORD 이다.
+# python -m benchmarks.data [--scale small|medium|large] [--courses 1000 ...]
+# 설정된 데이터베이스(BENCHMARK_DB)에 직접 생성하므로 먼저 migrate를 실행한다.
+
+import argparse
+import random
+import time
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+
+PASSWORD = 'benchmark'
+BATCH_SIZE = 2000
+# 강사 한명이 가르치는 강좌 수
+COURSES_PER_INSTRUCTOR = 20
+
+# subjects - 주제 수, courses - 강좌 수, modules - 강좌마다 모듈 수, contents - 모듈마다 콘텐츠 수
+# students - 학생 수, enrollments - 학생마다 등록한 강좌 수
+SCALES = {
+    'small': {'subjects': 5, 'courses': 50, 'modules': 5, 'contents': 5, 'students': 100, 'enrollments': 5},
+    'medium': {'subjects': 10, 'courses': 500, 'modules': 10, 'contents': 10, 'students': 2000, 'enrollments': 10},
+    'large': {'subjects': 20, 'courses': 5000, 'modules': 10, 'contents': 20, 'students': 20000, 'enrollments': 20},
+}
+
+WORDS = [f'word{i}' for i in range(2000)]
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+def add_scale_arguments(parser):
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    for name in SCALES['small']:
+        parser.add_argument(f'--{name}', type=int, help=f'Override the number of {name} of the scale')
+
+def get_scale(args):
+    scale = dict(SCALES[args.scale])
+    for name in scale:
+        if getattr(args, name) is not None:
+            scale[name] = getattr(args, name)
+    return scale
+
+def generate(subjects, courses, modules, contents, students, enrollments, seed=0):
+    from courses.models import Subject, Course, Module, Content, Text
+    from courses.counters import reconcile
+    from courses import catalog
+
+    rng = random.Random(seed)
+    # 모든 학생이 같은 비밀번호 해시를 사용 (해시 계산은 한번만)
+    password = make_password(PASSWORD)
+    User.objects.bulk_create([User(username=f'instructor{i}') for i in range(max(1, courses // COURSES_PER_INSTRUCTOR))], batch_size=BATCH_SIZE)
+    User.objects.bulk_create([User(username=f'student{i}', password=password) for i in range(students)], batch_size=BATCH_SIZE)
+    instructors = list(User.objects.filter(username__startswith='instructor').values_list('id', flat=True))
+    student_ids = list(User.objects.filter(username__startswith='student').values_list('id', flat=True))
+
+    Subject.objects.bulk_create([Subject(title=f'Subject {i}', slug=f'subject-{i}') for i in range(subjects)], batch_size=BATCH_SIZE)
+    subject_ids = list(Subject.objects.values_list('id', flat=True))
+    Course.objects.bulk_create([Course(owner_id=instructors[i // COURSES_PER_INSTRUCTOR % len(instructors)], subject_id=subject_ids[i % len(subject_ids)],
+                                       title=sentence(rng, 4).title(), slug=f'course-{i}', overview=sentence(rng, 60)) for i in range(courses)], batch_size=BATCH_SIZE)
+    course_rows = list(Course.objects.values_list('id', 'owner_id'))
+
+    Module.objects.bulk_create([Module(course_id=course_id, title=f'Module {order}', description=sentence(rng, 20), order=order)
+                                for course_id, owner_id in course_rows for order in range(modules)], batch_size=BATCH_SIZE)
+    owners = dict(course_rows)
+    text_type = ContentType.objects.get_for_model(Text)
+    module_rows = list(Module.objects.values_list('id', 'course_id', 'order'))
+    step = max(1, BATCH_SIZE // max(1, contents))
+    for i in range(0, len(module_rows), step):
+        batch = module_rows[i:i + step]
+        texts = Text.objects.bulk_create([Text(owner_id=owners[course_id], title=f'Text {order}', content=sentence(rng, 120))
+                                          for module_id, course_id, module_order in batch for order in range(contents)])
+        items = iter(texts)
+        # 진도 비트맵 위치는 강좌 안에서 모듈, 콘텐츠 순서대로
+        Content.objects.bulk_create([Content(module_id=module_id, content_type=text_type, object_id=next(items).id, order=order, progress_index=module_order * contents + order)
+                                     for module_id, course_id, module_order in batch for order in range(contents)])
+
+    Enrollment = Course.students.through
+    course_ids = [course_id for course_id, owner_id in course_rows]
+    pending = []
+    for student_id in student_ids:
+        for course_id in rng.sample(course_ids, min(enrollments, len(course_ids))):
+            pending.append(Enrollment(user_id=student_id, course_id=course_id))
+        if len(pending) >= BATCH_SIZE:
+            Enrollment.objects.bulk_create(pending, batch_size=BATCH_SIZE)
+            pending = []
+    Enrollment.objects.bulk_create(pending, batch_size=BATCH_SIZE)
+
+    # bulk_create()는 시그널을 보내지 않으므로 카운터와 목록 캐시를 직접 갱신
+    reconcile(lambda model_name: apps.get_model('courses', model_name))
+    catalog.bump_generation()
+
+def get_student(i=0):
+    return User.objects.get(username=f'student{i}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    add_scale_arguments(parser)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    scale = get_scale(args)
+    start = time.perf_counter()
+    generate(**scale, seed=args.seed)
+    print(f"created {scale} in {time.perf_counter() - start:.1f}s")
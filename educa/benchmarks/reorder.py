@@ -0,0 +1,45 @@
+# 콘텐츠 정렬 변경 요청의 쿼리 수와 응답 시간을 모듈 크기별로 측정
+# python -m benchmarks.reorder
+
+import json, time
+
+from . import test_database
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+SIZES = [10, 50, 200]
+REPEAT = 5
+
+def run():
+    from courses.models import Subject, Course, Module, Content, Text
+
+    owner = User.objects.create(username='instructor')
+    subject = Subject.objects.create(title='Benchmark', slug='benchmark')
+    course = Course.objects.create(owner=owner, subject=subject, title='Benchmark', slug='benchmark', overview='')
+    client = Client()
+    client.force_login(owner)
+
+    print(f"{'items':>6} {'queries':>8} {'ms':>8}")
+    for size in SIZES:
+        module = Module.objects.create(course=course, title=f'{size} items')
+        for i in range(size):
+            Content.objects.create(module=module, item=Text.objects.create(owner=owner, title=str(i), content=''))
+        ids = list(module.contents.values_list('id', flat=True))
+
+        elapsed = 0
+        for _ in range(REPEAT):
+            ids.reverse()
+            body = json.dumps({id: order for order, id in enumerate(ids)})
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.post('/course/content/order/', body, content_type='application/json')
+                elapsed += time.perf_counter() - start
+            assert response.status_code == 200, response.content
+        print(f'{size:>6} {len(queries):>8} {elapsed / REPEAT * 1000:>8.1f}')
+
+if __name__ == '__main__':
+    with test_database():
+        run()
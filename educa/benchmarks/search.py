@@ -0,0 +1,57 @@
+# 강좌 검색 성능 측정
+# 임의의 단어로 만든 강좌와 검색 문서를 생성하고 검색 지연 시간을 측정한다.
+# SQLite에서는 메모리 역색인, PostgreSQL에서는 tsvector + GIN 인덱스를 사용한다.
+# python -m benchmarks.search [--courses 100000] [--queries 200]
+
+import argparse
+import random
+import time
+
+from . import test_database
+
+from django.contrib.auth.models import User
+
+WORDS = [f'word{i}' for i in range(5000)]
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def run(num_courses, num_queries, seed=0):
+    from courses.models import Subject, Course, CourseSearchDocument
+    from courses import search
+
+    rng = random.Random(seed)
+    owner = User.objects.create(username='instructor')
+    subject = Subject.objects.create(title='Benchmark', slug='benchmark')
+
+    start = time.perf_counter()
+    courses = Course.objects.bulk_create([Course(owner=owner, subject=subject, title=sentence(rng, 4), slug=f'course-{i}', overview=sentence(rng, 30)) for i in range(num_courses)], batch_size=2000)
+    CourseSearchDocument.objects.bulk_create([CourseSearchDocument(course=course, title=f'{course.title}\n{course.overview}', modules=sentence(rng, 40), texts=sentence(rng, 200)) for course in courses], batch_size=2000)
+    if search.use_postgres():
+        search.update_vectors(CourseSearchDocument.objects.all())
+    print(f'created {num_courses} courses in {time.perf_counter() - start:.1f}s')
+
+    search.reset_index()
+    start = time.perf_counter()
+    search.search(WORDS[0])
+    print(f'first query (index build on non-PostgreSQL databases): {(time.perf_counter() - start) * 1000:.0f}ms')
+
+    latencies = []
+    for _ in range(num_queries):
+        query = ' '.join(rng.sample(WORDS, rng.choice([1, 2])))
+        start = time.perf_counter()
+        search.search(query)
+        latencies.append(time.perf_counter() - start)
+    print(f'{num_queries} queries: p50 {percentile(latencies, 0.5) * 1000:.1f}ms, p99 {percentile(latencies, 0.99) * 1000:.1f}ms')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--courses', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    with test_database():
+        run(args.courses, args.queries)
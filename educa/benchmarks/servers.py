@@ -0,0 +1,176 @@
+# 동기 uWSGI 워커와 ASGI 워커의 HTTP 처리량 비교
+# 같은 SQLite 데이터베이스로 각 서버를 실행하고 강좌 목록, 강좌 상세, 학생 강좌 상세, 강좌 API 목록/상세를
+# 동시에 요청하여 초당 요청 수와 응답 시간(p50, p99)을 측정한다.
+# uwsgi - uWSGI 프로세스 (동기 뷰)
+# asgi - gunicorn + uvicorn 워커 (비동기 뷰), gunicorn이 없으면 워커 수만큼 daphne 프로세스를 실행
+# asgi-sync - asgi와 같은 서버에서 동기 뷰를 사용 (비동기 뷰의 효과만 비교)
+# python -m benchmarks.servers [--servers uwsgi asgi] [--workers 4] [--concurrency 32] [--duration 10] [--output results.json]
+
+import argparse
+import http.client
+import importlib.util
+import itertools
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from . import BASE_DIR
+
+SERVERS = ('uwsgi', 'asgi', 'asgi-sync')
+BASE_PORT = 8700
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+# 측정에 사용할 데이터를 만들고 요청할 경로와 학생 세션을 반환 (--seed, 벤치마크 설정으로 실행)
+def seed():
+    from django.contrib.auth import SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY
+    from django.contrib.sessions.backends.db import SessionStore
+    from .data import SCALES, generate, get_student
+
+    generate(**SCALES['small'])
+    student = get_student()
+    course = student.courses_joined.first()
+    session = SessionStore()
+    session[SESSION_KEY] = str(student.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = student.get_session_auth_hash()
+    session.create()
+    return {
+        'paths': ['/', f'/course/{course.slug}/', f'/students/courses/{course.id}/', '/api/courses/', f'/api/courses/{course.id}/'],
+        'session': session.session_key,
+    }
+
+def server_commands(name, workers, port):
+    if name == 'uwsgi':
+        return [(['uwsgi', '--http', f'127.0.0.1:{port}', '--module', 'educa.wsgi:application', '--master', '--processes', str(workers), '--http-keepalive',
+                  '--disable-logging', '--die-on-term', '--need-app'], port)]
+    if importlib.util.find_spec('gunicorn') and importlib.util.find_spec('uvicorn'):
+        return [(['gunicorn', '-k', 'uvicorn.workers.UvicornWorker', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'educa.asgi:application'], port)]
+    # gunicorn이 없으면 워커 수만큼 daphne를 실행하고 클라이언트가 포트를 나누어 요청
+    return [(['daphne', '-b', '127.0.0.1', '-p', str(port + i), 'educa.asgi:application'], port + i) for i in range(workers)]
+
+def wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/courses/')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not start')
+
+# 연결을 유지하는 클라이언트 스레드로 duration 동안 요청
+def load(ports, paths, session, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    headers = {'Cookie': f'sessionid={session}'}
+
+    def client(port, offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        failed = 0
+        for path in itertools.islice(itertools.cycle(paths), offset, None):
+            if time.monotonic() >= deadline:
+                break
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(ports[i % len(ports)], i)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_sec': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+    }
+
+def run_server(name, env, workers, concurrency, duration, data):
+    env = dict(env, BENCHMARK_ASYNC='1' if name == 'asgi' else '0')
+    commands = server_commands(name, workers, BASE_PORT)
+    if shutil.which(commands[0][0][0]) is None:
+        print(f'{name}: {commands[0][0][0]} is not installed, skipped', file=sys.stderr)
+        return None
+    processes = [subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True) for command, port in commands]
+    ports = [port for command, port in commands]
+    try:
+        for port in ports:
+            wait_ready(port)
+        # 캐시와 저장된 HTML을 채운다.
+        load(ports, data['paths'], data['session'], len(data['paths']), 1)
+        result = load(ports, data['paths'], data['session'], concurrency, duration)
+    finally:
+        for process in processes:
+            os.killpg(process.pid, signal.SIGTERM)
+        for process in processes:
+            process.wait()
+    return {'server': name, 'workers': workers, 'concurrency': concurrency, **result}
+
+def run(servers, workers, concurrency, duration):
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='benchmarks.settings', BENCHMARK_DB=os.path.join(directory, 'db.sqlite3'))
+    try:
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=BASE_DIR, env=env, check=True)
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.servers', '--seed'], cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True).stdout
+        data = json.loads(output)
+        results = []
+        for name in servers:
+            result = run_server(name, env, workers, concurrency, duration, data)
+            if result is not None:
+                results.append(result)
+        return results
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--servers', nargs='+', choices=SERVERS, default=list(SERVERS))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10, help='Seconds to send requests to each server')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--seed', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        print(json.dumps(seed()))
+        sys.exit()
+
+    results = run(args.servers, args.workers, args.concurrency, args.duration)
+    print(f"{'server':>10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for result in results:
+        print(f"{result['server']:>10} {result['requests_per_sec']:>8.0f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['errors']:>7}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,219 @@
+# 학생과 강사의 주요 요청을 측정하는 벤치마크 모음
+# 테스트 데이터베이스에 benchmarks.data로 데이터를 만들고 시나리오마다 같은 프로세스에서 요청을 보내
+# 초당 요청 수, 응답 시간(p50, p95, p99), 요청마다 실행한 쿼리 수를 측정한다.
+# 결과를 JSON으로 저장하고 --baseline으로 이전 결과(다른 커밋)와 비교할 수 있다.
+# SQLite 또는 PostgreSQL(BENCHMARK_DB), Redis 또는 프로세스 메모리(BENCHMARK_REDIS)를 사용한다. (benchmarks/settings.py)
+# python -m benchmarks.suite [--scale small|medium|large] [--scenarios course_list reorder ...] [--requests 200]
+#                            [--output results.json] [--baseline previous.json]
+
+import argparse
+import base64
+import datetime
+import json
+import platform
+import random
+import subprocess
+import time
+
+from . import BASE_DIR, test_database
+from .data import PASSWORD, add_scale_arguments, generate, get_scale, get_student
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+# 실행한 쿼리 수를 세는 데이터베이스 실행 래퍼
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+# send(i)로 요청을 보내고 측정
+def measure(send, num_requests, warmup):
+    for i in range(warmup):
+        send(i)
+    counter = QueryCounter()
+    latencies = []
+    errors = 0
+    with connection.execute_wrapper(counter):
+        start = time.perf_counter()
+        for i in range(warmup, warmup + num_requests):
+            sent = time.perf_counter()
+            response = send(i)
+            latencies.append(time.perf_counter() - sent)
+            if response.status_code >= 400:
+                errors += 1
+        elapsed = time.perf_counter() - start
+    return {
+        'requests': num_requests,
+        'errors': errors,
+        'requests_per_sec': num_requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries_per_request': counter.count / num_requests,
+    }
+
+
+# 시나리오 - 요청을 보내는 send(i) 함수를 반환
+
+def course_list(rng):
+    from courses.models import Subject
+    paths = ['/'] + [f'/course/subject/{slug}/' for slug in Subject.objects.values_list('slug', flat=True)]
+    client = Client()
+    return lambda i: client.get(paths[i % len(paths)])
+
+def course_detail(rng):
+    from courses.models import Course
+    slugs = list(Course.objects.values_list('slug', flat=True))
+    client = Client()
+    return lambda i: client.get(f'/course/{rng.choice(slugs)}/')
+
+def student_module(rng):
+    from courses.models import Module
+    student = get_student()
+    modules = list(Module.objects.filter(course__students=student).values_list('course_id', 'id'))
+    client = Client()
+    client.force_login(student)
+    return lambda i: client.get('/students/courses/%d/%d/' % rng.choice(modules))
+
+def api_contents(rng):
+    student = get_student()
+    course_ids = list(student.courses_joined.values_list('id', flat=True))
+    credentials = base64.b64encode(f'{student.username}:{PASSWORD}'.encode()).decode()
+    client = Client(HTTP_AUTHORIZATION=f'Basic {credentials}')
+    return lambda i: client.get(f'/api/courses/{rng.choice(course_ids)}/contents/')
+
+# 같은 요청을 API 토큰으로 인증 (benchmarks.auth 에서 인증 방식별 CPU 시간을 비교)
+def api_contents_token(rng):
+    from courses.tokens import create_token
+    student = get_student()
+    course_ids = list(student.courses_joined.values_list('id', flat=True))
+    token, api_token = create_token(student, 'benchmark')
+    client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+    return lambda i: client.get(f'/api/courses/{rng.choice(course_ids)}/contents/')
+
+def enroll(rng):
+    from courses.models import Course
+    # 등록한 강좌가 없는 새 학생이 강좌를 차례로 등록
+    student = User.objects.create(username='enroll-student')
+    course_ids = list(Course.objects.values_list('id', flat=True))
+    rng.shuffle(course_ids)
+    client = Client()
+    client.force_login(student)
+    return lambda i: client.post('/students/enroll-course/', {'course': course_ids[i % len(course_ids)]})
+
+def reorder(rng):
+    from courses.models import Content
+    instructor = User.objects.get(username='instructor0')
+    contents = {}
+    for module_id, content_id in Content.objects.filter(module__course__owner=instructor).values_list('module_id', 'id'):
+        contents.setdefault(module_id, []).append(content_id)
+    modules = list(contents.values())
+    client = Client()
+    client.force_login(instructor)
+
+    def send(i):
+        ids = rng.choice(modules)
+        ids.reverse()
+        return client.post('/course/content/order/', json.dumps({id: order for order, id in enumerate(ids)}), content_type='application/json')
+    return send
+
+HTTP_SCENARIOS = {
+    'course_list': course_list,
+    'course_detail': course_detail,
+    'student_module': student_module,
+    'api_contents': api_contents,
+    'api_contents_token': api_contents_token,
+    'enroll': enroll,
+    'reorder': reorder,
+}
+SCENARIOS = list(HTTP_SCENARIOS) + ['chat_fanout']
+
+# 채팅방 한곳의 메시지 전송 (benchmarks.chat_fanout)
+def chat_fanout(room_size, messages):
+    from .chat_fanout import run
+    result, = run([room_size], messages, 0.001)
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(scenarios, scale, num_requests, warmup, room_size, seed=0):
+    start = time.perf_counter()
+    generate(**scale, seed=seed)
+    results = {
+        'commit': git_commit(),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'scale': scale,
+        'setup_sec': time.perf_counter() - start,
+        'scenarios': {},
+    }
+    for name in scenarios:
+        rng = random.Random(seed)
+        if name == 'chat_fanout':
+            results['scenarios'][name] = chat_fanout(room_size, num_requests)
+        else:
+            results['scenarios'][name] = measure(HTTP_SCENARIOS[name](rng), num_requests, warmup)
+    return results
+
+def change(new, old):
+    if not old:
+        return ''
+    return f'{(new - old) / old * 100:+.0f}%'
+
+def report(results, baseline=None):
+    previous = (baseline or {}).get('scenarios', {})
+    print(f"{results['database']} {results['scale']} (commit {results['commit'] or 'unknown'})")
+    print(f"{'scenario':>18} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}" + (f" {'req/s':>8} {'p99':>8} {'queries':>8}" if baseline else ''))
+    for name, result in results['scenarios'].items():
+        old = previous.get(name, {})
+        if name == 'chat_fanout':
+            rate, queries = result['deliveries_per_sec'], None
+            line = f"{name:>18} {rate:>8.0f} {result['p50_ms']:>8.1f} {'':>8} {result['p99_ms']:>8.1f} {'':>8} {'':>7}"
+            old_rate = old.get('deliveries_per_sec')
+        else:
+            rate, queries = result['requests_per_sec'], result['queries_per_request']
+            line = f"{name:>18} {rate:>8.0f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} {queries:>8.1f} {result['errors']:>7}"
+            old_rate = old.get('requests_per_sec')
+        if baseline:
+            line += f" {change(rate, old_rate):>8} {change(result['p99_ms'], old.get('p99_ms')):>8}"
+            line += f" {change(queries, old.get('queries_per_request')) if queries is not None else '':>8}"
+        print(line)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    add_scale_arguments(parser)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario (messages for chat_fanout)')
+    parser.add_argument('--warmup', type=int, default=20, help='Requests sent before measuring')
+    parser.add_argument('--room-size', type=int, default=100, help='Connections in the chat_fanout room')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare with results previously written by --output')
+    args = parser.parse_args()
+
+    with test_database():
+        results = run(args.scenarios, get_scale(args), args.requests, args.warmup, args.room_size, args.seed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -1,10 +1,23 @@
+import asyncio
 import json
+import uuid
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 from asgiref.sync import async_to_sync
 from django.utils import timezone
 
-class ChatConsumer(AsyncWebsocketConsumer):
+from courses.enrollment import ais_enrolled
+from monitoring.consumers import InstrumentedConsumerMixin
+from .models import Message
+from .history import buffer, history, message_event
+from .fanout import Outbox, encode, encode_batch, log_failure
+
+# 메시지 처리 시간은 'chat_room <메시지 종류>' 이름으로 측정
+class ChatConsumer(InstrumentedConsumerMixin, AsyncWebsocketConsumer):
+    instrumentation_route = 'chat_room'
+    joined = False
+    writer = None
+
     # 새 연결이 수신되었을때 호출
     async def connect(self):
         # self.scope['user']를 사용하여 현재 사용자를 가져오고 새로운 user 속성으로 저장 메시지를 보낸 사용자를 식별하기 위해 사용
@@ -13,15 +26,53 @@ class ChatConsumer(AsyncWebsocketConsumer):
         self.id = self.scope['url_route']['kwargs']['course_id']
         # 각 강의 채팅방에 대해 채널 그룹을 생성
         self.room_group_name = f'chat_{self.id}'
+        # 강좌에 등록된 사용자가 아니면 연결을 거부
+        if not await self.is_authorized():
+            await self.close()
+            return
         # 현재 채널에 그룹을 추가하고 그룹에 참여
         await self.channel_layer.group_add(self.room_group_name,self.channel_name)
+        self.joined = True
         # 연결 수락
         await self.accept()
-    
+        # 채팅방의 최근 메시지를 전송
+        await self.send_history()
+        # 그룹 메시지를 모아서 보내는 작업을 시작
+        self.outbox = Outbox(self.send_frame)
+        self.writer = asyncio.ensure_future(self.outbox.run())
+        self.writer.add_done_callback(log_failure)
+
+    # 캐시된 등록 여부로 사용자가 채팅방에 참여할 수 있는지 확인
+    async def is_authorized(self):
+        return self.user.is_authenticated and await ais_enrolled(self.user.id, int(self.id))
+
+    # 메모리에 유지하는 최근 메시지를 하나의 프레임으로 보낸다.
+    async def send_history(self):
+        frames = await history.join(self.id)
+        if frames:
+            await self.send_frame(encode_batch(frames))
+
+    async def send_frame(self, frame):
+        await self.send(text_data=frame)
+
     # 소켓이 닫힐 때 호출
     async def disconnect(self, close_code):
+        # 연결이 거부된 경우
+        if not self.joined:
+            return
+        if self.writer is not None:
+            self.writer.cancel()
         # 그룹에서 나가기
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        history.leave(self.id)
+        # 이 프로세스에 남은 사용자가 없으면 모아둔 메시지를 저장
+        if not history.members:
+            await buffer.flush()
+
+    # 메시지를 버퍼에 추가하여 모아서 저장
+    async def persist(self, uid, message, now):
+        if self.user.is_authenticated:
+            await buffer.add(Message(uid=uid, user_id=self.user.id, course_id=self.id, content=message, sent_on=now))
 
     # receive()는 데이터를 수신할 때마다 호출
     # WebSocket에서 메시지 수신
@@ -29,17 +80,24 @@ class ChatConsumer(AsyncWebsocketConsumer):
         text_data_json = json.loads(text_data)
         message = text_data_json['message']
         now = timezone.now()
+        uid = uuid.uuid4()
+        await self.persist(uid, message, now)
         # 메시지를 WebSocket으로 전송
         #self.send(text_data=json.dumps({'message':message}))
         # 그룹에 메시지 보내기
-        await self.channel_layer.group_send(self.room_group_name,{
-            'type' : 'chat_message', # type : 이벤트 타입, 특별한 키로 해당하는 이벤트를 받는 컨슈머에서 실행되어야 할 메서드의 이름과 일치해야한다.
-            'message' : message,
-            'user' : self.user.username, # 현재 사용자
-            'datetime' : now.isoformat(), # ISO 8601 형식으로 채널그룹에 보낼때 사용
+        # type : 이벤트 타입, 특별한 키로 해당하는 이벤트를 받는 컨슈머에서 실행되어야 할 메서드의 이름과 일치해야한다.
+        # user : 현재 사용자, datetime : ISO 8601 형식으로 채널그룹에 보낼때 사용
+        # frame : 한번만 인코딩하여 모든 컨슈머가 그대로 전송하는 메시지
+        await self.channel_layer.group_send(self.room_group_name, {
+            'type' : 'chat_message',
+            'id' : uid.hex,
+            'frame' : encode(message_event(uid, self.user.username, message, now)),
         })
-        
+
     # 그룹에서 메시지 받기
     async def chat_message(self, event):
-        # WebSocket으로 메시지 보내기
-        await self.send(text_data=json.dumps(event))
\ No newline at end of file
+        history.append(self.id, event['id'], event['frame'])
+        # 대기열에 추가하여 WebSocket으로 메시지 보내기
+        # 대기열이 가득 차고 OVERFLOW가 'disconnect'이면 연결을 종료
+        if not self.outbox.put(event['frame']):
+            await self.close(code=4008)
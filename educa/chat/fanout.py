@@ -0,0 +1,67 @@
+import asyncio
+import json
+import logging
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 그룹 이벤트는 보내는 쪽에서 한번만 JSON으로 인코딩하고
+# 각 컨슈머는 인코딩된 프레임을 그대로 재사용한다.
+
+def encode(event):
+    return json.dumps(event)
+
+# 여러 프레임을 다시 인코딩하지 않고 하나의 JSON 배열 프레임으로 합친다.
+def encode_batch(frames):
+    if len(frames) == 1:
+        return frames[0]
+    return '[' + ','.join(frames) + ']'
+
+# 연결마다 전송할 프레임을 모아두는 대기열
+# WINDOW 동안 도착한 프레임은 하나의 프레임으로 묶어서 보내고
+# 대기열이 QUEUE_LIMIT를 넘으면 OVERFLOW 설정에 따라 오래된 프레임을 버리거나 연결을 종료한다.
+class Outbox:
+    def __init__(self, send, window=None, limit=None, overflow=None):
+        config = settings.CHAT_FANOUT
+        self.send = send
+        self.window = config['WINDOW'] if window is None else window
+        self.limit = config['QUEUE_LIMIT'] if limit is None else limit
+        self.overflow = config['OVERFLOW'] if overflow is None else overflow
+        self.frames = deque()
+        self.dropped = 0
+        self.failed = 0
+        self._ready = asyncio.Event()
+
+    # 프레임을 대기열에 추가하고, 연결을 종료해야 하면 False를 반환
+    def put(self, frame):
+        if len(self.frames) >= self.limit:
+            if self.overflow == 'disconnect':
+                return False
+            self.frames.popleft()
+            self.dropped += 1
+        self.frames.append(frame)
+        self._ready.set()
+        return True
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            if self.window:
+                await asyncio.sleep(self.window)
+            self._ready.clear()
+            frames = list(self.frames)
+            self.frames.clear()
+            if frames:
+                # 전송이 실패해도 기록하고 다음 프레임을 계속 보낸다.
+                try:
+                    await self.send(encode_batch(frames))
+                except Exception:
+                    self.failed += 1
+                    logger.exception('Failed to send %d chat frames', len(frames))
+
+# 대기열 작업이 예외로 끝나면 기록 (취소된 경우는 제외)
+def log_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error('Chat outbox stopped', exc_info=task.exception())
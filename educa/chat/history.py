@@ -0,0 +1,131 @@
+import asyncio
+import atexit
+import logging
+from collections import OrderedDict, Counter
+
+from channels.db import database_sync_to_async
+
+from .models import Message
+from .fanout import encode
+
+logger = logging.getLogger(__name__)
+
+# 채팅방마다 메모리에 유지하는 최근 메시지 수
+HISTORY_SIZE = 50
+# 이 개수만큼 메시지가 모이거나 FLUSH_INTERVAL 초가 지나면 한번에 저장
+FLUSH_SIZE = 100
+FLUSH_INTERVAL = 1.0
+
+# 채팅 그룹으로 전송되는 이벤트 형식으로 변환
+def message_event(uid, user, content, sent_on):
+    return {
+        'type' : 'chat_message',
+        'id' : uid.hex,
+        'message' : content,
+        'user' : user,
+        'datetime' : sent_on.isoformat(),
+    }
+
+# 강좌의 최근 메시지를 오래된 순서로 반환
+def recent_messages(course_id, size=HISTORY_SIZE):
+    rows = Message.objects.filter(course_id=course_id).order_by('-sent_on').values_list('uid','user__username','content','sent_on')[:size]
+    return [message_event(*row) for row in reversed(rows)]
+
+# 메시지를 메모리에 모았다가 bulk_create()로 한번에 저장하는 버퍼
+# 저장은 이벤트 루프를 막지 않도록 database_sync_to_async로 별도의 스레드에서 실행된다.
+class MessageBuffer:
+    def __init__(self, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self._timer = None
+
+    async def add(self, message):
+        self.pending.append(message)
+        if len(self.pending) >= self.flush_size:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        try:
+            await database_sync_to_async(Message.objects.bulk_create)(batch)
+        except Exception:
+            logger.exception('Failed to save %d chat messages', len(batch))
+
+    # 프로세스가 종료될 때(배포, max_requests 재시작) 남은 메시지를 저장
+    # 이벤트 루프가 멈춘 뒤에 실행되므로 현재 스레드에서 바로 저장한다.
+    def flush_at_exit(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        try:
+            Message.objects.bulk_create(batch)
+        except Exception:
+            logger.exception('Failed to save %d chat messages', len(batch))
+
+# 채팅방마다 최근 메시지의 인코딩된 프레임을 제한된 크기로 유지하는 링 버퍼
+# 이 프로세스에 접속한 사용자가 있는 채팅방만 유지하고, 처음 접속할 때 데이터베이스에서 한번 불러온다.
+# 같은 메시지는 이 프로세스의 모든 컨슈머가 받으므로 메시지 id로 중복을 제거한다.
+class RoomHistory:
+    def __init__(self, size=HISTORY_SIZE):
+        self.size = size
+        self.rooms = {}
+        self.members = Counter()
+        self._loading = {}
+
+    async def join(self, room):
+        self.members[room] += 1
+        if room not in self.rooms:
+            ring = self.rooms[room] = OrderedDict()
+            self._loading[room] = asyncio.ensure_future(self._load(room, ring))
+        # 동시에 접속한 컨슈머는 하나의 불러오기 작업을 함께 기다린다.
+        if room in self._loading:
+            await asyncio.shield(self._loading[room])
+        return list(self.rooms.get(room, {}).values())
+
+    # ring - 불러오기를 시작할 때 만든 링
+    # 불러오는 동안 모두 나갔다가 다시 접속하면 새 링과 새 작업이 만들어지므로 자신의 링과 작업만 변경한다.
+    async def _load(self, room, ring):
+        try:
+            messages = await database_sync_to_async(recent_messages)(room, self.size)
+            if self.rooms.get(room) is not ring:
+                return
+            # 불러오는 동안 받은 메시지를 뒤에 합친다.
+            loaded = OrderedDict((message['id'], encode(message)) for message in messages)
+            for id, frame in ring.items():
+                loaded.setdefault(id, frame)
+            while len(loaded) > self.size:
+                loaded.popitem(last=False)
+            self.rooms[room] = loaded
+        finally:
+            if self._loading.get(room) is asyncio.current_task():
+                del self._loading[room]
+
+    def leave(self, room):
+        self.members[room] -= 1
+        if self.members[room] <= 0:
+            del self.members[room]
+            self.rooms.pop(room, None)
+
+    # 인코딩된 프레임을 메시지 id로 저장
+    def append(self, room, id, frame):
+        ring = self.rooms.get(room)
+        if ring is None or id in ring:
+            return
+        ring[id] = frame
+        if len(ring) > self.size:
+            ring.popitem(last=False)
+
+# 프로세스마다 하나의 버퍼와 링을 사용
+buffer = MessageBuffer()
+history = RoomHistory()
+
+atexit.register(buffer.flush_at_exit)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sent_on'], name='chat_messag_sent_on_fdde76_idx'),
+        ),
+    ]
@@ -1,3 +1,29 @@
+import uuid
+
 from django.db import models
+from django.contrib.auth.models import User
+
+from courses.models import Course
 
 # Create your models here.
+
+# 강좌 채팅방의 메시지
+class Message(models.Model):
+    # 메시지를 식별하기 위한 id, 채팅 그룹으로 전송되는 이벤트에도 포함된다.
+    uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, related_name='chat_messages', on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, related_name='chat_messages', on_delete=models.CASCADE)
+    content = models.TextField()
+    # 메시지는 모아서 저장하므로 저장 시간이 아닌 보낸 시간을 기록
+    sent_on = models.DateTimeField()
+
+    class Meta:
+        ordering = ['sent_on']
+        indexes = [
+            models.Index(fields=['course','-sent_on']),
+            # 하루 동안의 메시지를 집계할 때 사용 (analytics.rollup)
+            models.Index(fields=['sent_on']),
+        ]
+
+    def __str__(self):
+        return f'{self.user} on {self.course} at {self.sent_on}'
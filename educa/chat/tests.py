@@ -1,3 +1,165 @@
-from django.test import TestCase
+import asyncio
+import json
+from collections import OrderedDict
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User, AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from courses import enrollment
+from courses.models import Subject, Course
+from .consumer import ChatConsumer
+from .fanout import Outbox, encode_batch
+from .history import buffer, history
+from .models import Message
 
 # Create your tests here.
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ChatHistoryTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='student')
+        subject = Subject.objects.create(title='Programming', slug='programming')
+        self.course = Course.objects.create(owner=self.user, subject=subject, title='Python', slug='python', overview='')
+        self.course.students.add(self.user)
+
+    def tearDown(self):
+        history.rooms.clear()
+        history.members.clear()
+        history._loading.clear()
+        buffer.pending.clear()
+
+    def communicator(self, user=None):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/room/{self.course.id}/')
+        communicator.scope['user'] = user or self.user
+        communicator.scope['url_route'] = {'kwargs': {'course_id': str(self.course.id)}}
+        return communicator
+
+    @async_to_sync
+    async def test_history_is_replayed_on_reconnect(self):
+        first = self.communicator()
+        await first.connect()
+        for i in range(3):
+            await first.send_to(text_data=json.dumps({'message': f'message {i}'}))
+            await first.receive_from()
+        await first.disconnect()
+        await buffer.flush()
+
+        second = self.communicator()
+        await second.connect()
+        # 최근 메시지는 하나의 프레임으로 전송된다.
+        messages = [event['message'] for event in json.loads(await second.receive_from())]
+        self.assertEqual(messages, ['message 0', 'message 1', 'message 2'])
+        await second.disconnect()
+
+    @async_to_sync
+    async def test_messages_are_saved_in_batches(self):
+        communicator = self.communicator()
+        await communicator.connect()
+        for i in range(5):
+            await communicator.send_to(text_data=json.dumps({'message': f'message {i}'}))
+            await communicator.receive_from()
+        self.assertEqual(len(buffer.pending), 5)
+        await communicator.disconnect()
+        self.assertEqual(await Message.objects.filter(course=self.course).acount(), 5)
+
+    # 프로세스가 종료될 때 남은 메시지를 저장한다.
+    def test_pending_messages_are_saved_at_exit(self):
+        buffer.pending.append(Message(user=self.user, course=self.course, content='bye', sent_on=timezone.now()))
+        buffer.flush_at_exit()
+        self.assertEqual(buffer.pending, [])
+        self.assertTrue(Message.objects.filter(content='bye').exists())
+
+
+    @async_to_sync
+    async def test_only_enrolled_users_can_connect(self):
+        other = await User.objects.acreate(username='other')
+        connected, _ = await self.communicator(other).connect()
+        self.assertFalse(connected)
+        connected, _ = await self.communicator(AnonymousUser()).connect()
+        self.assertFalse(connected)
+
+        # 등록하면 캐시가 삭제되어 바로 참여할 수 있다.
+        await self.course.students.aadd(other)
+        communicator = self.communicator(other)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.disconnect()
+
+    # 커밋 전에 다른 연결이 커밋 전의 등록 정보를 캐시에 저장해도 커밋된 뒤에는 참여할 수 있다.
+    @async_to_sync
+    async def test_connect_after_enrollment_commits(self):
+        other = await User.objects.acreate(username='other')
+
+        @sync_to_async
+        def enroll():
+            with transaction.atomic():
+                self.course.students.add(other)
+                cache.set(enrollment.enrolled_key(other.id), frozenset(), enrollment.ENROLLED_TIMEOUT)
+        await enroll()
+        communicator = self.communicator(other)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.disconnect()
+
+
+    # 불러오는 동안 나갔다가 다시 접속하면 먼저 시작한 불러오기는 새 링과 새 작업을 변경하지 않는다.
+    @async_to_sync
+    async def test_stale_load_keeps_new_join_state(self):
+        room = self.course.id
+        ring = history.rooms[room] = OrderedDict()
+        loading = history._loading[room] = asyncio.get_running_loop().create_future()
+        await asyncio.ensure_future(history._load(room, OrderedDict()))
+        self.assertIs(history.rooms[room], ring)
+        self.assertIs(history._loading[room], loading)
+
+
+    @async_to_sync
+    async def test_burst_is_coalesced_into_one_frame(self):
+        communicator = self.communicator()
+        await communicator.connect()
+        for i in range(3):
+            await communicator.send_to(text_data=json.dumps({'message': f'message {i}'}))
+        frame = json.loads(await communicator.receive_from())
+        self.assertEqual([event['message'] for event in frame], ['message 0', 'message 1', 'message 2'])
+        await communicator.disconnect()
+
+
+class OutboxTest(SimpleTestCase):
+    def test_overflow_policies(self):
+        outbox = Outbox(send=None, limit=2, overflow='drop')
+        for frame in ('1', '2', '3'):
+            self.assertTrue(outbox.put(frame))
+        self.assertEqual(list(outbox.frames), ['2', '3'])
+        self.assertEqual(outbox.dropped, 1)
+
+        outbox = Outbox(send=None, limit=2, overflow='disconnect')
+        self.assertTrue(outbox.put('1'))
+        self.assertTrue(outbox.put('2'))
+        self.assertFalse(outbox.put('3'))
+
+    # 전송이 실패하면 기록하고 다음 프레임을 계속 보낸다.
+    @async_to_sync
+    async def test_failed_send_is_logged(self):
+        sent = []
+        async def send(frame):
+            if frame == '1':
+                raise ConnectionError
+            sent.append(frame)
+        outbox = Outbox(send=send, window=0)
+        writer = asyncio.ensure_future(outbox.run())
+        with self.assertLogs('chat.fanout', 'ERROR'):
+            outbox.put('1')
+            await asyncio.sleep(0.01)
+        outbox.put('2')
+        await asyncio.sleep(0.01)
+        writer.cancel()
+        self.assertEqual((outbox.failed, sent), (1, ['2']))
+
+    def test_batch_reuses_encoded_frames(self):
+        self.assertEqual(encode_batch(['{"a": 1}']), '{"a": 1}')
+        self.assertEqual(json.loads(encode_batch(['{"a": 1}', '{"a": 2}'])), [{'a': 1}, {'a': 2}])
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Subject, Course, Module
+from .models import Subject, Course, Module, ApiToken
 
 # Register your models here.
 
@@ -17,4 +17,15 @@ class CourseAdmin(admin.ModelAdmin):
     list_display = ['title','subject','created']
     list_filter = ['created','subject']
     search_fields = ['title','overview']
-    prepopulated_fields = {'slug':('title',)}
\ No newline at end of file
+    prepopulated_fields = {'slug':('title',)}
+
+# 토큰을 삭제하면 폐기된다. 토큰 원문은 저장하지 않으므로 발급은 API에서만 한다.
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ['user','name','created','expires']
+    list_filter = ['created']
+    search_fields = ['user__username','name']
+    readonly_fields = ['user','digest','name','expires']
+
+    def has_add_permission(self, request):
+        return False
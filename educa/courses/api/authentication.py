@@ -0,0 +1,25 @@
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from ..tokens import InvalidToken, get_token_user
+
+# Authorization: Token <토큰> 헤더로 인증
+# request.auth 에는 인증에 사용한 ApiToken의 id가 설정된다.
+class TokenAuthentication(BaseAuthentication):
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid token header.')
+        try:
+            return get_token_user(auth[1].decode())
+        except UnicodeError:
+            raise AuthenticationFailed('Invalid token header.')
+        except InvalidToken as e:
+            raise AuthenticationFailed(str(e))
+
+    def authenticate_header(self, request):
+        return self.keyword
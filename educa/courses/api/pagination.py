@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+# 커서 기반 페이지네이션 ?cursor= 매개변수로 다음 페이지를 가져온다.
+# page_size 매개변수로 페이지 크기를 지정할 수 있다.
+class CourseCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created','-id')
+
+class SubjectCursorPagination(CourseCursorPagination):
+    ordering = ('title','id')
+
+
+# 검색 결과는 순위 순서이므로 페이지 번호로 나눈다.
+class SearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,6 +1,8 @@
 from rest_framework.permissions import BasePermission
 
+from ..enrollment import is_enrolled
+
 class IsEnrolled(BasePermission):
-    # 요청을 수행하는 사용자가 Course 객체의 students 관계에 있는지 확인
+    # 요청을 수행하는 사용자가 Course 객체의 students 관계에 있는지 캐시된 등록 강좌 집합에서 확인
     def has_object_permission(self, request, view, obj):
-        return obj.students.filter(id=request.user.id).exists()
\ No newline at end of file
+        return is_enrolled(request.user.id, obj.id)
\ No newline at end of file
@@ -1,10 +1,30 @@
 from rest_framework import serializers
 
+from monitoring.budget import QueryBudgetSerializerMixin
+
 from ..models import Subject, Course, Module, Content
 
+# ?fields=id,title 처럼 요청된 필드 이름 목록을 반환, 지정하지 않으면 None
+def requested_fields(request):
+    fields = request.query_params.get('fields') if request is not None else None
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
+# 요청의 fields 매개변수에 포함된 필드만 직렬화하는 믹스인
+class SparseFieldsMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
 # 시리얼 라이저는 Django의 Form 및 ModelForm클래스와 유사한 방식으로 정의
 # fields 속성을 설정하지 않으면 모든 필드가 포함된다.
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(QueryBudgetSerializerMixin, serializers.ModelSerializer):
+    query_budget = 0
+
     class Meta:
         model = Subject
         fields = ['id','title','slug']
@@ -15,7 +35,9 @@ class ModuleSerializer(serializers.ModelSerializer):
         model = Module
         fields = ['order','title','description']
         
-class CourseSerializer(serializers.ModelSerializer):
+# 모듈은 뷰에서 prefetch 하므로 강좌마다 쿼리를 실행하지 않는다.
+class CourseSerializer(QueryBudgetSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    query_budget = 0
     # 모듈 시리얼라이저를 중첩
     # many =True 는 여러 객체를 직렬화하는 것을 나타낸다
     # read_only = True 는 이 필드는 읽기 전용이며 객체를 생성하거나 업데이트하는데 사용되지 않아야함을 나타낸다.
@@ -25,7 +47,13 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = ['id','subject','title','slug','overview','created','owner','modules']
         
 class ItemRelatedField(serializers.RelatedField):
+    # 컨텍스트에 미리 렌더링된 HTML이 있으면 사용하고 없으면 아이템을 직접 렌더링
     def to_representation(self, value):
+        rendered = self.context.get('rendered_items')
+        if rendered is not None:
+            key = (value._meta.model_name, value.pk)
+            if key in rendered:
+                return rendered[key]
         return value.render()
 
 class ContentSerializer(serializers.ModelSerializer):
@@ -42,9 +70,42 @@ class ModuleWithContentsSerializer(serializers.ModelSerializer):
         model = Module
         fields = ['order','title','description','contents']
 
-class CourseWithContentsSerializer(serializers.ModelSerializer):
+# 모듈, 콘텐츠, 아이템과 렌더링된 HTML은 뷰에서 한번에 가져온다.
+class CourseWithContentsSerializer(QueryBudgetSerializerMixin, serializers.ModelSerializer):
+    query_budget = 0
     modules = ModuleWithContentsSerializer(many=True)
 
     class Meta:
         model = Course
-        fields = ['id','subject','title','slug','overview','created','owner','modules']
\ No newline at end of file
+        fields = ['id','subject','title','slug','overview','created','owner','modules']
+
+# 일괄 등록 요청
+# courses - 요청한 사용자를 등록할 강좌 id 목록
+# course, users - 강사가 자신의 강좌에 등록할 사용자 id 목록
+class BulkEnrollSerializer(serializers.Serializer):
+    MAX_IDS = 10000
+
+    courses = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=MAX_IDS)
+    course = serializers.IntegerField(required=False)
+    users = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=MAX_IDS)
+
+    def validate(self, data):
+        if 'courses' in data:
+            if 'course' in data or 'users' in data:
+                raise serializers.ValidationError('Send either "courses" or "course" with "users".')
+        elif 'course' not in data or 'users' not in data:
+            raise serializers.ValidationError('Send either "courses" or "course" with "users".')
+        return data
+
+# 진도 이벤트
+# viewed - 본 콘텐츠 id 목록, completed - 완료한 콘텐츠 id 목록
+class ProgressEventSerializer(serializers.Serializer):
+    MAX_IDS = 1000
+
+    viewed = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=MAX_IDS)
+    completed = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=MAX_IDS)
+
+    def validate(self, data):
+        if not data.get('viewed') and not data.get('completed'):
+            raise serializers.ValidationError('Send "viewed" or "completed" content ids.')
+        return data
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path,include
 from rest_framework import routers
 
@@ -10,6 +11,17 @@ app_name = 'courses'
 urlpatterns = [
     path('subjects/', views.SubjectListView.as_view(), name='subject_list'),
     path('subjects/<pk>/', views.SubjectDetailView.as_view(), name='subject_detail'),
+    path('token/', views.TokenView.as_view(), name='token'),
     # path('courses/<pk>/enroll/', views.CourseEnrollView.as_view(), name='courses_enroll'),
+]
+
+# ASGI 서버에서는 강좌 목록과 상세를 비동기 뷰로 처리 (나머지 동작은 라우터의 CourseViewSet)
+if settings.ASYNC_VIEWS:
+    urlpatterns += [
+        path('courses/', views.AsyncCourseListView.as_view()),
+        path('courses/<int:pk>/', views.AsyncCourseDetailView.as_view()),
+    ]
+
+urlpatterns += [
     path('', include(router.urls))
 ]
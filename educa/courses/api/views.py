@@ -1,26 +1,70 @@
-from rest_framework import generics, viewsets
+from rest_framework import generics, viewsets, status
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse, HttpResponse, Http404
+from django.views import generic
+from rest_framework.request import Request
+from rest_framework.renderers import JSONRenderer
 from django.shortcuts import get_object_or_404
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.authentication import BasicAuthentication
+from rest_framework.authentication import SessionAuthentication, BasicAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from monitoring.budget import QueryBudgetMixin
 
-from ..models import Subject, Course
-from .serializers import SubjectSerializer, CourseSerializer, CourseWithContentsSerializer
+from ..models import Subject, Course, Content
+from ..loaders import with_contents, render_course_items
+from ..enrollment import enroll_users, enroll_courses
+from ..search import search as search_courses
+from ..transfer import iter_archive, import_course, TransferError
+from ..tokens import create_token, revoke_token
+from .serializers import SubjectSerializer, CourseSerializer, CourseWithContentsSerializer, BulkEnrollSerializer, ProgressEventSerializer, requested_fields
+from .pagination import CourseCursorPagination, SubjectCursorPagination, SearchPagination
 from .permissions import IsEnrolled
+from .authentication import TokenAuthentication
+from students import progress
+from analytics.rollup import course_stats
 
-class SubjectListView(generics.ListAPIView):
+# 인증이 필요한 동작의 인증 클래스
+# 클라이언트는 토큰(Authorization: Token ...)을 사용하고 BasicAuthentication은 토큰을 발급받을 때만 사용하는 것을 권장
+# BasicAuthentication은 요청마다 비밀번호 해시(PBKDF2)를 계산하므로 CPU 비용이 크다.
+API_AUTHENTICATION = [TokenAuthentication, SessionAuthentication, BasicAuthentication]
+
+class SubjectListView(QueryBudgetMixin, generics.ListAPIView):
+    query_budget = 3
     # 객체를 검색하기 위해 사용할 기본 QuerySet
     queryset = Subject.objects.all()
     # 객체를 직렬화 하기 위한 클래스
     serializer_class = SubjectSerializer
+    pagination_class = SubjectCursorPagination
 
-class SubjectDetailView(generics.RetrieveAPIView):
+class SubjectDetailView(QueryBudgetMixin, generics.RetrieveAPIView):
+    query_budget = 3
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     
 
+# API 토큰 발급과 폐기
+# POST - 사용자 이름과 비밀번호(BasicAuthentication) 또는 세션으로 인증하고 새 토큰을 발급 (name - 토큰 이름, 선택)
+# DELETE - 요청에 사용한 토큰을 폐기
+class TokenView(QueryBudgetMixin, APIView):
+    query_budget = {'post': 3, 'delete': 3}
+    authentication_classes = API_AUTHENTICATION
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        token, api_token = create_token(request.user, request.data.get('name', ''))
+        return Response({'token': token, 'expires': api_token.expires}, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, format=None):
+        if not isinstance(request.successful_authenticator, TokenAuthentication):
+            raise ValidationError('Only token authenticated requests can revoke their token.')
+        revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # class CourseEnrollView(APIView):
 #     # 인증클래스 - 사용자는 HTTP 요청의 인증 헤더에 설정된 자격 증명으로 식별
 #     authentication_classes = [BasicAuthentication]
@@ -35,19 +79,169 @@ class SubjectDetailView(generics.RetrieveAPIView):
 #         return Response({'enrolled':True})
     
 # ReadOnlyModelViewSet 는 list() 와 retrieve()를 통해 객체 목록을 가져오거나 단일 객체를 검색하는 읽기 전용 동작
-class CourseViewSet(viewsets.ReadOnlyModelViewSet):
+class CourseViewSet(QueryBudgetMixin, viewsets.ReadOnlyModelViewSet):
+    # import_archive는 가져오는 강좌의 크기에 비례하므로 확인하지 않는다.
+    query_budget = {'list': 3, 'retrieve': 3, 'search': 4, 'enroll': 5, 'bulk_enroll': 8, 'export': 3, 'contents': 12, 'progress': 5, 'progress_summary': 4, 'analytics': 4}
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    pagination_class = CourseCursorPagination
     
     # 데코레이터를 사용하여 추가 동작을 정의 detail=True 매개변수를 사용하여 이 동작을 단일 객체에 대해 수행되는 동작임을 지정
     # 이 동작에는 post() 메서드만 허용되며 인증 및 권한 클래스를 설정
-    @action(detail=True, methods=['post'], authentication_classes=[BasicAuthentication], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post'], authentication_classes=API_AUTHENTICATION, permission_classes=[IsAuthenticated])
     def enroll(self, request, *args, **kwargs):
         # self.get_object()를 사용하여 Course 객체를 가져온다.
         course = self.get_object()
         course.students.add(request.user)
         return Response({'enrolled':True})
+
+    # 여러 강좌에 한번에 등록하거나, 강사가 자신의 강좌에 여러 사용자를 한번에 등록
+    # 중간 테이블에 bulk_create()로 추가하므로 요청 1번으로 처리된다.
+    @action(detail=False, methods=['post'], url_path='enroll', serializer_class=BulkEnrollSerializer, authentication_classes=API_AUTHENTICATION, permission_classes=[IsAuthenticated])
+    def bulk_enroll(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if 'courses' in data:
+            enrolled = enroll_courses(request.user, data['courses'])
+            return Response({'enrolled':sorted(enrolled)})
+
+        course = get_object_or_404(Course, id=data['course'])
+        if course.owner_id != request.user.id:
+            raise PermissionDenied('Only the course owner can enroll other users.')
+        enrolled = enroll_users(course, data['users'])
+        return Response({'enrolled':sorted(enrolled)})
     
-    @action(detail=True,methods=['get'], serializer_class= CourseWithContentsSerializer, authentication_classes=[BasicAuthentication],permission_classes=[IsAuthenticated,IsEnrolled])
+    def get_queryset(self):
+        qs = super().get_queryset()
+        # contents 동작은 모듈, 콘텐츠, 아이템을 일괄로 가져와 N+1 쿼리를 방지
+        if self.action == 'contents':
+            qs = with_contents(qs)
+        elif self.action in ('list','retrieve','search'):
+            # ?fields= 로 modules를 제외하면 모듈을 가져오지 않는다.
+            fields = requested_fields(self.request)
+            if fields is None or 'modules' in fields:
+                qs = qs.prefetch_related('modules')
+        return qs
+
+    # 강좌 제목과 개요, 모듈, 텍스트 콘텐츠를 검색하여 순위 순서대로 반환
+    # ?q=검색어&page=2
+    @action(detail=False, methods=['get'])
+    def search(self, request, *args, **kwargs):
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(search_courses(request.query_params.get('q', '')), request, view=self)
+        courses = self.get_queryset().in_bulk([course_id for course_id, rank in page])
+        results = []
+        for course_id, rank in page:
+            if course_id in courses:
+                data = self.get_serializer(courses[course_id]).data
+                data['rank'] = rank
+                results.append(data)
+        return paginator.get_paginated_response(results)
+
+    # 강좌를 모듈, 콘텐츠, 미디어 파일과 함께 tar 파일로 내보낸다. 강좌를 만든 강사만 사용할 수 있다.
+    @action(detail=True, methods=['get'], authentication_classes=API_AUTHENTICATION, permission_classes=[IsAuthenticated])
+    def export(self, request, *args, **kwargs):
+        course = get_object_or_404(Course.objects.select_related('subject'), pk=kwargs['pk'])
+        if course.owner_id != request.user.id:
+            raise PermissionDenied('Only the course owner can export the course.')
+        response = StreamingHttpResponse(iter_archive(course), content_type='application/x-tar')
+        response['Content-Disposition'] = f'attachment; filename="{course.slug}.tar"'
+        return response
+
+    # export 로 내보낸 tar 파일(archive)을 요청한 강사의 새 강좌로 가져온다.
+    # slug를 지정하면 내보낸 강좌의 slug 대신 사용
+    # COURSE_IMPORT_MAX_SIZE 보다 큰 아카이브는 받지 않는다. (import_course 명령 사용)
+    @action(detail=False, methods=['post'], url_path='import', authentication_classes=API_AUTHENTICATION, permission_classes=[IsAuthenticated])
+    def import_archive(self, request, *args, **kwargs):
+        if not request.user.has_perm('courses.add_course'):
+            raise PermissionDenied('You do not have permission to create courses.')
+        archive = request.FILES.get('archive')
+        if archive is None:
+            raise ValidationError({'archive': 'This field is required.'})
+        if archive.size > settings.COURSE_IMPORT_MAX_SIZE:
+            raise ValidationError({'archive': f'Archives larger than {settings.COURSE_IMPORT_MAX_SIZE} bytes must be imported with the import_course command.'})
+        try:
+            course = import_course(archive, request.user, slug=request.data.get('slug') or None)
+        except TransferError as e:
+            raise ValidationError({'archive': str(e)})
+        return Response({'id': course.id, 'slug': course.slug, 'modules': course.num_modules}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True,methods=['get'], serializer_class= CourseWithContentsSerializer, authentication_classes=API_AUTHENTICATION,permission_classes=[IsAuthenticated,IsEnrolled])
     def contents(self, request, *args, **kwargs):
-        return self.retrieve(request, *args, **kwargs)
\ No newline at end of file
+        course = self.get_object()
+        # 모든 아이템을 한번에 렌더링하고 시리얼라이저 컨텍스트로 전달
+        context = self.get_serializer_context()
+        context['rendered_items'] = render_course_items(course)
+        serializer = self.get_serializer_class()(course, context=context)
+        return Response(serializer.data)
+
+    # 요청한 학생의 강좌 진도
+    # GET - 본 콘텐츠와 완료한 콘텐츠의 id 목록, 완료 비율
+    # POST - 콘텐츠를 보거나 완료한 이벤트를 기록 (모아두었다가 한번에 저장하므로 202를 반환)
+    @action(detail=True, methods=['get','post'], serializer_class=ProgressEventSerializer, authentication_classes=API_AUTHENTICATION, permission_classes=[IsAuthenticated,IsEnrolled])
+    def progress(self, request, *args, **kwargs):
+        course = self.get_object()
+        if request.method == 'GET':
+            return Response(progress.student_progress(request.user.id, course.id))
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        viewed, completed = serializer.validated_data.get('viewed', []), serializer.validated_data.get('completed', [])
+        # 강좌에 포함된 콘텐츠만 기록
+        indices = dict(Content.objects.filter(module__course=course, id__in=set(viewed) | set(completed)).values_list('id','progress_index'))
+        progress.record(request.user.id, course.id, [indices[id] for id in viewed if id in indices])
+        progress.record(request.user.id, course.id, [indices[id] for id in completed if id in indices], completed=True)
+        return Response({'recorded': len(indices)}, status=status.HTTP_202_ACCEPTED)
+
+    # 강좌의 진도 요약 - 등록된 학생 수, 평균 완료 비율, 모두 완료한 학생 수, 콘텐츠마다 보거나 완료한 학생 수
+    # 강좌를 만든 강사만 사용할 수 있다.
+    @action(detail=True, methods=['get'], url_path='progress/summary', authentication_classes=API_AUTHENTICATION, permission_classes=[IsAuthenticated])
+    def progress_summary(self, request, *args, **kwargs):
+        course = self.get_object()
+        if course.owner_id != request.user.id:
+            raise PermissionDenied('Only the course owner can see the progress summary.')
+        return Response(progress.course_summary(course))
+
+    # 강좌의 최근 통계 - 날짜별 학생 수와 채팅 활동, 모듈별 콘텐츠 수 (rollup_analytics 명령으로 집계한 값)
+    # 강좌를 만든 강사만 사용할 수 있다.
+    @action(detail=True, methods=['get'], authentication_classes=API_AUTHENTICATION, permission_classes=[IsAuthenticated])
+    def analytics(self, request, *args, **kwargs):
+        course = self.get_object()
+        if course.owner_id != request.user.id:
+            raise PermissionDenied('Only the course owner can see the course analytics.')
+        return Response(course_stats(course.id))
+
+
+# ASGI 서버(settings.ASYNC_VIEWS)에서 사용하는 강좌 목록/상세 API
+# 응답은 CourseViewSet의 list, retrieve와 같다. 읽기 전용이므로 인증 없이 사용할 수 있다.
+class AsyncCourseAPIMixin:
+    def get_queryset(self, request):
+        qs = Course.objects.all()
+        fields = requested_fields(request)
+        if fields is None or 'modules' in fields:
+            qs = qs.prefetch_related('modules')
+        return qs
+
+    def render_json(self, data):
+        return HttpResponse(JSONRenderer().render(data), content_type='application/json')
+
+class AsyncCourseListView(QueryBudgetMixin, AsyncCourseAPIMixin, generic.View):
+    query_budget = 3
+    async def get(self, request):
+        request = Request(request)
+        paginator = CourseCursorPagination()
+        # DRF의 커서 페이지네이션은 동기 API이므로 스레드에서 실행
+        page = await sync_to_async(paginator.paginate_queryset)(self.get_queryset(request), request)
+        data = CourseSerializer(page, many=True, context={'request': request}).data
+        return self.render_json(paginator.get_paginated_response(data).data)
+
+class AsyncCourseDetailView(QueryBudgetMixin, AsyncCourseAPIMixin, generic.View):
+    query_budget = 3
+    async def get(self, request, pk):
+        request = Request(request)
+        try:
+            course = await self.get_queryset(request).aget(pk=pk)
+        except Course.DoesNotExist:
+            raise Http404
+        return self.render_json(CourseSerializer(course, context={'request': request}).data)
@@ -0,0 +1,198 @@
+import asyncio
+import time
+
+from django.core.cache import cache
+
+from .models import Subject, Course
+from .pagination import keyset_paginate, akeyset_paginate, decode_cursor
+
+# 강좌 목록 캐시
+# QuerySet 대신 실제 행(딕셔너리 리스트)을 저장하고
+# 세대(generation) 번호를 키에 포함하여 Course, Module, Subject가 변경되면 세대를 올려 전체를 무효화한다.
+
+GENERATION_KEY = 'catalog:generation'
+HITS_KEY = 'catalog:hits'
+MISSES_KEY = 'catalog:misses'
+CATALOG_TIMEOUT = 60 * 60
+# 하나의 요청만 다시 계산하도록 잠금을 유지하는 시간
+LOCK_TIMEOUT = 10
+# 다른 요청이 계산하는 동안 기다리는 최대 시간과 확인 간격
+WAIT_TIMEOUT = 2
+WAIT_INTERVAL = 0.05
+COURSES_PER_PAGE = 20
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # 세대 키가 제거된 경우 이전 세대와 겹치지 않도록 현재 시간으로 시작
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+# 세대 번호를 올려 저장된 모든 목록을 무효화
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+def get_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+# 캐시된 값을 반환하고 없으면 compute()를 실행하여 저장
+# 캐시가 비었을 때 동시에 들어온 요청이 모두 다시 계산하지 않도록 하나의 요청만 잠금을 얻어 계산하고
+# 나머지 요청은 계산된 값이 저장될 때까지 기다린다.
+def get_or_compute(name, compute):
+    key = f'catalog:{get_generation()}:{name}'
+    value = cache.get(key)
+    if value is not None:
+        _count(HITS_KEY)
+        return value
+    _count(MISSES_KEY)
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, value, CATALOG_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    # 잠금을 가진 요청이 끝나지 않으면 직접 계산
+    return compute()
+
+def _subject_queryset():
+    return Subject.objects.values('id','title','slug','num_courses')
+
+def _subject_rows():
+    return list(_subject_queryset())
+
+COURSE_FIELDS = ('id','title','slug','created','num_modules','subject__title','subject__slug','owner__first_name','owner__last_name')
+
+def _course_queryset():
+    return Course.objects.values(*COURSE_FIELDS)
+
+def _course_row(row):
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'slug': row['slug'],
+        'created': row['created'],
+        'num_modules': row['num_modules'],
+        'subject': {'title': row['subject__title'], 'slug': row['subject__slug']},
+        'owner_name': f"{row['owner__first_name']} {row['owner__last_name']}".strip(),
+    }
+
+# 강좌 목록의 한 페이지를 행과 다음 페이지 커서로 반환
+def _course_page(subject_id, cursor, page_size):
+    page = keyset_paginate(_subject_courses(subject_id), cursor, page_size)
+    return {'courses': [_course_row(row) for row in page], 'next_cursor': page.next_cursor}
+
+def _subject_courses(subject_id):
+    qs = _course_queryset()
+    if subject_id is not None:
+        qs = qs.filter(subject_id=subject_id)
+    return qs
+
+# 주어진 id 순서대로 강좌 행을 반환 (검색 결과처럼 캐시하지 않는 목록에 사용)
+def course_rows(ids):
+    rows = {row['id']: row for row in _course_queryset().filter(id__in=ids)}
+    return [_course_row(rows[id]) for id in ids if id in rows]
+
+# 강좌 수가 포함된 모든 주제 목록
+def get_subjects():
+    return get_or_compute('subjects', _subject_rows)
+
+# 모듈 수가 포함된 강좌 목록의 한 페이지, subject_id가 주어지면 해당 주제의 강좌만 반환
+def get_courses(subject_id=None, cursor=None, page_size=COURSES_PER_PAGE):
+    # 잘못된 커서는 첫 페이지와 같은 키를 사용
+    if cursor and decode_cursor(cursor) is None:
+        cursor = None
+    return get_or_compute(_courses_name(subject_id, cursor, page_size), lambda: _course_page(subject_id, cursor, page_size))
+
+def _courses_name(subject_id, cursor, page_size):
+    name = 'courses:all' if subject_id is None else f'courses:subject:{subject_id}'
+    return f'{name}:{page_size}:{cursor or ""}'
+
+
+# 비동기 뷰에서 사용하는 버전
+# 같은 캐시 키를 사용하며 캐시와 ORM의 비동기 API로 이벤트 루프를 막지 않는다.
+
+async def aget_generation():
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, time.time_ns(), None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+async def _acount(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        await cache.aincr(key)
+
+# compute - 값을 계산하는 코루틴 함수
+async def aget_or_compute(name, compute):
+    key = f'catalog:{await aget_generation()}:{name}'
+    value = await cache.aget(key)
+    if value is not None:
+        await _acount(HITS_KEY)
+        return value
+    await _acount(MISSES_KEY)
+
+    lock_key = f'{key}:lock'
+    if await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = await compute()
+            await cache.aset(key, value, CATALOG_TIMEOUT)
+        finally:
+            await cache.adelete(lock_key)
+        return value
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(WAIT_INTERVAL)
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+    return await compute()
+
+async def _asubject_rows():
+    return [row async for row in _subject_queryset()]
+
+async def _acourse_page(subject_id, cursor, page_size):
+    page = await akeyset_paginate(_subject_courses(subject_id), cursor, page_size)
+    return {'courses': [_course_row(row) for row in page], 'next_cursor': page.next_cursor}
+
+async def acourse_rows(ids):
+    rows = {row['id']: row async for row in _course_queryset().filter(id__in=ids)}
+    return [_course_row(rows[id]) for id in ids if id in rows]
+
+async def aget_subjects():
+    return await aget_or_compute('subjects', _asubject_rows)
+
+async def aget_courses(subject_id=None, cursor=None, page_size=COURSES_PER_PAGE):
+    if cursor and decode_cursor(cursor) is None:
+        cursor = None
+    return await aget_or_compute(_courses_name(subject_id, cursor, page_size), lambda: _acourse_page(subject_id, cursor, page_size))
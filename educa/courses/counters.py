@@ -0,0 +1,39 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# 목록 페이지에서 매번 Count()로 집계하지 않도록 유지하는 카운터 컬럼
+# (모델 이름, 카운터 필드, 관련 모델 이름, 관련 모델에서 이 모델을 가리키는 필드)
+COUNTERS = [
+    ('Subject', 'num_courses', 'Course', 'subject'),
+    ('Course', 'num_modules', 'Module', 'course'),
+    ('Module', 'num_contents', 'Content', 'module'),
+]
+
+def increment(queryset, field, amount=1):
+    if amount:
+        queryset.update(**{field: F(field) + amount})
+
+def decrement(queryset, field, amount=1):
+    if amount:
+        queryset.filter(**{f'{field}__gte': amount}).update(**{field: F(field) - amount})
+
+def _actual(related, related_field):
+    counts = related.objects.filter(**{related_field: OuterRef('pk')}).order_by().values(related_field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), Value(0))
+
+# 실제 개수와 다른 카운터를 수정하고 모델별로 수정한 행의 수를 반환
+# get_model - 모델 이름으로 모델을 반환하는 함수 (마이그레이션에서는 과거 모델을 사용)
+def reconcile(get_model):
+    fixed = {}
+    for model_name, field, related_name, related_field in COUNTERS:
+        model = get_model(model_name)
+        actual = _actual(get_model(related_name), related_field)
+        fixed[f'{model_name}.{field}'] = model.objects.annotate(actual=actual).exclude(**{field: F('actual')}).update(**{field: actual})
+
+    # 등록된 학생 수는 Course.students 의 중간 테이블에서 계산
+    Course = get_model('Course')
+    Enrollment = Course.students.through
+    counts = Enrollment.objects.filter(course_id=OuterRef('pk')).order_by().values('course_id').annotate(count=Count('pk')).values('count')
+    actual = Coalesce(Subquery(counts), Value(0))
+    fixed['Course.num_students'] = Course.objects.annotate(actual=actual).exclude(num_students=F('actual')).update(num_students=actual)
+    return fixed
@@ -0,0 +1,164 @@
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+
+from .models import Image, ImageDerivative
+
+logger = logging.getLogger(__name__)
+
+# 이미지 콘텐츠의 파생 이미지
+# 이미지가 저장되면 백그라운드 스레드에서 IMAGE_DERIVATIVES['WIDTHS'] 너비로 줄인 이미지를 만들고
+# 원본과 파생 이미지의 크기를 기록한다. 템플릿은 srcset으로 브라우저가 필요한 너비를 고르게 한다.
+# 파생 이미지가 없거나 파일이 사라진 경우에는 image_derivative 뷰에서 다시 만든다.
+# 백그라운드 작업자와 뷰는 같은 잠금을 잡으므로 한 이미지를 동시에 만들지 않는다.
+
+# 다시 만드는 동안 유지하는 잠금 시간과 다른 요청이 기다리는 최대 시간
+LOCK_TIMEOUT = 60
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+
+def get_setting(name):
+    return settings.IMAGE_DERIVATIVES[name]
+
+# 원본보다 큰 너비는 원본 너비로 한번만 만든다.
+def target_widths(original_width):
+    return sorted({min(width, original_width) for width in get_setting('WIDTHS')}, reverse=True)
+
+def _encode(image, fmt, quality):
+    if image.mode not in ('RGB','RGBA'):
+        image = image.convert('RGBA' if image.mode in ('P','LA','PA') else 'RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+def _is_missing(derivative):
+    return not derivative.file or not derivative.file.storage.exists(derivative.file.name)
+
+# 원본 파일에서 없는 파생 이미지를 만들고 원본이 바뀐 이전 파생 이미지를 삭제
+# 큰 너비부터 만들고 작은 너비는 앞에서 줄인 이미지를 다시 줄여서 만든다.
+def generate(image):
+    fmt = get_setting('FORMAT')
+    for stale in image.derivatives.exclude(format=fmt, source=image.file.name):
+        stale.file.delete(save=False)
+        stale.delete()
+    existing = {derivative.width: derivative for derivative in image.derivatives.all()}
+
+    with image.file.open('rb') as f:
+        original = ImageOps.exif_transpose(PILImage.open(f))
+        original.load()
+    widths = target_widths(original.width)
+    missing = {width for width in widths if width not in existing or _is_missing(existing[width])}
+    if missing:
+        extension = fmt.lower()
+        resized = original
+        for width in widths:
+            if width != resized.width:
+                resized = resized.resize((width, max(1, round(original.height * width / original.width))), PILImage.LANCZOS)
+            if width not in missing:
+                continue
+            derivative = existing.get(width) or ImageDerivative(image=image, format=fmt, width=width)
+            if derivative.file:
+                derivative.file.delete(save=False)
+            derivative.source = image.file.name
+            derivative.height = resized.height
+            derivative.file.save(f'{image.id}-{width}.{extension}', ContentFile(_encode(resized, fmt, get_setting('QUALITY'))), save=False)
+            derivative.save()
+
+    # 렌더링된 HTML이 다시 만들어지도록 updated도 변경 (post_save 시그널은 보내지 않는다)
+    if missing or (image.width, image.height) != original.size:
+        image.width, image.height = original.size
+        image.updated = timezone.now()
+        Image.objects.filter(id=image.id).update(width=image.width, height=image.height, updated=image.updated)
+    return list(image.derivatives.all())
+
+def lock_key(image_id):
+    return f'image-derivative:{image_id}'
+
+# 백그라운드 작업자에서 만든다. image_derivative 뷰에서 같은 이미지를 만들고 있으면 건너뛴다.
+def _generate_by_id(image_id):
+    image = Image.objects.filter(id=image_id).first()
+    if image is None or not image.file:
+        return
+    lock = lock_key(image_id)
+    if not cache.add(lock, 1, LOCK_TIMEOUT):
+        return
+    try:
+        generate(image)
+    except (OSError, UnidentifiedImageError):
+        logger.exception('Could not create derivatives for image %s', image_id)
+    finally:
+        cache.delete(lock)
+
+
+# 백그라운드 작업자
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=get_setting('WORKERS'), thread_name_prefix='image-derivatives')
+    return _executor
+
+def _work(image_ids):
+    try:
+        for image_id in image_ids:
+            _generate_by_id(image_id)
+    finally:
+        # 작업자 스레드의 데이터베이스 연결을 닫는다.
+        connections.close_all()
+
+def _submit(image_ids):
+    if get_setting('WORKERS'):
+        _get_executor().submit(_work, image_ids)
+    else:
+        for image_id in image_ids:
+            _generate_by_id(image_id)
+
+# 트랜잭션이 커밋된 뒤에 파생 이미지를 만든다.
+def schedule(image_ids):
+    image_ids = list(image_ids)
+    if image_ids:
+        transaction.on_commit(lambda: _submit(image_ids))
+
+
+# 요청한 너비 이상인 가장 작은 파생 이미지, 없으면 가장 큰 파생 이미지
+def _choose(derivatives, width):
+    for derivative in derivatives:
+        if derivative.width >= width:
+            return derivative
+    return derivatives[-1] if derivatives else None
+
+# 요청한 너비의 파생 이미지를 반환하고 없거나 파일이 사라졌으면 다시 만든다.
+# 여러 요청이나 백그라운드 작업자가 동시에 같은 이미지를 만들지 않도록 잠금을 잡은 쪽만 만들고 나머지는 기다린다.
+# 만들 수 없으면 None을 반환
+def get_derivative(image, width):
+    derivative = _choose(list(image.derivatives.all()), width)
+    if derivative is not None and derivative.source == image.file.name and not _is_missing(derivative):
+        return derivative
+    lock = lock_key(image.id)
+    if cache.add(lock, 1, LOCK_TIMEOUT):
+        try:
+            derivatives = generate(image)
+        except (OSError, UnidentifiedImageError):
+            logger.exception('Could not create derivatives for image %s', image.id)
+            return None
+        finally:
+            cache.delete(lock)
+        return _choose(derivatives, width)
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline and cache.get(lock) is not None:
+        time.sleep(WAIT_INTERVAL)
+    return _choose(list(image.derivatives.all()), width)
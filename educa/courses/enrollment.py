@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+
+from .models import Course
+
+# 학생 등록은 Course.students 의 중간 테이블에 bulk_create()로 한번에 추가한다.
+# bulk_create()는 m2m_changed 시그널을 보내지 않기 때문에 새로 등록되는 id로 직접 시그널을 보낸다.
+
+Enrollment = Course.students.through
+BATCH_SIZE = 1000
+
+# instance - 시그널을 보낼 객체 (강좌 또는 사용자)
+# reverse - instance가 사용자이면 True
+# pairs - 등록할 (course_id, user_id) 목록
+# existing - 이미 등록된 (course_id, user_id) 집합
+def _bulk_enroll(instance, reverse, pairs, existing):
+    pairs = [pair for pair in pairs if pair not in existing]
+    model = Course if reverse else User
+    pk_set = {course_id if reverse else user_id for course_id, user_id in pairs}
+    if not pk_set:
+        return pk_set
+    with transaction.atomic():
+        m2m_changed.send(sender=Enrollment, action='pre_add', instance=instance, reverse=reverse, model=model, pk_set=pk_set, using='default')
+        Enrollment.objects.bulk_create([Enrollment(course_id=course_id, user_id=user_id) for course_id, user_id in pairs], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        m2m_changed.send(sender=Enrollment, action='post_add', instance=instance, reverse=reverse, model=model, pk_set=pk_set, using='default')
+    return pk_set
+
+# 하나의 강좌에 여러 사용자를 등록하고 새로 등록된 사용자 id를 반환
+def enroll_users(course, user_ids):
+    user_ids = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    existing = {(course.id, user_id) for user_id in Enrollment.objects.filter(course=course, user_id__in=user_ids).values_list('user_id', flat=True)}
+    return _bulk_enroll(course, False, [(course.id, user_id) for user_id in user_ids], existing)
+
+# 한명의 사용자를 여러 강좌에 등록하고 새로 등록된 강좌 id를 반환
+def enroll_courses(user, course_ids):
+    course_ids = set(Course.objects.filter(id__in=course_ids).values_list('id', flat=True))
+    existing = {(course_id, user.id) for course_id in Enrollment.objects.filter(user=user, course_id__in=course_ids).values_list('course_id', flat=True)}
+    return _bulk_enroll(user, True, [(course_id, user.id) for course_id in course_ids], existing)
+
+
+# 사용자가 등록한 강좌 id 집합 캐시
+# 사용자마다 등록한 강좌 id의 frozenset을 공유 캐시(운영 환경에서는 Redis)에 ENROLLED_TIMEOUT 동안 저장하고
+# 프로세스 메모리에도 LOCAL_TIMEOUT 동안 유지하므로 등록 여부 확인은 대부분 메모리의 집합에서 끝난다.
+# 메모리의 집합에 없는 강좌는 다른 프로세스에서 방금 등록했을 수 있으므로 공유 캐시에서 다시 확인한다.
+# Course.students가 변경되거나 강좌가 삭제되면 시그널에서 invalidate_enrolled_courses()로 삭제한다.
+
+ENROLLED_TIMEOUT = 60 * 5
+LOCAL_TIMEOUT = 10
+LOCAL_MAX_SIZE = 10000
+
+_local = {}
+_inflight = {}
+
+def enrolled_key(user_id):
+    return f'enrolled-courses:{user_id}'
+
+def invalidate_enrolled_courses(user_ids):
+    keys = [enrolled_key(user_id) for user_id in user_ids]
+    for key in keys:
+        _local.pop(key, None)
+    cache.delete_many(keys)
+
+def _queryset(user_id):
+    return Enrollment.objects.filter(user_id=user_id).values_list('course_id', flat=True)
+
+def _remember(key, value):
+    if len(_local) >= LOCAL_MAX_SIZE:
+        _local.clear()
+    _local[key] = (time.monotonic() + LOCAL_TIMEOUT, value)
+
+def _local_get(key):
+    entry = _local.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def _load(key, user_id):
+    value = cache.get(key)
+    if value is None:
+        value = frozenset(_queryset(user_id))
+        cache.set(key, value, ENROLLED_TIMEOUT)
+    _remember(key, value)
+    return value
+
+# 사용자가 등록한 강좌 id 집합
+def enrolled_courses(user_id):
+    key = enrolled_key(user_id)
+    value = _local_get(key)
+    if value is None:
+        value = _load(key, user_id)
+    return value
+
+def is_enrolled(user_id, course_id):
+    key = enrolled_key(user_id)
+    value = _local_get(key)
+    if value is None or course_id not in value:
+        value = _load(key, user_id)
+    return course_id in value
+
+async def _aload(key, user_id):
+    try:
+        value = await cache.aget(key)
+        if value is None:
+            value = frozenset([course_id async for course_id in _queryset(user_id)])
+            await cache.aset(key, value, ENROLLED_TIMEOUT)
+        _remember(key, value)
+        return value
+    finally:
+        _inflight.pop(key, None)
+
+# 이벤트 루프를 막지 않는 버전
+# 같은 사용자에 대한 동시 요청은 하나의 조회를 함께 기다린다.
+async def aenrolled_courses(user_id, local=True):
+    key = enrolled_key(user_id)
+    value = _local_get(key) if local else None
+    if value is not None:
+        return value
+    if key not in _inflight:
+        _inflight[key] = asyncio.ensure_future(_aload(key, user_id))
+    return await asyncio.shield(_inflight[key])
+
+async def ais_enrolled(user_id, course_id):
+    value = await aenrolled_courses(user_id)
+    if course_id not in value:
+        value = await aenrolled_courses(user_id, local=False)
+    return course_id in value
@@ -1,5 +1,8 @@
-from django.db import models
-from django.core.exceptions import ObjectDoesNotExist
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Max
 
 # 커스텀 OrderField
 # 이 필드는 Django 에서 제공하는 PositiveIntegerField를 상속한다.
@@ -9,34 +12,78 @@ class OrderField(models.PositiveIntegerField):
         self.for_fields = for_fields
         super().__init__(*args, **kwargs)
         
+    # 순서를 계산하는 범위를 나타내는 문자열 ex) courses.module:course_id=1
+    # 같은 범위의 객체는 하나의 카운터 행을 공유한다.
+    def get_scope(self, model_instance):
+        scope = self.model._meta.label_lower
+        if self.for_fields:
+            opts = self.model._meta
+            values = [f'{opts.get_field(field).attname}={getattr(model_instance, opts.get_field(field).attname)}' for field in self.for_fields]
+            scope = f"{scope}:{','.join(values)}"
+        return scope
+
+    # 범위에 속한 기존 객체
+    def get_scope_queryset(self, model_instance):
+        qs = self.model.objects.all()
+        if self.for_fields:
+            opts = self.model._meta
+            qs = qs.filter(**{opts.get_field(field).attname: getattr(model_instance, opts.get_field(field).attname) for field in self.for_fields})
+        return qs
+
+    # 범위의 카운터 행을 증가시켜 count개의 연속된 순서를 할당하고 첫번째 순서를 반환
+    # UPDATE 문이 카운터 행을 트랜잭션이 끝날 때까지 잠그기 때문에 동시에 추가되는 객체가 같은 순서를 받지 않는다.
+    def allocate(self, model_instance, count=1):
+        OrderCounter = apps.get_model('courses','OrderCounter')
+        scope = self.get_scope(model_instance)
+        counters = OrderCounter.objects.filter(scope=scope)
+        with transaction.atomic():
+            if counters.update(value=F('value') + count):
+                return counters.values_list('value', flat=True).get() - count
+            # 처음 사용하는 범위는 기존 객체의 최대 순서 다음부터 시작
+            last = self.get_scope_queryset(model_instance).aggregate(last=Max(self.attname))['last']
+            start = 0 if last is None else last + 1
+            try:
+                with transaction.atomic():
+                    OrderCounter.objects.create(scope=scope, value=start + count)
+                return start
+            except IntegrityError:
+                # 다른 요청이 먼저 카운터 행을 만든 경우
+                counters.update(value=F('value') + count)
+                return counters.values_list('value', flat=True).get() - count
+
+    # bulk_create() 전에 여러 객체의 순서를 한번에 할당
+    # 범위마다 카운터를 한번만 증가시키고 연속된 순서를 목록의 순서대로 할당한다.
+    def assign(self, objs):
+        groups = defaultdict(list)
+        for obj in objs:
+            if getattr(obj, self.attname) is None:
+                groups[self.get_scope(obj)].append(obj)
+        for group in groups.values():
+            start = self.allocate(group[0], len(group))
+            for i, obj in enumerate(group):
+                setattr(obj, self.attname, start + i)
+
     # PositiveIntegerField 필드의 pre_save() 메서드를 재정의
     # 이 메서드는 필드를 데이터베이스에 저장하기 전에 실행된다.
     def pre_save(self,model_instance, add):
         # 모델 인스턴스에서 이 필드에 대한 값이 이미 있는지 확인
         # self.attname을 사용하여 모델에서 필드에 지정된 속성 이름을 가져온다.
-        # 속성의 값이 None일 경우 실행
+        # 속성의 값이 None일 경우 범위의 카운터에서 다음 순서를 할당
         if getattr(model_instance, self.attname) is None:
-            # 현재 값이 없음
-            try:
-                # 필드가 속한 모델 클래스는 self.model을 사용하여 가져오고
-                # 필드의 모델에 속한 모든 객체를 가져온다.
-                qs = self.model.objects.all()
-                # 필드의 for_fields 속성에 필드 이름이 있다면 실행
-                if self.for_fields:
-                    # 'for_fields'에 지정된 필드 값이 동일한 객체로 필터링
-                    # QuerySet을 현재 모델 필드의 현재 값을 기준으로 필터링하며 주어진 필드에 따라 순서를 계산
-                    query = {field: getattr(model_instance, field) for field in self.for_fields}
-                    qs = qs.filter(**query)
-                # 마지막 항목의 순서 가져오기
-                # 데이터 베이스에서 가장 높은 순서를 가진 객체를 last_item = qs.latest(self.attname)로 가져온다
-                last_item = qs.latest(self.attname)
-                # 객체가 발견 되면 최고 순서에 1을 더한다.
-                value = last_item.order + 1
-            # 객체가 없는 경우 이 객체가 첫번째 객체라고 가정하고 순서를 0으로 할당
-            except ObjectDoesNotExist:
-                value = 0
+            value = self.allocate(model_instance)
             # 계산된 순서를 모델 인스턴스의 필드 값으로 할당하고 반환
             setattr(model_instance, self.attname, value)
             return value
         else:
-            return super().pre_save(model_instance,add)
\ No newline at end of file
+            return super().pre_save(model_instance,add)
+
+
+# 강좌 안에서 콘텐츠마다 한번 할당되고 바뀌지 않는 번호
+# 콘텐츠의 순서가 바뀌거나 다른 콘텐츠가 삭제되어도 유지되므로 학생 진도 비트맵의 위치로 사용한다.
+# 범위는 콘텐츠 모듈의 강좌이며 OrderField와 같은 카운터 행으로 할당한다.
+class CourseIndexField(OrderField):
+    def get_scope(self, model_instance):
+        return f'{self.model._meta.label_lower}.{self.name}:course_id={model_instance.module.course_id}'
+
+    def get_scope_queryset(self, model_instance):
+        return self.model.objects.filter(module__course_id=model_instance.module.course_id)
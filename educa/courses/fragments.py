@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q, prefetch_related_objects
+from django.template.loader import get_template
+
+from .models import ContentFragment
+
+# 템플릿에서 사용하는 관련 객체를 모델별로 한번에 가져온다.
+TEMPLATE_PREFETCH = {'image': ['derivatives']}
+
+# 렌더링된 HTML을 찾기 위한 키
+def fragment_key(item):
+    return (item._meta.model_name, item.pk)
+
+# 콘텐츠 아이템을 템플릿으로 렌더링하고 ContentFragment에 저장
+# 모델별로 템플릿은 한번만 불러오고, 저장은 하나의 쿼리로 처리
+def store_fragments(items):
+    templates = {}
+    fragments = []
+    rendered = {}
+    for model_name, lookups in TEMPLATE_PREFETCH.items():
+        prefetch_related_objects([item for item in items if item._meta.model_name == model_name], *lookups)
+    for item in items:
+        model_name = item._meta.model_name
+        if model_name not in templates:
+            templates[model_name] = get_template(f'courses/content/{model_name}.html')
+        html = templates[model_name].render({'item': item})
+        rendered[fragment_key(item)] = html
+        fragments.append(ContentFragment(content_type=ContentType.objects.get_for_model(item), object_id=item.pk, updated=item.updated, html=html))
+    if fragments:
+        ContentFragment.objects.bulk_create(fragments, update_conflicts=True, unique_fields=['content_type','object_id'], update_fields=['updated','html'])
+    return rendered
+
+# 여러 아이템의 HTML을 한번의 쿼리로 가져온다
+# 저장된 HTML이 없거나 아이템이 수정된 경우에만 다시 렌더링하여 저장
+def get_fragments(items):
+    items = [item for item in items if item is not None]
+    if not items:
+        return {}
+    ids_by_type = defaultdict(list)
+    for item in items:
+        ids_by_type[ContentType.objects.get_for_model(item).id].append(item.pk)
+    query = Q()
+    for content_type_id, ids in ids_by_type.items():
+        query |= Q(content_type_id=content_type_id, object_id__in=ids)
+
+    stored = {}
+    for content_type_id, object_id, updated, html in ContentFragment.objects.filter(query).values_list('content_type_id','object_id','updated','html'):
+        stored[(content_type_id, object_id)] = (updated, html)
+
+    result = {}
+    stale = []
+    for item in items:
+        updated, html = stored.get((ContentType.objects.get_for_model(item).id, item.pk), (None, None))
+        if updated == item.updated:
+            result[fragment_key(item)] = html
+        else:
+            stale.append(item)
+    if stale:
+        result.update(store_fragments(stale))
+    return result
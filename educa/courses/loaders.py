@@ -0,0 +1,38 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+
+from .models import Module, Content
+from .fragments import get_fragments
+
+# 코스의 모듈과 콘텐츠를 한번에 가져오기 위한 Prefetch
+# 모듈 1번, 콘텐츠 1번, 콘텐츠 타입(text, video, image, file)별로 1번의 쿼리만 실행된다.
+# GenericForeignKey 인 item 에 prefetch_related()를 사용하면 content_type 별로 묶어서 조회한다.
+def module_contents_prefetch():
+    contents = Content.objects.prefetch_related('item')
+    return Prefetch('modules', queryset=Module.objects.prefetch_related(Prefetch('contents', queryset=contents)))
+
+# 주어진 QuerySet에 모듈과 콘텐츠의 prefetch를 추가
+def with_contents(queryset):
+    return queryset.prefetch_related(module_contents_prefetch())
+
+# prefetch된 코스의 모든 콘텐츠 아이템의 HTML을 한번에 가져온다
+# (모델 이름, id)를 키로 하는 딕셔너리를 반환
+def render_course_items(course):
+    return get_fragments([content.item for module in course.modules.all() for content in module.contents.all()])
+
+# 모듈의 콘텐츠와 렌더링된 HTML을 함께 반환
+# 콘텐츠 1번, 콘텐츠 타입별로 1번, 저장된 HTML 1번의 쿼리만 실행된다.
+def load_module_contents(module_id):
+    contents = [content for content in Content.objects.filter(module_id=module_id).prefetch_related('item') if content.item is not None]
+    rendered = get_fragments([content.item for content in contents])
+    return _with_html(contents, rendered)
+
+# 비동기 뷰에서 사용하는 버전
+# 저장된 HTML을 가져오고 필요하면 다시 렌더링하여 저장하는 get_fragments()는 스레드에서 실행
+async def aload_module_contents(module_id):
+    contents = [content async for content in Content.objects.filter(module_id=module_id).prefetch_related('item') if content.item is not None]
+    rendered = await sync_to_async(get_fragments)([content.item for content in contents])
+    return _with_html(contents, rendered)
+
+def _with_html(contents, rendered):
+    return [{'content': content, 'item': content.item, 'html': rendered[(content.item._meta.model_name, content.item.pk)]} for content in contents]
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from courses import catalog
+
+# 강좌 목록 캐시의 적중/실패 횟수를 출력
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the course catalog cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = catalog.get_stats()
+        self.stdout.write(f"hits: {stats['hits']}  misses: {stats['misses']}  hit rate: {stats['hit_rate']:.1%}")
+        if options['reset']:
+            catalog.reset_stats()
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from courses.tokens import clear_expired
+
+# 만료된 API 토큰을 삭제
+class Command(BaseCommand):
+    help = 'Delete API tokens that have expired'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Deleted {clear_expired()} expired API tokens')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from courses.uploads import clear_expired
+
+# 오랫동안 조각을 받지 못한 업로드와 스테이징 파일을 삭제
+class Command(BaseCommand):
+    help = 'Delete chunked uploads that have expired'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Deleted {clear_expired()} expired uploads')
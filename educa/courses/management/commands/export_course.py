@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Course
+from courses.transfer import export_course
+
+# 강좌를 모듈, 콘텐츠, 미디어 파일과 함께 tar 파일로 내보낸다.
+class Command(BaseCommand):
+    help = 'Export a course with its modules, contents and media files as a tar archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help='Slug of the course to export')
+        parser.add_argument('-o', '--output', help="Output file (default: <slug>.tar, '-' for stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.select_related('subject').get(slug=options['slug'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course {options['slug']!r} does not exist")
+        output = options['output'] or f'{course.slug}.tar'
+        if output == '-':
+            export_course(course, sys.stdout.buffer)
+            return
+        with open(output, 'wb') as f:
+            export_course(course, f)
+        self.stdout.write(f'Exported {course.slug} to {output}')
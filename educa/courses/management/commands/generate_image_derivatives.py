@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Image
+from courses.derivatives import generate
+
+# 모든 이미지 콘텐츠의 없는 파생 이미지를 만든다.
+class Command(BaseCommand):
+    help = 'Create missing image derivatives for all image contents'
+
+    def handle(self, *args, **options):
+        count = 0
+        for image in Image.objects.exclude(file='').prefetch_related('derivatives').iterator(chunk_size=200):
+            try:
+                generate(image)
+                count += 1
+            except OSError as e:
+                self.stderr.write(f'{image.file.name}: {e}')
+        self.stdout.write(f'Processed {count} images')
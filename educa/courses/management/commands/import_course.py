@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.transfer import import_course, TransferError
+
+# export_course 로 내보낸 tar 파일에서 강좌를 가져온다.
+class Command(BaseCommand):
+    help = 'Import a course from a tar archive created by export_course'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', help='Path of the tar archive')
+        parser.add_argument('--owner', required=True, help='Username of the instructor who will own the course')
+        parser.add_argument('--slug', help='Slug of the new course (default: the exported slug)')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['owner']!r} does not exist")
+        try:
+            with open(options['archive'], 'rb') as f:
+                course = import_course(f, owner, slug=options['slug'])
+        except (OSError, TransferError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(f'Imported {course.slug} with {course.num_modules} modules')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+from courses import search
+
+# 모든 강좌의 검색 문서를 다시 만든다.
+class Command(BaseCommand):
+    help = 'Rebuild the course search documents'
+
+    def handle(self, *args, **options):
+        count = 0
+        for course_id in Course.objects.values_list('id', flat=True).iterator(chunk_size=2000):
+            search.index_course(course_id)
+            count += 1
+        search.reset_index()
+        self.stdout.write(f'Indexed {count} courses')
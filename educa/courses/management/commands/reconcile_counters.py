@@ -0,0 +1,16 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from courses.counters import reconcile
+from courses import catalog
+
+# 카운터 컬럼을 실제 개수와 비교하여 다른 값을 수정한다.
+class Command(BaseCommand):
+    help = 'Recalculate the denormalized course counters'
+
+    def handle(self, *args, **options):
+        fixed = reconcile(lambda model_name: apps.get_model('courses', model_name))
+        if any(fixed.values()):
+            catalog.bump_generation()
+        for name, count in fixed.items():
+            self.stdout.write(f'{name}: {count} fixed')
@@ -0,0 +1,83 @@
+import mimetypes
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import HttpResponse, Http404
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+from .models import Content, Image, File, ImageDerivative
+from .enrollment import is_enrolled
+
+# 미디어 파일 접근 제어
+# 파일을 사용하는 아이템의 강사와 아이템이 포함된 강좌에 등록된 학생만 파일을 받을 수 있다.
+# 권한을 확인한 뒤 MEDIA_ACCEL_REDIRECT가 True이면 X-Accel-Redirect 헤더로 nginx가 파일을 직접 전송하고
+# (Range, ETag, Last-Modified는 nginx가 처리) 개발 환경에서는 django.views.static.serve()로 전송한다.
+
+# 파일 경로 -> (강사 id 목록, 강좌 id 목록) 캐시 시간
+ACCESS_TIMEOUT = 60 * 10
+# 브라우저가 파일을 다시 확인하지 않고 사용하는 시간
+MEDIA_MAX_AGE = 60 * 60
+
+# v2 - 값을 강사 id 목록으로 바꾸면서 이전 형식의 캐시를 읽지 않도록 변경
+def access_key(path):
+    return f'media-access:v2:{path}'
+
+# 파일을 사용하는 모든 아이템의 강사 id 목록과 아이템이 포함된 강좌 id 목록, 콘텐츠 파일이 아니면 None
+# 여러 아이템이 같은 파일을 사용하면 그 중 하나라도 허용하는 사용자는 받을 수 있다.
+def _load_access(path):
+    items = {model: list(model.objects.filter(file=path).values_list('id','owner_id')) for model in (Image, File)}
+    items[Image] += ImageDerivative.objects.filter(file=path).values_list('image_id','image__owner_id')
+    if not items[Image] and not items[File]:
+        return None
+    owner_ids = sorted({owner_id for rows in items.values() for item_id, owner_id in rows})
+    contents = Q()
+    for model, rows in items.items():
+        if rows:
+            contents |= Q(content_type=ContentType.objects.get_for_model(model), object_id__in=[item_id for item_id, owner_id in rows])
+    course_ids = Content.objects.filter(contents).order_by().values_list('module__course_id', flat=True).distinct()
+    return owner_ids, list(course_ids)
+
+def get_access(path):
+    key = access_key(path)
+    access = cache.get(key)
+    if access is None:
+        access = _load_access(path)
+        if access is not None:
+            cache.set(key, access, ACCESS_TIMEOUT)
+    return access
+
+# 아이템이 강좌에 추가되거나 삭제되면 원본과 파생 이미지의 접근 캐시를 삭제
+def invalidate_access(item):
+    paths = [item.file.name]
+    if isinstance(item, Image):
+        paths += item.derivatives.values_list('file', flat=True)
+    cache.delete_many([access_key(path) for path in paths if path])
+
+def can_access(user, path):
+    access = get_access(path)
+    if access is None:
+        return False
+    owner_ids, course_ids = access
+    return user.is_staff or user.id in owner_ids or any(is_enrolled(user.id, course_id) for course_id in course_ids)
+
+# 상위 디렉터리나 절대 경로를 가리키는 경로는 거부
+def clean_path(path):
+    if not path or path.startswith('/') or posixpath.normpath(path) != path:
+        raise Http404
+    return path
+
+def media_response(request, path):
+    if settings.MEDIA_ACCEL_REDIRECT:
+        content_type, encoding = mimetypes.guess_type(path)
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+    else:
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    # 사용자마다 접근 권한이 다르므로 공유 캐시에 저장하지 않는다.
+    patch_cache_control(response, private=True, max_age=MEDIA_MAX_AGE)
+    return response
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_contentfragment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-created', '-id'], name='courses_cou_created_6b44b3_idx'),
+        ),
+    ]
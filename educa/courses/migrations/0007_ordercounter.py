@@ -0,0 +1,29 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_course_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=200, unique=True)),
+                ('value', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['module', 'order'], name='courses_con_module__93918d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(fields=['course', 'order'], name='courses_mod_course__20183c_idx'),
+        ),
+    ]
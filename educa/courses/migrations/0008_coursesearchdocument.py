@@ -0,0 +1,36 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:22
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# GIN 인덱스는 PostgreSQL에서만 생성
+def create_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE INDEX courses_coursesearchdocument_vector_gin ON courses_coursesearchdocument USING gin (vector)')
+
+def drop_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS courses_coursesearchdocument_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_ordercounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSearchDocument',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='courses.course')),
+                ('title', models.TextField()),
+                ('modules', models.TextField(blank=True)),
+                ('texts', models.TextField(blank=True)),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        migrations.RunPython(create_vector_index, drop_vector_index),
+    ]
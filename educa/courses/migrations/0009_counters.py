@@ -0,0 +1,41 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+from courses.counters import reconcile
+
+
+# 기존 데이터의 카운터를 계산
+def fill_counters(apps, schema_editor):
+    reconcile(lambda model_name: apps.get_model('courses', model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_coursesearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='num_modules',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='num_students',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='num_contents',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='num_courses',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
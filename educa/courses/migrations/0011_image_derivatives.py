@@ -0,0 +1,40 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='height',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='width',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='derivatives')),
+                ('source', models.CharField(max_length=255)),
+                ('format', models.CharField(max_length=10)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='courses.image')),
+            ],
+            options={
+                'ordering': ['width'],
+                'unique_together': {('image', 'format', 'width')},
+            },
+        ),
+    ]
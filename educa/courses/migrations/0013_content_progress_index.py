@@ -0,0 +1,38 @@
+# Generated by Django 4.2.4 on 2026-10-18 19:20
+
+from django.db import migrations
+
+import courses.fields
+
+
+# 기존 콘텐츠에 강좌마다 모듈, 콘텐츠 순서대로 번호를 할당
+def fill_progress_index(apps, schema_editor):
+    Content = apps.get_model('courses', 'Content')
+    course_id, index, batch = None, 0, []
+    for content in Content.objects.select_related('module').order_by('module__course_id','module__order','module_id','order','id').iterator(chunk_size=2000):
+        if content.module.course_id != course_id:
+            course_id, index = content.module.course_id, 0
+        content.progress_index = index
+        index += 1
+        batch.append(content)
+        if len(batch) >= 1000:
+            Content.objects.bulk_update(batch, ['progress_index'])
+            batch = []
+    Content.objects.bulk_update(batch, ['progress_index'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_api_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='progress_index',
+            field=courses.fields.CourseIndexField(blank=True, default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_progress_index, migrations.RunPython.noop),
+    ]
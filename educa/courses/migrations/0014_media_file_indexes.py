@@ -0,0 +1,28 @@
+# Generated by Django 4.2.4 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_content_progress_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(db_index=True, upload_to='files'),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='file',
+            field=models.FileField(db_index=True, upload_to='images'),
+        ),
+        migrations.AlterField(
+            model_name='imagederivative',
+            name='file',
+            field=models.FileField(db_index=True, upload_to='derivatives'),
+        ),
+    ]
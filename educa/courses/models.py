@@ -1,16 +1,29 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.contenttypes.fields import GenericForeignKey
-from django.template.loader import render_to_string
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.postgres.search import SearchVectorField
 
-from .fields import OrderField
+from .fields import OrderField, CourseIndexField
 
 # Create your models here.
 
+# OrderField가 범위(ex. 코스의 모듈)마다 다음 순서를 할당하기 위해 사용하는 카운터
+class OrderCounter(models.Model):
+    scope = models.CharField(max_length=200, unique=True)
+    # 다음에 할당할 순서
+    value = models.PositiveIntegerField()
+
+    def __str__(self) -> str:
+        return f'{self.scope}: {self.value}'
+
 class Subject(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
+    # 주제에 속한 강좌 수 (시그널로 갱신)
+    num_courses = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['title']
@@ -33,14 +46,31 @@ class Course(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     
     students = models.ManyToManyField(User, related_name='courses_joined', blank=True)
+    # 강좌의 모듈 수와 등록된 학생 수 (시그널로 갱신)
+    num_modules = models.PositiveIntegerField(default=0, editable=False)
+    num_students = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-created']
+        # 키셋 페이지네이션을 위한 인덱스
+        indexes = [
+            models.Index(fields=['-created','-id']),
+        ]
 
     def __str__(self):
         return self.title
     
 
+# 강좌 검색을 위한 문서
+# 강좌의 제목과 개요, 모듈의 제목과 설명, 텍스트 콘텐츠를 모아서 저장한다.
+# PostgreSQL에서는 vector 필드에 가중치가 적용된 tsvector를 저장하고 GIN 인덱스로 검색한다.
+class CourseSearchDocument(models.Model):
+    course = models.OneToOneField(Course, related_name='search_document', on_delete=models.CASCADE, primary_key=True)
+    title = models.TextField()
+    modules = models.TextField(blank=True)
+    texts = models.TextField(blank=True)
+    vector = SearchVectorField(null=True)
+
 class Module(models.Model):
     course = models.ForeignKey(Course, related_name='modules',on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
@@ -49,6 +79,8 @@ class Module(models.Model):
     # course를 사용해 코스에 따른 정렬을 계산한다고 명시
     # 이렇게 하면 새 모듈의 정렬은 동일한 코스 객체의 마지막 모듈에 1을 더하여 할당
     order = OrderField(blank=True,for_fields=['course'])
+    # 모듈의 콘텐츠 수 (시그널로 갱신)
+    num_contents = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return f'{self.order}. {self.title}'
@@ -56,6 +88,9 @@ class Module(models.Model):
     # 기본 정렬 추가
     class Meta :
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['course','order']),
+        ]
     
 class Content(models.Model):
     module = models.ForeignKey(Module, related_name='contents',on_delete=models.CASCADE)
@@ -69,16 +104,36 @@ class Content(models.Model):
     item = GenericForeignKey('content_type','object_id')
     
     order = OrderField(blank=True, for_fields=['module'])
+    # 학생 진도 비트맵에서 이 콘텐츠의 위치 (강좌마다 0부터 할당되고 바뀌지 않는다)
+    progress_index = CourseIndexField(blank=True, editable=False)
     
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['module','order']),
+        ]
     
+# 렌더링된 콘텐츠 아이템의 HTML을 저장하는 모델
+# 아이템의 updated 값이 저장된 값과 다르면 다시 렌더링한다.
+class ContentFragment(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    item = GenericForeignKey('content_type','object_id')
+    # 렌더링할 때의 아이템 updated 값
+    updated = models.DateTimeField()
+    html = models.TextField()
+
+    class Meta:
+        unique_together = ['content_type','object_id']
+
 class ItemBase(models.Model):
     # 콘텐츠를 생성한 사용자
     owner = models.ForeignKey(User,related_name='%(class)s_related',on_delete=models.CASCADE)
     title = models.CharField(max_length=250)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    # 아이템이 삭제되면 저장된 HTML도 함께 삭제
+    fragments = GenericRelation(ContentFragment)
 
     class Meta:
         # 추상모델로 정의
@@ -88,9 +143,9 @@ class ItemBase(models.Model):
         return self.title
     
     def render(self):
-        # render_to_string 함수는 템플릿을 렌더링하고 렌더링된 내용을 문자열로 반환
-        # self._mata.model_name을 사용하여 동적으로 각 콘텐츠 모델에 대한 템플릿 이름을 생성
-        return render_to_string(f'courses/content/{self._meta.model_name}.html',{'item':self})
+        # 저장된 HTML을 사용하고 없거나 오래된 경우에만 템플릿을 렌더링
+        from .fragments import get_fragments
+        return get_fragments([self])[(self._meta.model_name, self.pk)]
 
 # 텍스트 콘텐츠를 저장하기 위한 모델
 class Text(ItemBase):
@@ -98,12 +153,77 @@ class Text(ItemBase):
 
 # PDF와 같은 파일을 저장하기 위한 모델
 class File(ItemBase):
-    file = models.FileField(upload_to='files')
+    # 미디어 접근 권한을 확인할 때 경로로 찾는다 (courses.media)
+    file = models.FileField(upload_to='files', db_index=True)
 
 # 이미지 파일을 저장하기 위한 모델
 class Image(ItemBase):
-    file = models.FileField(upload_to='images')
+    file = models.FileField(upload_to='images', db_index=True)
+    # 원본 이미지의 크기 (페이지가 다시 배치되지 않도록 img 태그에 사용, 파생 이미지를 만들 때 기록)
+    width = models.PositiveIntegerField(null=True, editable=False)
+    height = models.PositiveIntegerField(null=True, editable=False)
+
+    # img 태그의 src로 사용할 가장 큰 파생 이미지
+    @property
+    def default_derivative(self):
+        derivatives = list(self.derivatives.all())
+        return derivatives[-1] if derivatives else None
+
+# 이미지를 너비별로 줄이고 WebP 등으로 변환한 파생 이미지
+class ImageDerivative(models.Model):
+    image = models.ForeignKey(Image, related_name='derivatives', on_delete=models.CASCADE)
+    file = models.FileField(upload_to='derivatives', db_index=True)
+    # 파생 이미지를 만든 원본 파일 이름 (원본이 바뀌면 다시 만든다)
+    source = models.CharField(max_length=255)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['width']
+        unique_together = ['image','format','width']
+
+    def __str__(self) -> str:
+        return f'{self.file.name} ({self.width}x{self.height})'
 
 # 비디오를 저장하기 위해 URLField 필드를 사용하여 비디오 URL을 임베드하기 위한 모델
 class Video(ItemBase):
-    url = models.URLField()
\ No newline at end of file
+    url = models.URLField()
+
+
+# 나누어 업로드 중인 파일/이미지 콘텐츠
+# 받은 조각은 스테이징 디렉터리의 <id>.part 파일에 이어서 쓰고
+# 모든 조각을 받으면 파일을 저장소로 옮기고 아이템과 Content를 생성한 뒤 삭제한다.
+class Upload(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, related_name='uploads', on_delete=models.CASCADE)
+    module = models.ForeignKey(Module, related_name='uploads', on_delete=models.CASCADE)
+    # 생성할 아이템의 모델 이름 (image 또는 file)
+    model_name = models.CharField(max_length=10)
+    title = models.CharField(max_length=250)
+    filename = models.CharField(max_length=255)
+    # 전체 파일 크기와 지금까지 받은 바이트 수
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    # 전체 파일의 SHA-256 (선택)
+    checksum = models.CharField(max_length=64, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.filename} ({self.offset}/{self.size})'
+
+
+# API 인증 토큰
+# 토큰 원문은 발급할 때 한번만 반환하고 SHA-256 다이제스트만 저장한다.
+# 토큰은 충분히 긴 임의의 문자열이므로 비밀번호처럼 느린 해시를 사용하지 않는다.
+class ApiToken(models.Model):
+    user = models.ForeignKey(User, related_name='api_tokens', on_delete=models.CASCADE)
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=100, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    # 만료 시간 (None이면 만료되지 않음)
+    expires = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f'{self.user} {self.name}'.strip()
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models import Subquery
+
+# 정렬 변경 요청이 올바르지 않을 때 발생
+class ReorderError(Exception):
+    pass
+
+# 같은 부모(모듈의 course, 콘텐츠의 module)에 속한 객체의 순서를 하나의 트랜잭션에서 변경
+# queryset - 사용자가 소유한 객체로 제한된 QuerySet
+# parent_field - 순서를 계산하는 기준이 되는 필드 이름
+# orders - {id: order} 딕셔너리
+# 요청에는 부모의 모든 객체가 포함되어야 하고 순서는 0부터 연속된 값이어야 한다.
+# 쿼리 수는 객체 수와 관계없이 조회 1번, UPDATE 1번으로 일정하다.
+# (부모 id, 새 순서대로 정렬된 id 목록)을 반환
+def bulk_reorder(queryset, parent_field, orders):
+    if not isinstance(orders, dict) or not orders:
+        raise ReorderError('Expected a JSON object mapping ids to orders.')
+    try:
+        orders = {int(id): int(order) for id, order in orders.items()}
+    except (TypeError, ValueError):
+        raise ReorderError('Ids and orders must be integers.')
+    if sorted(orders.values()) != list(range(len(orders))):
+        raise ReorderError('Orders must be contiguous and start at 0.')
+
+    model = queryset.model
+    with transaction.atomic():
+        # 요청된 객체와 같은 부모를 가진 모든 객체를 한번에 잠그고 가져온다.
+        parents = model.objects.filter(id__in=orders.keys()).values(parent_field)
+        objs = list(queryset.select_for_update(of=('self',)).filter(**{f'{parent_field}__in': Subquery(parents)}).only('id', parent_field, 'order'))
+        parent_attname = model._meta.get_field(parent_field).attname
+        if len({getattr(obj, parent_attname) for obj in objs}) != 1 or {obj.id for obj in objs} != set(orders):
+            raise ReorderError('Every item of a single parent must be reordered at once.')
+        for obj in objs:
+            obj.order = orders[obj.id]
+        model.objects.bulk_update(objs, ['order'])
+    return getattr(objs[0], parent_attname), [obj.id for obj in sorted(objs, key=lambda obj: obj.order)]
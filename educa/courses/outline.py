@@ -0,0 +1,61 @@
+from django.core.cache import cache
+
+from .models import Course, Module
+from .enrollment import is_enrolled, ais_enrolled
+
+# 학생 강좌 페이지의 강좌 개요
+# 강좌(id, 제목)와 모듈(id, 제목, 순서) 목록을 딕셔너리로 강좌마다 캐시에 저장한다.
+# 강좌나 모듈이 변경되면 시그널(순서 변경은 ModuleOrderView)에서 삭제한다.
+
+OUTLINE_TIMEOUT = 60 * 60
+
+def outline_key(course_id):
+    return f'course-outline:{course_id}'
+
+def invalidate_outline(course_id):
+    cache.delete(outline_key(course_id))
+
+def _course_queryset(course_id):
+    return Course.objects.filter(id=course_id).values('id','title','slug')
+
+def _module_queryset(course_id):
+    return Module.objects.filter(course_id=course_id).order_by('order','id').values('id','title','order')
+
+# 강좌 개요, 강좌가 없으면 None
+def get_outline(course_id):
+    key = outline_key(course_id)
+    outline = cache.get(key)
+    if outline is None:
+        outline = _course_queryset(course_id).first()
+        if outline is None:
+            return None
+        outline['modules'] = list(_module_queryset(course_id))
+        cache.set(key, outline, OUTLINE_TIMEOUT)
+    return outline
+
+# 강좌 개요와 사용자의 등록 여부(enrolled), 등록 여부도 캐시에서 확인한다.
+def get_student_outline(user_id, course_id):
+    outline = get_outline(course_id)
+    if outline is None:
+        return None
+    return {**outline, 'enrolled': user_id is not None and is_enrolled(user_id, course_id)}
+
+
+# 비동기 뷰에서 사용하는 버전
+
+async def aget_outline(course_id):
+    key = outline_key(course_id)
+    outline = await cache.aget(key)
+    if outline is None:
+        outline = await _course_queryset(course_id).afirst()
+        if outline is None:
+            return None
+        outline['modules'] = [module async for module in _module_queryset(course_id)]
+        await cache.aset(key, outline, OUTLINE_TIMEOUT)
+    return outline
+
+async def aget_student_outline(user_id, course_id):
+    outline = await aget_outline(course_id)
+    if outline is None:
+        return None
+    return {**outline, 'enrolled': user_id is not None and await ais_enrolled(user_id, course_id)}
@@ -0,0 +1,66 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+# created, id 를 기준으로 하는 키셋(커서) 페이지네이션
+# OFFSET 대신 마지막 행의 (created, id) 값 이후의 행만 가져오므로 페이지가 뒤로 가도 비용이 일정하다.
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+def _value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+def encode_cursor(row):
+    value = f"{_value(row, 'created').isoformat()}|{_value(row, 'id')}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+# 잘못된 커서는 첫 페이지로 처리
+def decode_cursor(cursor):
+    try:
+        created, id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created), int(id)
+    except (ValueError, UnicodeError):
+        return None
+
+# 커서 이후의 행을 가져오는 QuerySet
+# 다음 페이지가 있는지 확인하기 위해 한 행을 더 가져온다.
+def _keyset_queryset(queryset, cursor, page_size):
+    queryset = queryset.order_by('-created','-id')
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created, id = position
+        queryset = queryset.filter(Q(created__lt=created) | Q(created=created, id__lt=id))
+    return queryset[:page_size + 1]
+
+def _keyset_page(rows, page_size):
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return KeysetPage(rows[:page_size], next_cursor)
+
+def keyset_paginate(queryset, cursor, page_size):
+    return _keyset_page(list(_keyset_queryset(queryset, cursor, page_size)), page_size)
+
+async def akeyset_paginate(queryset, cursor, page_size):
+    return _keyset_page([row async for row in _keyset_queryset(queryset, cursor, page_size)], page_size)
+
+# ListView에서 사용하는 키셋 페이지네이션 믹스인
+# ?cursor= 매개변수로 다음 페이지를 가져오며 템플릿에서는 page_obj.next_cursor를 사용
+class KeysetPaginationMixin:
+    paginate_by = 20
+
+    def paginate_queryset(self, queryset, page_size):
+        page = keyset_paginate(queryset, self.request.GET.get('cursor'), page_size)
+        return (None, page, page.object_list, page.has_next)
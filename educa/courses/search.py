@@ -0,0 +1,163 @@
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Course, Module, Content, Text, CourseSearchDocument
+
+# 강좌 검색
+# PostgreSQL에서는 tsvector 컬럼과 GIN 인덱스를 사용하고
+# SQLite 같은 다른 데이터베이스에서는 메모리의 역색인(inverted index)을 사용한다.
+# 메모리의 역색인은 프로세스마다 따로 만들고 그 프로세스의 변경만 반영하므로 개발 환경(단일 프로세스)에서만 사용한다.
+# 여러 워커 프로세스를 실행하는 운영 환경은 PostgreSQL을 사용해야 한다.
+
+# 검색 결과의 최대 개수
+MAX_RESULTS = 1000
+# 제목/개요, 모듈, 텍스트 콘텐츠의 가중치 (PostgreSQL의 A, B, C 가중치와 같은 비율)
+WEIGHTS = {'title': 1.0, 'modules': 0.4, 'texts': 0.2}
+
+TOKEN_RE = re.compile(r'\w+')
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+def use_postgres():
+    return connection.vendor == 'postgresql'
+
+# 순수 파이썬 역색인
+# 단어마다 (강좌 id: 가중치가 적용된 빈도)를 저장하고 TF-IDF 점수로 순위를 계산한다.
+class InvertedIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    def add(self, doc_id, fields):
+        terms = defaultdict(float)
+        for name, text in fields.items():
+            for token in tokenize(text):
+                terms[token] += WEIGHTS[name]
+        with self.lock:
+            self._remove(doc_id)
+            for token, weight in terms.items():
+                self.postings[token][doc_id] = weight
+            self.documents[doc_id] = list(terms)
+
+    def remove(self, doc_id):
+        with self.lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        for token in self.documents.pop(doc_id, ()):
+            postings = self.postings[token]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[token]
+
+    # 모든 검색어를 포함하는 문서를 점수 순서로 반환
+    def search(self, query, limit=MAX_RESULTS):
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        with self.lock:
+            postings = [self.postings.get(token, {}) for token in tokens]
+            if not all(postings):
+                return []
+            total = len(self.documents)
+            postings.sort(key=len)
+            scores = {}
+            for doc_id in postings[0]:
+                if all(doc_id in p for p in postings[1:]):
+                    scores[doc_id] = sum(p[doc_id] * math.log(1 + total / len(p)) for p in postings)
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+
+_index = None
+_index_lock = threading.Lock()
+
+# 처음 검색할 때 저장된 문서로 역색인을 만들고 이후에는 시그널로 갱신
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = InvertedIndex()
+                for course_id, title, modules, texts in CourseSearchDocument.objects.values_list('course_id','title','modules','texts').iterator(chunk_size=2000):
+                    index.add(course_id, {'title': title, 'modules': modules, 'texts': texts})
+                _index = index
+    return _index
+
+def reset_index():
+    global _index
+    _index = None
+
+# 강좌의 검색 문서를 다시 만든다.
+def index_course(course_id):
+    course = Course.objects.filter(id=course_id).values('title','overview').first()
+    if course is None:
+        remove_course(course_id)
+        return
+    modules = Module.objects.filter(course_id=course_id).values_list('title','description')
+    text_ids = Content.objects.filter(module__course_id=course_id, content_type=ContentType.objects.get_for_model(Text)).values('object_id')
+    texts = Text.objects.filter(id__in=text_ids).values_list('title','content')
+    fields = {
+        'title': f"{course['title']}\n{course['overview']}",
+        'modules': '\n'.join(f'{title}\n{description}' for title, description in modules),
+        'texts': '\n'.join(f'{title}\n{content}' for title, content in texts),
+    }
+    CourseSearchDocument.objects.update_or_create(course_id=course_id, defaults=fields)
+    if use_postgres():
+        update_vectors(CourseSearchDocument.objects.filter(course_id=course_id))
+    elif _index is not None:
+        _index.add(course_id, fields)
+
+_pending = threading.local()
+
+def _pending_ids():
+    if not hasattr(_pending, 'course_ids'):
+        _pending.course_ids = set()
+    return _pending.course_ids
+
+# 트랜잭션이 커밋된 뒤에 강좌마다 한번만 검색 문서를 다시 만든다.
+# 모듈 폼셋처럼 한 요청에서 여러 객체를 저장해도 강좌를 한번만 다시 만든다.
+# 트랜잭션 밖에서는 바로 다시 만든다.
+def schedule_index(course_id):
+    _pending_ids().add(course_id)
+    transaction.on_commit(_index_pending)
+
+# 먼저 실행된 콜백이 모아둔 강좌를 모두 처리하므로 나머지 콜백은 아무것도 하지 않는다.
+# 롤백된 트랜잭션에서 예약한 강좌는 다음에 커밋될 때 함께 다시 만든다.
+def _index_pending():
+    course_ids, _pending.course_ids = _pending_ids(), set()
+    for course_id in sorted(course_ids):
+        index_course(course_id)
+
+# PostgreSQL에서 tsvector를 가중치와 함께 계산
+def update_vectors(queryset):
+    queryset.update(vector=SearchVector('title', weight='A') + SearchVector('modules', weight='B') + SearchVector('texts', weight='C'))
+
+def remove_course(course_id):
+    CourseSearchDocument.objects.filter(course_id=course_id).delete()
+    if _index is not None:
+        _index.remove(course_id)
+
+# 텍스트 콘텐츠가 포함된 강좌 id
+def courses_for_text(text_id):
+    return Content.objects.filter(content_type=ContentType.objects.get_for_model(Text), object_id=text_id).values_list('module__course_id', flat=True).distinct()
+
+# 검색어와 일치하는 (강좌 id, 점수) 목록을 점수 순서로 반환
+def search(query, limit=MAX_RESULTS):
+    query = query.strip()
+    if not query:
+        return []
+    if use_postgres():
+        search_query = SearchQuery(query, search_type='websearch')
+        return list(CourseSearchDocument.objects.filter(vector=search_query)
+                    .annotate(rank=SearchRank(F('vector'), search_query))
+                    .order_by('-rank','-course_id')
+                    .values_list('course_id','rank')[:limit])
+    return get_index().search(query, limit)
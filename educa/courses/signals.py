@@ -0,0 +1,217 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Subject, Course, Module, Content, Text, Image, File, ApiToken
+from . import catalog, search, derivatives, tokens
+from .outline import invalidate_outline
+from .counters import increment, decrement
+from .enrollment import Enrollment, invalidate_enrolled_courses
+from .media import invalidate_access, access_key
+
+# 카운터 컬럼 갱신
+# 목록 캐시의 세대를 올리기 전에 카운터가 갱신되도록 먼저 연결한다.
+# 카운터를 가진 부모가 함께 삭제되는 경우(origin이 부모나 그 조상인 경우)는 부모의 카운터를 갱신하지 않는다.
+# 강사(User)가 삭제되는 경우처럼 부모가 남아있는 삭제는 카운터를 갱신한다.
+def _parent_deleted(origin, parents):
+    return isinstance(origin, parents)
+
+# 강좌의 주제가 변경되었는지 알 수 있도록 불러온 주제 id를 저장
+@receiver(post_init, sender=Course)
+def remember_course_subject(sender, instance, **kwargs):
+    instance._loaded_subject_id = instance.__dict__.get('subject_id')
+
+@receiver(post_save, sender=Course)
+def count_course_saved(sender, instance, created, **kwargs):
+    previous = instance._loaded_subject_id
+    if created:
+        increment(Subject.objects.filter(id=instance.subject_id), 'num_courses')
+    elif previous is not None and previous != instance.subject_id:
+        decrement(Subject.objects.filter(id=previous), 'num_courses')
+        increment(Subject.objects.filter(id=instance.subject_id), 'num_courses')
+    instance._loaded_subject_id = instance.subject_id
+
+@receiver(post_delete, sender=Course)
+def count_course_deleted(sender, instance, origin=None, **kwargs):
+    if not _parent_deleted(origin, (Subject,)):
+        decrement(Subject.objects.filter(id=instance.subject_id), 'num_courses')
+
+@receiver(post_save, sender=Module)
+def count_module_saved(sender, instance, created, **kwargs):
+    if created:
+        increment(Course.objects.filter(id=instance.course_id), 'num_modules')
+
+@receiver(post_delete, sender=Module)
+def count_module_deleted(sender, instance, origin=None, **kwargs):
+    if not _parent_deleted(origin, (Course, Subject)):
+        decrement(Course.objects.filter(id=instance.course_id), 'num_modules')
+
+@receiver(post_save, sender=Content)
+def count_content_saved(sender, instance, created, **kwargs):
+    if created:
+        increment(Module.objects.filter(id=instance.module_id), 'num_contents')
+
+@receiver(post_delete, sender=Content)
+def count_content_deleted(sender, instance, origin=None, **kwargs):
+    if not _parent_deleted(origin, (Module, Course, Subject)):
+        decrement(Module.objects.filter(id=instance.module_id), 'num_contents')
+
+# instance에 등록된 강좌 id(reverse) 또는 학생 id
+# clear()는 post_clear 에서 pk_set을 알 수 없으므로 pre_clear 에서 이 함수로 미리 id를 가져온다.
+def _enrolled_ids(instance, reverse):
+    related = instance.courses_joined if reverse else instance.students
+    return set(related.values_list('id', flat=True))
+
+# 등록된 학생 수
+# remove()는 등록되지 않은 id도 pk_set에 포함하므로 pre_remove 에서 실제로 삭제될 id만 남긴다.
+@receiver(m2m_changed, sender=Course.students.through)
+def count_students(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._cleared_student_ids = _enrolled_ids(instance, reverse)
+        return
+    if action == 'pre_remove':
+        if reverse:
+            instance._removed_enrollment_ids = set(Enrollment.objects.filter(user_id=instance.id, course_id__in=pk_set).values_list('course_id', flat=True))
+        else:
+            instance._removed_enrollment_ids = set(Enrollment.objects.filter(course_id=instance.id, user_id__in=pk_set).values_list('user_id', flat=True))
+        return
+    if action == 'post_add':
+        # add()와 bulk 등록 모두 이미 등록된 id를 제외한 pk_set을 보낸다.
+        ids, update = pk_set, increment
+    elif action == 'post_remove':
+        ids, update = instance.__dict__.pop('_removed_enrollment_ids', set()), decrement
+    elif action == 'post_clear':
+        ids, update = instance.__dict__.pop('_cleared_student_ids', set()), decrement
+    else:
+        return
+    if not ids:
+        return
+    if reverse:
+        update(Course.objects.filter(id__in=ids), 'num_students')
+    else:
+        update(Course.objects.filter(id=instance.id), 'num_students', len(ids))
+
+
+# 강좌 목록에 영향을 주는 모델이 변경되면 목록 캐시의 세대를 올린다.
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def invalidate_catalog(sender, **kwargs):
+    catalog.bump_generation()
+
+
+# 강좌나 모듈이 변경되면 강좌 개요 캐시를 삭제
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_outline(sender, instance, **kwargs):
+    invalidate_outline(instance.id)
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def invalidate_module_outline(sender, instance, **kwargs):
+    invalidate_outline(instance.course_id)
+
+
+# 사용자가 삭제되면 중간 테이블의 행은 시그널 없이 함께 삭제되므로 등록한 강좌의 학생 수를 직접 줄인다.
+@receiver(pre_delete, sender=User)
+def count_deleted_student(sender, instance, **kwargs):
+    decrement(Course.objects.filter(id__in=Enrollment.objects.filter(user_id=instance.id).values('course_id')), 'num_students')
+
+
+# 학생 등록이 변경되면 학생들의 등록 강좌 집합 캐시를 삭제
+# 커밋 전에 삭제하면 다른 프로세스가 커밋 전의 등록 정보를 다시 캐시에 저장할 수 있으므로 커밋된 뒤에 삭제한다.
+# clear()나 강좌 삭제는 커밋 시점에 행이 남아있지 않으므로 삭제할 id를 미리 가져온다.
+def _invalidate_on_commit(user_ids):
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: invalidate_enrolled_courses(user_ids))
+
+@receiver(m2m_changed, sender=Course.students.through)
+def invalidate_enrollment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add','post_remove','pre_clear'):
+        return
+    if reverse:
+        _invalidate_on_commit([instance.id])
+    elif action == 'pre_clear':
+        _invalidate_on_commit(_enrolled_ids(instance, reverse))
+    else:
+        _invalidate_on_commit(pk_set)
+
+# 강좌가 삭제되면 중간 테이블의 행은 시그널 없이 함께 삭제되므로 등록한 학생들의 캐시를 삭제
+@receiver(pre_delete, sender=Course)
+def invalidate_course_enrollment(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.students.values_list('id', flat=True))
+
+
+# 강좌 검색 문서를 변경된 강좌만 트랜잭션이 커밋된 뒤에 한번씩 다시 만든다.
+# 강좌나 모듈이 삭제되면서 함께 삭제되는 객체(origin이 자신이 아닌 경우)는 다시 만들지 않는다.
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, **kwargs):
+    search.schedule_index(instance.id)
+
+@receiver(post_delete, sender=Course)
+def remove_course_from_index(sender, instance, **kwargs):
+    search.remove_course(instance.id)
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def index_module_course(sender, instance, origin=None, **kwargs):
+    if origin is None or origin is instance:
+        search.schedule_index(instance.course_id)
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+def index_content_course(sender, instance, origin=None, **kwargs):
+    if (origin is None or origin is instance) and instance.content_type.model == 'text':
+        search.schedule_index(Module.objects.values_list('course_id', flat=True).get(id=instance.module_id))
+
+@receiver(post_save, sender=Text)
+def index_text_courses(sender, instance, **kwargs):
+    for course_id in search.courses_for_text(instance.id):
+        search.schedule_index(course_id)
+
+
+# 이미지가 저장되면 백그라운드에서 파생 이미지를 만든다.
+@receiver(post_save, sender=Image)
+def create_image_derivatives(sender, instance, **kwargs):
+    if instance.file:
+        derivatives.schedule([instance.id])
+
+
+# 미디어 파일을 받을 수 있는 강좌가 바뀌면 접근 캐시를 삭제
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+def invalidate_content_media(sender, instance, **kwargs):
+    if instance.content_type.model in ('image','file'):
+        item = instance.item
+        if item is not None:
+            invalidate_access(item)
+
+@receiver(post_delete, sender=Image)
+@receiver(post_delete, sender=File)
+def invalidate_item_media(sender, instance, **kwargs):
+    if instance.file:
+        cache.delete(access_key(instance.file.name))
+
+
+# 토큰이 폐기되거나 사용자와 함께 삭제되면 토큰 캐시를 삭제
+@receiver(post_delete, sender=ApiToken)
+def invalidate_api_token(sender, instance, **kwargs):
+    tokens.invalidate_token(instance.digest)
+
+# 비밀번호가 바뀌었거나 비활성화되었는지 알 수 있도록 불러온 값을 저장
+@receiver(post_init, sender=User)
+def remember_user_credentials(sender, instance, **kwargs):
+    instance._loaded_credentials = (instance.__dict__.get('password'), instance.__dict__.get('is_active'))
+
+# 비밀번호를 바꾸거나 비활성화된 사용자의 토큰을 모두 폐기
+@receiver(post_save, sender=User)
+def revoke_tokens_on_credentials_change(sender, instance, created, **kwargs):
+    password, is_active = instance._loaded_credentials
+    if not created and (password != instance.password or (is_active and not instance.is_active)):
+        tokens.revoke_user_tokens(instance)
+    instance._loaded_credentials = (instance.password, instance.is_active)
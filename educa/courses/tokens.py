@@ -0,0 +1,134 @@
+import copy
+import datetime
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ApiToken
+
+# API 인증 토큰
+# BasicAuthentication은 요청마다 PBKDF2로 비밀번호를 확인하므로 CPU를 수십 ms 사용한다.
+# 토큰은 임의의 문자열이므로 SHA-256 한번으로 확인하고 다이제스트로 사용자를 찾는다.
+# 다이제스트 -> (토큰 id, 사용자 id, 만료 시간)을 공유 캐시에 CACHE_TIMEOUT 동안 저장하고
+# 프로세스 메모리의 LRU에는 사용자 객체와 함께 LOCAL_TIMEOUT 동안 유지하므로 대부분의 요청은 쿼리 없이 인증된다.
+# 토큰을 폐기하면 이 프로세스의 LRU와 공유 캐시에서 바로 삭제되고, 다른 프로세스의 LRU에서는 LOCAL_TIMEOUT 안에 사라진다.
+
+TOKEN_BYTES = 32
+
+# 토큰이 올바르지 않거나 만료되었을 때 발생
+class InvalidToken(Exception):
+    pass
+
+def get_setting(name):
+    return settings.API_TOKENS[name]
+
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def token_key(digest):
+    return f'api-token:{digest}'
+
+# 만료 시간이 있는 항목을 최근에 사용한 순서로 유지하고 LOCAL_SIZE를 넘으면 가장 오래 사용하지 않은 항목을 삭제
+class LRUCache:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > get_setting('LOCAL_SIZE'):
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+_local = LRUCache()
+
+# 사용자에게 새 토큰을 발급하고 (토큰 원문, ApiToken)을 반환
+# 토큰 원문은 저장하지 않으므로 이때만 알 수 있다.
+def create_token(user, name=''):
+    token = secrets.token_urlsafe(TOKEN_BYTES)
+    expire = get_setting('EXPIRE')
+    expires = timezone.now() + datetime.timedelta(seconds=expire) if expire else None
+    api_token = ApiToken.objects.create(user=user, digest=token_digest(token), name=name[:100], expires=expires)
+    return token, api_token
+
+# 토큰 캐시 삭제 (ApiToken이 삭제되면 post_delete 시그널에서 호출)
+def invalidate_token(digest):
+    key = token_key(digest)
+    _local.delete(key)
+    cache.delete(key)
+
+def revoke_token(token_id):
+    for api_token in ApiToken.objects.filter(id=token_id):
+        api_token.delete()
+
+def revoke_user_tokens(user):
+    for api_token in ApiToken.objects.filter(user=user):
+        api_token.delete()
+
+# 만료된 토큰을 삭제하고 삭제한 수를 반환
+def clear_expired():
+    count = 0
+    for api_token in ApiToken.objects.filter(expires__lt=timezone.now()).iterator():
+        api_token.delete()
+        count += 1
+    return count
+
+# 다이제스트로 ((토큰 id, 사용자 id, 만료 시간), 사용자)를 한번의 쿼리로 가져온다.
+def _load(digest):
+    api_token = ApiToken.objects.select_related('user').filter(digest=digest).first()
+    if api_token is None:
+        return None, None
+    expires = api_token.expires.timestamp() if api_token.expires else None
+    return (api_token.id, api_token.user_id, expires), api_token.user
+
+# 토큰의 (사용자, 토큰 id)를 반환
+# 요청에서 사용자 객체의 권한 캐시 등을 변경해도 LRU의 객체에 남지 않도록 복사본을 반환한다.
+def get_token_user(token):
+    digest = token_digest(token)
+    key = token_key(digest)
+    entry = _local.get(key)
+    if entry is None:
+        cached, user = cache.get(key), None
+        if cached is None:
+            cached, user = _load(digest)
+            if cached is None:
+                raise InvalidToken('Invalid token.')
+            cache.set(key, cached, get_setting('CACHE_TIMEOUT'))
+        token_id, user_id, expires = cached
+        if user is None:
+            user = User.objects.filter(id=user_id).first()
+        if user is None or not user.is_active:
+            raise InvalidToken('User inactive or deleted.')
+        entry = (token_id, user, expires)
+        _local.set(key, entry, get_setting('LOCAL_TIMEOUT'))
+    token_id, user, expires = entry
+    if expires is not None and expires <= time.time():
+        raise InvalidToken('Token has expired.')
+    return copy.copy(user), token_id
@@ -0,0 +1,260 @@
+import io
+import json
+import tarfile
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File as DjangoFile
+from django.db import transaction
+
+from .models import Subject, Course, Module, Content, Text, Video, Image, File
+from . import catalog, search, derivatives
+
+# 강좌 내보내기/가져오기
+# 하나의 tar 파일에 강좌, 모듈, 콘텐츠를 한 줄에 하나씩 저장한 course.ndjson 과
+# 이미지/파일 아이템의 미디어 파일(media/<파일 이름>)을 저장한다.
+# 내보내기는 iterator(chunk_size=...)로 읽어서 스트림으로 쓰고
+# 가져오기는 BATCH_SIZE 단위로 bulk_create() 하므로 메모리 사용량이 강좌 크기와 관계없이 일정하다.
+
+FORMAT_VERSION = 1
+NDJSON_NAME = 'course.ndjson'
+MEDIA_PREFIX = 'media/'
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+
+# 아이템 종류별 모델과 내보내는 필드
+ITEM_MODELS = {'text': Text, 'video': Video, 'image': Image, 'file': File}
+ITEM_FIELDS = {'text': ('content',), 'video': ('url',), 'image': ('file',), 'file': ('file',)}
+MEDIA_TYPES = ('image', 'file')
+
+# 가져올 파일이 올바르지 않을 때 발생
+class TransferError(Exception):
+    pass
+
+
+# 내보내기
+
+def _records(course):
+    yield {'type': 'course', 'version': FORMAT_VERSION, 'title': course.title, 'slug': course.slug, 'overview': course.overview,
+           'subject': {'title': course.subject.title, 'slug': course.subject.slug}}
+    for module in Module.objects.filter(course=course).order_by('order','id').values('id','title','description').iterator(chunk_size=CHUNK_SIZE):
+        yield {'type': 'module', **module}
+    # 청크마다 아이템을 종류별로 한번에 가져온다.
+    contents = Content.objects.filter(module__course=course).order_by('module__order','module_id','order','id').prefetch_related('item')
+    for content in contents.iterator(chunk_size=CHUNK_SIZE):
+        item = content.item
+        if item is None:
+            continue
+        item_type = item._meta.model_name
+        record = {'type': 'content', 'module': content.module_id, 'item_type': item_type, 'title': item.title}
+        for field in ITEM_FIELDS[item_type]:
+            value = getattr(item, field)
+            if item_type in MEDIA_TYPES:
+                # 저장소에 없는 파일은 아카이브에 포함되지 않으므로 이름도 내보내지 않는다.
+                value = value.name if value and value.storage.exists(value.name) else ''
+            record[field] = value
+        yield record
+
+# 강좌에 포함된 미디어 파일 이름
+def _media_names(course):
+    for item_type in MEDIA_TYPES:
+        model = ITEM_MODELS[item_type]
+        object_ids = Content.objects.filter(module__course=course, content_type=ContentType.objects.get_for_model(model)).values('object_id')
+        for name in model.objects.filter(id__in=object_ids).order_by('id').values_list('file', flat=True).iterator(chunk_size=CHUNK_SIZE):
+            if name:
+                yield model._meta.get_field('file').storage, name
+
+# tarfile이 쓰는 데이터를 모아두었다가 스트림으로 내보내기 위한 파일 객체
+class _ChunkWriter:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def _add_member(tar, name, fileobj, size):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(time.time())
+    tar.addfile(info, fileobj)
+
+# 강좌를 tar 스트림으로 내보내며 파일 하나를 추가할 때마다 쓰여진 바이트를 반환
+# StreamingHttpResponse 와 내보내기 명령에서 사용한다.
+def iter_archive(course):
+    writer = _ChunkWriter()
+    with tarfile.open(fileobj=writer, mode='w|') as tar:
+        # 크기를 알아야 tar에 추가할 수 있으므로 NDJSON은 임시 파일에 먼저 쓴다.
+        with tempfile.TemporaryFile() as ndjson:
+            for record in _records(course):
+                ndjson.write(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+                ndjson.write(b'\n')
+            size = ndjson.tell()
+            ndjson.seek(0)
+            _add_member(tar, NDJSON_NAME, ndjson, size)
+        yield writer.take()
+        for storage, name in _media_names(course):
+            # 저장소에 없는 파일은 건너뛴다.
+            if not storage.exists(name):
+                continue
+            with storage.open(name, 'rb') as media:
+                _add_member(tar, MEDIA_PREFIX + name, media, storage.size(name))
+            yield writer.take()
+    yield writer.take()
+
+def export_course(course, fileobj):
+    for chunk in iter_archive(course):
+        fileobj.write(chunk)
+
+
+# 가져오기
+
+class _Importer:
+    def __init__(self, owner, tar, members, slug=None):
+        self.owner = owner
+        self.tar = tar
+        self.members = members
+        self.slug = slug
+        self.course = None
+        # 내보낸 모듈 id -> 새 모듈
+        self.modules = {}
+        self.pending_modules = []
+        # (모듈, 아이템) 목록
+        self.pending_contents = []
+        self.num_contents = Counter()
+        # 저장소에 저장한 (저장소, 이름) 목록, 가져오기에 실패하면 삭제한다.
+        self.saved_media = []
+
+    def add(self, record):
+        kind = record.get('type')
+        if kind == 'course':
+            self.add_course(record)
+        elif self.course is None:
+            raise TransferError('The archive must start with a course record.')
+        elif kind == 'module':
+            self.add_module(record)
+        elif kind == 'content':
+            self.add_content(record)
+        else:
+            raise TransferError(f'Unknown record type: {kind!r}')
+
+    def add_course(self, record):
+        if self.course is not None:
+            raise TransferError('The archive contains more than one course.')
+        if record.get('version') != FORMAT_VERSION:
+            raise TransferError(f"Unsupported archive version: {record.get('version')!r}")
+        slug = self.slug or record['slug']
+        if Course.objects.filter(slug=slug).exists():
+            raise TransferError(f'A course with the slug {slug!r} already exists.')
+        subject, _ = Subject.objects.get_or_create(slug=record['subject']['slug'], defaults={'title': record['subject']['title']})
+        self.course = Course.objects.create(owner=self.owner, subject=subject, title=record['title'], slug=slug, overview=record['overview'])
+
+    def add_module(self, record):
+        module = Module(course=self.course, title=record['title'], description=record.get('description', ''))
+        self.modules[record['id']] = module
+        self.pending_modules.append(module)
+        if len(self.pending_modules) >= BATCH_SIZE:
+            self.flush_modules()
+
+    def add_content(self, record):
+        self.flush_modules()
+        module = self.modules.get(record.get('module'))
+        model = ITEM_MODELS.get(record.get('item_type'))
+        if module is None or model is None:
+            raise TransferError('Content record refers to an unknown module or item type.')
+        item = model(owner=self.owner, title=record['title'])
+        for field in ITEM_FIELDS[record['item_type']]:
+            value = record[field]
+            if record['item_type'] in MEDIA_TYPES:
+                value = self.save_media(model, value)
+            setattr(item, field, value)
+        self.pending_contents.append((module, item))
+        if len(self.pending_contents) >= BATCH_SIZE:
+            self.flush_contents()
+
+    # 아카이브의 미디어 파일을 저장소에 새로 저장하고 저장된 이름을 반환
+    # 아카이브에 없는 파일은 저장소의 다른 파일을 가리킬 수 있으므로 허용하지 않는다.
+    def save_media(self, model, name):
+        if not name:
+            return name
+        member = self.members.get(MEDIA_PREFIX + name)
+        if member is None:
+            raise TransferError(f'The archive does not contain the media file {name!r}.')
+        storage = model._meta.get_field('file').storage
+        saved = storage.save(name, DjangoFile(self.tar.extractfile(member), name=name))
+        self.saved_media.append((storage, saved))
+        return saved
+
+    def delete_media(self):
+        for storage, name in self.saved_media:
+            storage.delete(name)
+        self.saved_media = []
+
+    def flush_modules(self):
+        if not self.pending_modules:
+            return
+        Module._meta.get_field('order').assign(self.pending_modules)
+        Module.objects.bulk_create(self.pending_modules)
+        self.pending_modules = []
+
+    def flush_contents(self):
+        if not self.pending_contents:
+            return
+        items = defaultdict(list)
+        for module, item in self.pending_contents:
+            items[type(item)].append(item)
+        for model, objs in items.items():
+            model.objects.bulk_create(objs)
+        # bulk_create()는 post_save 시그널을 보내지 않으므로 파생 이미지를 직접 예약
+        derivatives.schedule(image.id for image in items.get(Image, ()) if image.file)
+        contents = [Content(module=module, content_type=ContentType.objects.get_for_model(item), object_id=item.id) for module, item in self.pending_contents]
+        Content._meta.get_field('order').assign(contents)
+        Content._meta.get_field('progress_index').assign(contents)
+        Content.objects.bulk_create(contents)
+        self.num_contents.update(module.id for module, item in self.pending_contents)
+        self.pending_contents = []
+
+    # bulk_create()는 시그널을 보내지 않으므로 카운터, 목록 캐시, 검색 문서를 직접 갱신
+    def finish(self):
+        if self.course is None:
+            raise TransferError('The archive does not contain a course.')
+        self.flush_modules()
+        self.flush_contents()
+        modules = list(self.modules.values())
+        for module in modules:
+            module.num_contents = self.num_contents[module.id]
+        Module.objects.bulk_update(modules, ['num_contents'], batch_size=BATCH_SIZE)
+        Course.objects.filter(id=self.course.id).update(num_modules=len(modules))
+        self.course.num_modules = len(modules)
+        catalog.bump_generation()
+        search.index_course(self.course.id)
+        return self.course
+
+# tar 파일에서 강좌를 가져와 owner 소유의 새 강좌로 만들고 반환
+# slug - 지정하면 내보낸 강좌의 slug 대신 사용
+def import_course(fileobj, owner, slug=None):
+    try:
+        with tarfile.open(fileobj=fileobj, mode='r:*') as tar:
+            members = {member.name: member for member in tar.getmembers() if member.isfile()}
+            if NDJSON_NAME not in members:
+                raise TransferError(f'The archive does not contain {NDJSON_NAME}.')
+            importer = _Importer(owner, tar, members, slug)
+            try:
+                with transaction.atomic():
+                    for line in io.TextIOWrapper(tar.extractfile(members[NDJSON_NAME]), encoding='utf-8'):
+                        if line.strip():
+                            importer.add(json.loads(line))
+                    return importer.finish()
+            except BaseException:
+                # 트랜잭션이 롤백되면 저장한 미디어 파일도 삭제
+                importer.delete_media()
+                raise
+    except (tarfile.TarError, ValueError, KeyError) as e:
+        raise TransferError(f'Invalid archive: {e}')
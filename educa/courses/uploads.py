@@ -0,0 +1,170 @@
+import datetime
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import Content, Upload
+from .fragments import store_fragments
+
+# 파일/이미지 콘텐츠를 나누어 업로드
+# 1. start_upload() - 파일 이름, 크기, 체크섬으로 업로드를 시작
+# 2. write_chunk() - offset 위치부터 조각을 스테이징 파일에 이어서 쓴다. 연결이 끊기면 받은 offset부터 다시 보낸다.
+# 3. finish_upload() - 체크섬을 확인하고 파일을 저장소로 옮긴 뒤 아이템과 Content를 생성
+# 조각은 BLOCK_SIZE 단위로 읽고 쓰기 때문에 업로드마다 메모리 사용량이 파일 크기와 관계없이 일정하다.
+
+MODEL_NAMES = ('image', 'file')
+BLOCK_SIZE = 64 * 1024
+CHECKSUM_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# 업로드 요청이 올바르지 않을 때 발생
+class UploadError(Exception):
+    pass
+
+# 요청한 offset이 지금까지 받은 바이트 수와 다를 때 발생
+class OffsetMismatch(UploadError):
+    def __init__(self, offset):
+        super().__init__(f'Expected offset {offset}.')
+        self.offset = offset
+
+def get_setting(name):
+    return settings.CHUNKED_UPLOAD[name]
+
+def staging_path(upload):
+    return Path(get_setting('STAGING_DIR')) / f'{upload.id}.part'
+
+# 스테이징 파일을 저장소로 옮기기 위한 파일 객체
+# temporary_file_path()가 있으면 FileSystemStorage는 복사하지 않고 파일을 이동한다.
+class StagedFile(File):
+    def __init__(self, path, name):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return str(self.path)
+
+def start_upload(owner, module, model_name, title, filename, size, checksum=''):
+    if model_name not in MODEL_NAMES:
+        raise UploadError(f'Uploads are only supported for {", ".join(MODEL_NAMES)} content.')
+    if not title:
+        raise UploadError('A title is required.')
+    try:
+        filename = get_valid_filename(os.path.basename(filename or ''))
+    except SuspiciousFileOperation:
+        raise UploadError('Invalid file name.')
+    if not isinstance(size, int) or size <= 0 or size > get_setting('MAX_SIZE'):
+        raise UploadError(f"Size must be between 1 and {get_setting('MAX_SIZE')} bytes.")
+    checksum = (checksum or '').lower()
+    if checksum and not CHECKSUM_RE.match(checksum):
+        raise UploadError('Checksum must be a hex encoded SHA-256 digest.')
+    upload = Upload.objects.create(owner=owner, module=module, model_name=model_name, title=title[:250], filename=filename, size=size, checksum=checksum)
+    path = staging_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return upload
+
+# stream에서 length 바이트를 읽어 upload의 offset 위치에 쓰고 새 offset을 반환
+# checksum - 조각의 SHA-256 (선택), 일치하지 않으면 쓴 내용을 버린다.
+def write_chunk(upload, offset, stream, length, checksum=''):
+    if length <= 0 or length > get_setting('CHUNK_SIZE'):
+        raise UploadError(f"Chunks must be between 1 and {get_setting('CHUNK_SIZE')} bytes.")
+    with transaction.atomic():
+        # 같은 업로드에 동시에 도착한 조각이 서로 덮어쓰지 않도록 잠근다.
+        upload = Upload.objects.select_for_update().get(id=upload.id)
+        if offset != upload.offset:
+            raise OffsetMismatch(upload.offset)
+        if offset + length > upload.size:
+            raise UploadError('Chunk exceeds the declared file size.')
+        digest = hashlib.sha256()
+        received = 0
+        with open(staging_path(upload), 'r+b') as f:
+            f.seek(offset)
+            while received < length:
+                block = stream.read(min(BLOCK_SIZE, length - received))
+                if not block:
+                    break
+                f.write(block)
+                digest.update(block)
+                received += len(block)
+            # 조각을 모두 받지 못했거나 체크섬이 다르면 받기 전 상태로 되돌린다.
+            if received != length or (checksum and digest.hexdigest() != checksum.lower()):
+                f.truncate(offset)
+                raise UploadError('Incomplete chunk.' if received != length else 'Chunk checksum mismatch.')
+            f.truncate(offset + length)
+        upload.offset = offset + length
+        upload.save(update_fields=['offset','updated'])
+    return upload.offset
+
+def _file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE * 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# 모든 조각을 받은 업로드로 아이템과 Content를 생성하고 Content를 반환
+def finish_upload(upload):
+    with transaction.atomic():
+        # 같은 업로드를 동시에 완료하지 않도록 잠근다. 먼저 완료된 요청이 업로드를 삭제한다.
+        try:
+            upload = Upload.objects.select_for_update().get(id=upload.id)
+        except Upload.DoesNotExist:
+            raise UploadError('Upload has already been completed.')
+        if upload.offset != upload.size:
+            raise UploadError(f'Upload is incomplete ({upload.offset}/{upload.size} bytes).')
+        path = staging_path(upload)
+        if not path.exists():
+            raise UploadError('Upload has already been completed.')
+        if upload.checksum and _file_checksum(path) != upload.checksum:
+            # 처음부터 다시 업로드 (예외로 되돌려지지 않도록 블록을 빠져나온 뒤에 알린다)
+            with open(path, 'wb'):
+                pass
+            upload.offset = 0
+            upload.save(update_fields=['offset','updated'])
+            content = None
+        else:
+            content = _create_content(upload, path)
+    if content is None:
+        raise UploadError('Checksum mismatch, the upload has been reset.')
+    store_fragments([content.item])
+    return content
+
+def _create_content(upload, path):
+    model = apps.get_model('courses', upload.model_name)
+    item = model(owner=upload.owner, title=upload.title)
+    staged = StagedFile(path, upload.filename)
+    try:
+        item.file.save(upload.filename, staged, save=False)
+    finally:
+        staged.close()
+    try:
+        item.save()
+        content = Content.objects.create(module=upload.module, item=item)
+        upload.delete()
+    except BaseException:
+        # 저장에 실패하면 옮긴 파일을 스테이징으로 되돌려 다시 완료할 수 있게 한다.
+        file_move_safe(item.file.path, str(path))
+        raise
+    return content
+
+def abort_upload(upload):
+    staging_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+# EXPIRE 동안 조각을 받지 못한 업로드를 삭제하고 삭제한 수를 반환
+def clear_expired():
+    expired = Upload.objects.filter(updated__lt=timezone.now() - datetime.timedelta(seconds=get_setting('EXPIRE')))
+    count = 0
+    for upload in expired.iterator():
+        abort_upload(upload)
+        count += 1
+    return count
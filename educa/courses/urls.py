@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
@@ -11,10 +12,14 @@ urlpatterns = [
     path('<pk>/module/',views.CourseModuleUpdateView.as_view(), name='course_module_update'),
     path('module/<int:module_id>/content/<model_name>/create/', views.ContentCreateUpdateView.as_view(), name='module_content_create'),
     path('module/<int:module_id>/content/<model_name>/<id>/',views.ContentCreateUpdateView.as_view(), name='module_content_update'),
+    path('module/<int:module_id>/upload/<model_name>/', views.UploadCreateView.as_view(), name='module_content_upload'),
+    path('upload/<uuid:id>/', views.UploadView.as_view(), name='content_upload'),
+    path('upload/<uuid:id>/complete/', views.UploadCompleteView.as_view(), name='content_upload_complete'),
+    path('image/<int:id>/<int:width>/', views.ImageDerivativeView.as_view(), name='image_derivative'),
     path('content/<int:id>/delete/', views.ContentDeleteView.as_view(), name='module_content_delete'),
     path('content/<int:module_id>/', views.ModuleContentListView.as_view(), name='module_content_list'),
     path('module/order/',views.ModuleOrderView.as_view(), name='module_order'),
     path('content/order/', views.ContentOrderView.as_view(), name='content_order'),
-    path('subject/<slug:subject>/', views.CourseListView.as_view(), name='course_list_subject'),
-    path('<slug:slug>/', views.CourseDetailView.as_view(), name='course_detail'),
+    path('subject/<slug:subject>/', (views.AsyncCourseListView if settings.ASYNC_VIEWS else views.CourseListView).as_view(), name='course_list_subject'),
+    path('<slug:slug>/', (views.AsyncCourseDetailView if settings.ASYNC_VIEWS else views.CourseDetailView).as_view(), name='course_detail'),
 ]
@@ -1,15 +1,28 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.views import generic
 from django.urls import reverse_lazy
 from django.shortcuts import redirect, get_object_or_404
+from django.http import Http404, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.core.paginator import Paginator
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.forms.models import modelform_factory
 from django.apps import apps
+from django.db.models import Prefetch, OuterRef, Subquery
 from braces.views import CsrfExemptMixin, JsonRequestResponseMixin
-from django.db.models import Count
-from django.core.cache import cache
+from monitoring.budget import QueryBudgetMixin
 
-from .models import Course, Module, Content, Subject
+from .models import Course, Module, Content, Upload, Image
 from .forms import ModuleFormSet
+from .fragments import store_fragments
+from .ordering import bulk_reorder, ReorderError
+from .uploads import start_upload, write_chunk, finish_upload, abort_upload, UploadError, OffsetMismatch, MODEL_NAMES
+from . import catalog
+from .outline import invalidate_outline
+from .derivatives import get_derivative
+from .media import can_access, clean_path, media_response
+from .search import search as search_courses
 from students.forms import CourseEnrollForm
 
 # Create your views here.
@@ -46,24 +59,36 @@ class OwnerCourseEditMixin(OwnerCourseMixin,OwnerEditMixin):
     # CreateView 와 UpdateView 에 사용할 템플릿
     template_name = 'courses/manage/course/form.html'
 
-class ManageCourseListView(OwnerCourseMixin, generic.ListView):
+class ManageCourseListView(QueryBudgetMixin, OwnerCourseMixin, generic.ListView):
+    query_budget = 5
     template_name = 'courses/manage/course/list.html'
     permission_required = 'courses.view_course'
 
-class CourseCreateView(OwnerCourseEditMixin, generic.CreateView):
+    # 강좌마다 첫번째 모듈을 가져오지 않도록 첫번째 모듈 id를 함께 가져온다.
+    def get_queryset(self):
+        first_module = Module.objects.filter(course=OuterRef('pk')).order_by('order').values('id')[:1]
+        return super().get_queryset().annotate(first_module_id=Subquery(first_module))
+
+class CourseCreateView(QueryBudgetMixin, OwnerCourseEditMixin, generic.CreateView):
+    query_budget = {'get': 5, 'post': 18}
     permission_required = 'courses.add_course'
 
-class CourseUpdateView(OwnerCourseEditMixin, generic.UpdateView):
+class CourseUpdateView(QueryBudgetMixin, OwnerCourseEditMixin, generic.UpdateView):
+    query_budget = {'get': 6, 'post': 16}
     permission_required = 'courses.change_course'
 
-class CourseDeleteView(OwnerCourseMixin, generic.DeleteView):
+class CourseDeleteView(QueryBudgetMixin, OwnerCourseMixin, generic.DeleteView):
+    # 강좌 삭제는 모듈과 콘텐츠 수에 비례하므로 확인하지 않는다.
+    query_budget = {'get': 6}
     template_name = 'courses/manage/course/delete.html'
     permission_required = 'courses.delete_course'
 
 # 특정 코스에 대한 모듈 추가, 업데이트, 삭제하기 위해 폼셋을 처리
 # TemplateResponseMixin - 템플릿을 렌더링하고 HTTP 응답을 반환 render_to_response()메서드를 제공하고 이 메서드를 사용하여 컨텍스트를 전달하고 템플릿을 렌더링
 # View - 기본 클래스 기반 뷰
-class CourseModuleUpdateView(generic.base.TemplateResponseMixin, generic.base.View):
+class CourseModuleUpdateView(QueryBudgetMixin, generic.base.TemplateResponseMixin, generic.base.View):
+    # 폼셋 저장은 변경된 모듈 수에 비례하므로 확인하지 않는다.
+    query_budget = {'get': 5}
     template_name = 'courses/manage/module/formset.html'
     course = None
 
@@ -90,7 +115,8 @@ class CourseModuleUpdateView(generic.base.TemplateResponseMixin, generic.base.Vi
             return redirect('manage_course_list')
         return self.render_to_response({'course':self.course, 'formset':formset})
     
-class ContentCreateUpdateView(generic.base.TemplateResponseMixin, generic.base.View):
+class ContentCreateUpdateView(QueryBudgetMixin, generic.base.TemplateResponseMixin, generic.base.View):
+    query_budget = {'get': 5, 'post': 28}
     module = None
     model = None
     obj = None
@@ -127,7 +153,7 @@ class ContentCreateUpdateView(generic.base.TemplateResponseMixin, generic.base.V
     # 그렇지 않으면 새로운 객체를 생성하기 때문에 인스턴스를 지정하지 않고 빈폼을 생성(self.obj 가 None이기 때문)
     def get(self, request, module_id, model_name, id=None):
         form = self.get_form(self.model, instance=self.obj)
-        return self.render_to_response({'form':form, 'object': self.obj})
+        return self.render_to_response(self.get_context(form))
     
     # post 요청이 수신되었들때 실행
     def post(self, request, module_id, model_name, id=None):
@@ -138,6 +164,8 @@ class ContentCreateUpdateView(generic.base.TemplateResponseMixin, generic.base.V
             obj = form.save(commit=False)
             obj.owner = request.user
             obj.save()
+            # 저장된 아이템의 HTML을 미리 렌더링하여 저장
+            store_fragments([obj])
 
             # id 매개변수를 확인하여 id가 제공되지 않은 경우 사용자가 기존 객체를 업데이트하는 대신 새로운 객체를 생성
             # 주어진 모듈에 대해 Content 객체를 생성하고 새 콘텐츠를 연결
@@ -147,9 +175,14 @@ class ContentCreateUpdateView(generic.base.TemplateResponseMixin, generic.base.V
                 
             return redirect('module_content_list', self.module.id)
             
-        return self.render_to_response({'form':form, 'object': self.obj})
+        return self.render_to_response(self.get_context(form))
+
+    # 새 파일/이미지 콘텐츠는 템플릿에서 나누어 업로드한다.
+    def get_context(self, form):
+        return {'form':form, 'object': self.obj, 'module': self.module, 'model_name': self.model._meta.model_name, 'chunked_upload': self.obj is None and self.model._meta.model_name in MODEL_NAMES, 'chunk_size': settings.CHUNKED_UPLOAD['CHUNK_SIZE']}
     
-class ContentDeleteView(generic.base.View):
+class ContentDeleteView(QueryBudgetMixin, generic.base.View):
+    query_budget = 22
     def post(self, request, id):
         content = get_object_or_404(Content, id=id, module__course__owner = request.user)
         module = content.module
@@ -157,60 +190,219 @@ class ContentDeleteView(generic.base.View):
         content.delete()
         return redirect('module_content_list', module.id)
     
-class ModuleContentListView(generic.base.TemplateResponseMixin, generic.base.View):
+class ModuleContentListView(QueryBudgetMixin, generic.base.TemplateResponseMixin, generic.base.View):
+    query_budget = 6
     template_name = 'courses/manage/module/content_list.html'
 
     def get(self, request, module_id):
-        module = get_object_or_404(Module, id=module_id, course__owner = request.user)
+        # 템플릿에서 콘텐츠마다 아이템을 가져오지 않도록 강좌와 콘텐츠, 아이템을 함께 가져온다.
+        contents = Prefetch('contents', queryset=Content.objects.prefetch_related('item'))
+        module = get_object_or_404(Module.objects.select_related('course').prefetch_related(contents), id=module_id, course__owner = request.user)
 
         return self.render_to_response({'module':module})
     
+# 요청된 {id: order}로 순서를 한번에 변경하고 변경된 id 순서를 반환하는 믹스인
+# model - 순서를 변경할 모델, parent_field - 순서를 매기는 부모 필드
+# owner_field - 현재 사용자가 만든 강좌의 객체만 변경하도록 강사를 가리키는 필드
+class BulkOrderMixin(CsrfExemptMixin, JsonRequestResponseMixin):
+    model = None
+    parent_field = None
+    owner_field = None
+
+    def get_queryset(self):
+        return self.model.objects.filter(**{self.owner_field: self.request.user})
+
+    def post(self, request):
+        try:
+            parent_id, order = bulk_reorder(self.get_queryset(), self.parent_field, self.request_json)
+        except ReorderError as e:
+            return self.render_json_response({'error':str(e)}, status=400)
+        self.reordered(parent_id)
+        return self.render_json_response({'saved':'OK', 'order':order})
+
+    # 순서를 변경한 뒤 호출 (bulk_update()는 시그널을 보내지 않는다)
+    def reordered(self, parent_id):
+        pass
+
 # 모듈의 순서를 업데이트하는 클래스뷰
-class ModuleOrderView(CsrfExemptMixin,JsonRequestResponseMixin, generic.base.View):
-    def post(self,request):
-        for id, order in self.request_json.items():
-            Module.objects.filter(id=id, course__owner=request.user).update(order=order)
-        return self.render_json_response({'saved':'OK'})
+class ModuleOrderView(QueryBudgetMixin, BulkOrderMixin, generic.base.View):
+    query_budget = 6
+    model = Module
+    parent_field = 'course'
+    owner_field = 'course__owner'
+
+    def reordered(self, parent_id):
+        invalidate_outline(parent_id)
     
 # 모듈의 콘텐츠의 순서를 업데이트하는 클래스 뷰
-class ContentOrderView(CsrfExemptMixin,JsonRequestResponseMixin,generic.base.View):
-    def post(self,request):
-        for id, order in self.request_json.items():
-            Content.objects.filter(id=id, module__course__owner=request.user).update(order=order)
-        return self.render_json_response({'saved':'OK'})
+class ContentOrderView(QueryBudgetMixin, BulkOrderMixin, generic.base.View):
+    query_budget = 6
+    model = Content
+    parent_field = 'module'
+    owner_field = 'module__course__owner'
     
-class CourseListView(generic.base.TemplateResponseMixin,generic.base.View):
+# 파일/이미지 콘텐츠를 나누어 업로드하는 뷰
+# POST module/<module_id>/upload/<model_name>/ - {title, filename, size, checksum}으로 업로드를 시작
+# GET upload/<id>/ - 지금까지 받은 offset을 확인 (연결이 끊긴 뒤 이어서 보낼 때 사용)
+# PUT upload/<id>/ - Upload-Offset 헤더의 위치부터 요청 본문을 쓴다. Upload-Checksum 헤더로 조각의 SHA-256을 확인
+# POST upload/<id>/complete/ - 체크섬을 확인하고 아이템과 콘텐츠를 생성
+# DELETE upload/<id>/ - 업로드를 취소
+# 세션으로 인증하므로 모든 요청에 X-CSRFToken 헤더가 필요하다.
+# 조각은 nginx가 모두 받은 뒤에 전달하므로 느린 클라이언트가 워커를 오래 붙잡지 않는다.
+def upload_response(upload, status=200):
+    return JsonResponse({'id': str(upload.id), 'offset': upload.offset, 'size': upload.size}, status=status)
+
+class UploadCreateView(QueryBudgetMixin, LoginRequiredMixin, JsonRequestResponseMixin, generic.base.View):
+    query_budget = 5
+    def post(self, request, module_id, model_name):
+        module = get_object_or_404(Module, id=module_id, course__owner=request.user)
+        data = self.request_json or {}
+        try:
+            upload = start_upload(request.user, module, model_name, data.get('title'), data.get('filename'), data.get('size'), data.get('checksum'))
+        except UploadError as e:
+            return self.render_json_response({'error':str(e)}, status=400)
+        return upload_response(upload, status=201)
+
+class UploadView(QueryBudgetMixin, LoginRequiredMixin, generic.base.View):
+    query_budget = {'get': 3, 'put': 7, 'delete': 5}
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            self.upload = get_object_or_404(Upload, id=kwargs['id'], owner=request.user)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request, id):
+        return upload_response(self.upload)
+
+    # 본문은 request.body로 한번에 읽지 않고 스트림에서 나누어 읽는다.
+    def put(self, request, id):
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return JsonResponse({'error':'Upload-Offset header is required.'}, status=400)
+        try:
+            self.upload.offset = write_chunk(self.upload, offset, request, length, request.headers.get('Upload-Checksum', ''))
+        except OffsetMismatch as e:
+            return JsonResponse({'error':str(e), 'offset':e.offset}, status=409)
+        except UploadError as e:
+            return JsonResponse({'error':str(e)}, status=400)
+        return upload_response(self.upload)
+
+    def delete(self, request, id):
+        abort_upload(self.upload)
+        return JsonResponse({'deleted':True})
+
+class UploadCompleteView(UploadView):
+    query_budget = {'post': 22}
+    http_method_names = ['post']
+
+    def post(self, request, id):
+        try:
+            content = finish_upload(self.upload)
+        except UploadError as e:
+            return JsonResponse({'error':str(e)}, status=400)
+        return JsonResponse({'content':content.id, 'object_id':content.object_id}, status=201)
+
+# 요청한 너비의 파생 이미지로 리디렉션
+# 파생 이미지가 없거나 파일이 사라졌으면 처음 요청에서 다시 만들고, 만들 수 없으면 원본으로 리디렉션
+class ImageDerivativeView(QueryBudgetMixin, LoginRequiredMixin, generic.base.View):
+    # 파생 이미지를 다시 만드는 경우와 접근 권한 캐시가 비어있는 경우를 포함
+    query_budget = 13
+    # 원본 이미지를 받을 수 있는 사용자만 파생 이미지를 만들거나 받을 수 있다.
+    def get(self, request, id, width):
+        image = get_object_or_404(Image, id=id)
+        if not image.file or not can_access(request.user, image.file.name):
+            raise Http404
+        derivative = get_derivative(image, width)
+        response = redirect((derivative or image).file.url)
+        patch_cache_control(response, private=True, max_age=60 * 60)
+        return response
+
+# 강사와 등록된 학생만 미디어 파일을 받을 수 있도록 권한을 확인하고 전송은 nginx에 맡긴다.
+class ProtectedMediaView(QueryBudgetMixin, LoginRequiredMixin, generic.base.View):
+    # 접근 권한 캐시가 비어있으면 파일을 사용하는 이미지, 파일, 파생 이미지와 강좌를 찾는다.
+    query_budget = 7
+    def get(self, request, path):
+        path = clean_path(path)
+        if not can_access(request.user, path):
+            raise Http404
+        return media_response(request, path)
+
+class CourseListView(QueryBudgetMixin, generic.base.TemplateResponseMixin,generic.base.View):
+    query_budget = 5
     model = Course
     template_name = 'courses/course/list.html'
 
+    search_page_size = 20
+
+    # 주제와 강좌 목록은 catalog 캐시에서 가져온다.
+    # q 매개변수가 있으면 검색 결과를 순위 순서대로 보여준다.
     def get(self, request, subject=None):
-        subjects = cache.get('all_subjects')
-        if not subjects:
-            subjects = Subject.objects.annotate(total_courses=Count('courses'))
-            cache.set('all_subjects', subjects)
-        all_courses = Course.objects.annotate(total_modules=Count('modules'))
+        subjects = catalog.get_subjects()
+        query = request.GET.get('q', '').strip()
+        if query:
+            return self.search(request, subjects, query)
+        cursor = request.GET.get('cursor')
 
         if subject:
-            subject  = get_object_or_404(Subject, slug=subject)
-            key = f'subject_{subject.id}_courses'
-            courses = cache.get(key)
-            if not courses:
-                courses = all_courses.filter(subject=subject)
-                cache.set(key,courses)
+            subject = next((s for s in subjects if s['slug'] == subject), None)
+            if subject is None:
+                raise Http404('No Subject matches the given query.')
+            page = catalog.get_courses(subject['id'], cursor)
         else:
-            courses = cache.get('all_courses')
-            if not courses:
-                courses = all_courses
-                cache.set('all_courses',courses)
+            page = catalog.get_courses(cursor=cursor)
 
-        return self.render_to_response({'subjects':subjects, 'subject':subject, 'courses':courses})
+        return self.render_to_response({'subjects':subjects, 'subject':subject, 'courses':page['courses'], 'next_cursor':page['next_cursor']})
 
-class CourseDetailView(generic.DetailView):
+    def search(self, request, subjects, query):
+        page = Paginator(search_courses(query), self.search_page_size).get_page(request.GET.get('page'))
+        courses = catalog.course_rows([course_id for course_id, rank in page])
+        return self.render_to_response({'subjects':subjects, 'subject':None, 'courses':courses, 'query':query, 'page_obj':page})
+
+class CourseDetailView(QueryBudgetMixin, generic.DetailView):
+    query_budget = 3
     model = Course
+    queryset = Course.objects.select_related('owner','subject')
     template_name = 'courses/course/detail.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['enroll_form'] = CourseEnrollForm(initial={'course':self.object})
 
-        return context
\ No newline at end of file
+        return context
+
+
+# ASGI 서버(settings.ASYNC_VIEWS)에서 사용하는 비동기 뷰
+# 데이터는 캐시와 ORM의 비동기 API로 가져오고 템플릿 렌더링은 Django가 스레드에서 실행한다.
+
+class AsyncCourseListView(CourseListView):
+    async def get(self, request, subject=None):
+        subjects = await catalog.aget_subjects()
+        query = request.GET.get('q', '').strip()
+        if query:
+            return await self.search(request, subjects, query)
+        cursor = request.GET.get('cursor')
+
+        if subject:
+            subject = next((s for s in subjects if s['slug'] == subject), None)
+            if subject is None:
+                raise Http404('No Subject matches the given query.')
+            page = await catalog.aget_courses(subject['id'], cursor)
+        else:
+            page = await catalog.aget_courses(cursor=cursor)
+
+        return self.render_to_response({'subjects':subjects, 'subject':subject, 'courses':page['courses'], 'next_cursor':page['next_cursor']})
+
+    async def search(self, request, subjects, query):
+        results = await sync_to_async(search_courses)(query)
+        page = Paginator(results, self.search_page_size).get_page(request.GET.get('page'))
+        courses = await catalog.acourse_rows([course_id for course_id, rank in page])
+        return self.render_to_response({'subjects':subjects, 'subject':None, 'courses':courses, 'query':query, 'page_obj':page})
+
+class AsyncCourseDetailView(CourseDetailView):
+    async def get(self, request, slug):
+        try:
+            self.object = await self.get_queryset().aget(slug=slug)
+        except Course.DoesNotExist:
+            raise Http404('No Course matches the given query.')
+        return self.render_to_response(self.get_context_data(object=self.object))
\ No newline at end of file
@@ -13,10 +13,11 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 
-import chat.routing
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'educa.settings')
 django_asgi_app = get_asgi_application()
+
+# 모델을 사용하는 라우팅은 get_asgi_application()으로 앱을 불러온 뒤에 가져온다.
+import chat.routing
 # ProtocolTypeRouter 클래스를 사용하여 라우팅 시스템의 주요 진입점으로 사용될 수 있는 딕셔너리를 생성
 application = ProtocolTypeRouter({
     'http' : django_asgi_app,
@@ -42,13 +42,15 @@ INSTALLED_APPS = [
     'students.apps.StudentsConfig',
     'chat.apps.ChatConfig',
     'embed_video',
-    'debug_toolbar',
     'redisboard',
+    'monitoring.apps.MonitoringConfig',
+    'analytics.apps.AnalyticsConfig',
     'rest_framework',
 ]
 
 MIDDLEWARE = [
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    # 엔드포인트별 성능 측정 (다른 미들웨어의 시간도 포함되도록 처음에 둔다)
+    'monitoring.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     # 'django.middleware.cache.UpdateCacheMiddleware',
@@ -64,7 +66,8 @@ ROOT_URLCONF = 'educa.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # 렌더링 시간을 측정하는 DjangoTemplates 백엔드
+        'BACKEND': 'monitoring.backends.DjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -124,17 +127,24 @@ STATIC_ROOT = BASE_DIR / 'static'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# True이면 자주 사용하는 읽기 뷰(강좌 목록/상세, 학생 강좌 상세, 강좌 API 목록/상세)를 비동기 뷰로 처리
+# ASGI 서버로 실행할 때 사용 (educa.settings.prod_asgi)
+ASYNC_VIEWS = False
+
 # 미디어 파일 설정
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# True이면 미디어 파일을 X-Accel-Redirect 헤더로 nginx의 internal 위치(MEDIA_ACCEL_PREFIX)에서 전송
+MEDIA_ACCEL_REDIRECT = False
+MEDIA_ACCEL_PREFIX = '/protected-media/'
 
 # 학생이 로그인 후 연결할 url
 LOGIN_REDIRECT_URL = reverse_lazy('student_course_list')
 
-# pymemcache 설정
-CACHED = {
+# pymemcache 설정 (캐시 적중/실패를 측정하는 백엔드)
+CACHES = {
     'default' : {
-        'BACKEND' : 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'BACKEND' : 'monitoring.backends.PyMemcacheCache',
         'LOCATION' : '127.0.0.1:11211'
     }
 }
@@ -149,7 +159,7 @@ CACHE_MIDDLEWARE_SECONDS = 60 * 15 # 15분
 CACHE_MIDDLEWARE_KEY_PREFIX = 'educa'
 
 # redis 캐시 설정
-# CACHED = {
+# CACHES = {
 #     'default' : {
 #         'BACKEND' : 'django.core.cache.backends.redis.RedisCache',
 #         'LOCATION' : 'redis://127.0.0.1:6379'
@@ -172,4 +182,100 @@ CHANNEL_LAYERS = {
             'hosts' : [('127.0.0.1', 6379)],
         }
     }
-}
\ No newline at end of file
+}
+
+# 채팅 메시지 전송 설정
+# WINDOW - 이 시간(초) 동안 도착한 메시지를 하나의 프레임으로 묶어서 전송
+# QUEUE_LIMIT - 연결마다 전송을 기다리는 최대 프레임 수
+# OVERFLOW - 대기열이 가득 찼을 때의 처리 방법 'drop' (오래된 프레임 삭제) 또는 'disconnect' (연결 종료)
+CHAT_FANOUT = {
+    'WINDOW' : 0.01,
+    'QUEUE_LIMIT' : 200,
+    'OVERFLOW' : 'drop',
+}
+
+# 파일/이미지 콘텐츠를 나누어 업로드하는 설정
+# STAGING_DIR - 받은 조각을 모아두는 디렉터리 (MEDIA_ROOT 밖에 두어 공개되지 않도록 한다)
+# CHUNK_SIZE - 요청 하나로 보낼 수 있는 최대 바이트 수 (nginx의 client_max_body_size 보다 작아야 한다)
+# MAX_SIZE - 업로드할 수 있는 최대 파일 크기
+# EXPIRE - 이 시간(초) 동안 조각을 받지 못한 업로드는 clear_uploads 명령으로 삭제
+CHUNKED_UPLOAD = {
+    'STAGING_DIR' : BASE_DIR / 'uploads',
+    'CHUNK_SIZE' : 5 * 1024 * 1024,
+    'MAX_SIZE' : 2 * 1024 * 1024 * 1024,
+    'EXPIRE' : 60 * 60 * 24,
+}
+
+# API(/api/courses/import/)로 가져올 수 있는 강좌 아카이브의 최대 크기
+# nginx의 /api/courses/import/ 위치의 client_max_body_size와 같게 설정한다. 더 큰 강좌는 import_course 명령으로 가져온다.
+COURSE_IMPORT_MAX_SIZE = 512 * 1024 * 1024
+
+# 이미지 콘텐츠의 파생 이미지 설정
+# WIDTHS - 만들 너비 목록 (원본보다 큰 너비는 원본 너비로 한번만 만든다)
+# FORMAT, QUALITY - Pillow로 저장할 형식과 품질
+# WORKERS - 파생 이미지를 만드는 백그라운드 스레드 수, 0이면 저장한 요청에서 바로 만든다
+IMAGE_DERIVATIVES = {
+    'WIDTHS' : [320, 640, 1280],
+    'FORMAT' : 'WEBP',
+    'QUALITY' : 80,
+    'WORKERS' : 2,
+}
+
+# API 인증 토큰 설정 (courses.tokens)
+# EXPIRE - 발급한 토큰의 유효 시간(초), None이면 만료되지 않는다
+# CACHE_TIMEOUT - 토큰 -> 사용자 id를 공유 캐시에 저장하는 시간(초)
+# LOCAL_TIMEOUT - 프로세스 메모리의 LRU에 사용자와 함께 유지하는 시간(초), 다른 프로세스에서 폐기한 토큰은 이 시간 안에 거부된다
+# LOCAL_SIZE - 프로세스 메모리의 LRU에 유지하는 토큰 수
+API_TOKENS = {
+    'EXPIRE' : 60 * 60 * 24 * 30,
+    'CACHE_TIMEOUT' : 60 * 5,
+    'LOCAL_TIMEOUT' : 10,
+    'LOCAL_SIZE' : 10000,
+}
+
+# 학생 진도 기록 (students.progress)
+# REDIS_URL - 모든 프로세스의 이벤트를 모아둘 Redis, None이면 프로세스 메모리에 모은다
+# FLUSH_INTERVAL - 모아둔 이벤트를 데이터베이스에 저장하는 간격(초)
+# FLUSH_SIZE - 한번에 저장하는 최대 (학생, 강좌) 수
+PROGRESS = {
+    'REDIS_URL' : None,
+    'FLUSH_INTERVAL' : 5,
+    'FLUSH_SIZE' : 500,
+}
+
+# 강사 대시보드의 강좌 통계 (analytics 앱, rollup_analytics 명령으로 집계)
+# DAYS - 대시보드와 API에서 보여주는 기간(일), 한번에 집계하는 최대 기간
+ANALYTICS = {
+    'DAYS' : 30,
+}
+
+# 엔드포인트별 성능 측정 (monitoring 앱, 관리자 사이트의 /admin/monitoring/ 에서 확인)
+# ENABLED - False이면 미들웨어와 컨슈머가 측정하지 않는다
+# REDIS_URL - 모든 프로세스의 측정값을 합칠 Redis, None이면 프로세스 메모리에 저장
+# FLUSH_INTERVAL - 프로세스에 모아둔 측정값을 Redis에 보내는 간격(초)
+# BUCKETS - 응답 시간 히스토그램 구간의 상한(ms)
+# SLOW_THRESHOLD - 이 시간(ms) 이상 걸린 요청을 느린 요청으로 기록
+# SLOW_SAMPLE_RATE - 쿼리 목록을 저장할 요청의 비율 (느린 요청 기록은 이 중에서 저장)
+# SLOW_TRACES - 보관할 느린 요청 기록 수
+INSTRUMENTATION = {
+    'ENABLED' : True,
+    'REDIS_URL' : None,
+    'FLUSH_INTERVAL' : 5,
+    'BUCKETS' : [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000],
+    'SLOW_THRESHOLD' : 500,
+    'SLOW_SAMPLE_RATE' : 0.05,
+    'SLOW_TRACES' : 50,
+}
+
+# 뷰와 시리얼라이저의 쿼리 예산 (monitoring.budget)
+# ENABLED - False이면 예산을 확인하지 않는다
+# RAISE - True이면 예산을 넘을 때 QueryBudgetExceeded를 발생 (테스트 실행기가 설정), False이면 경고를 기록
+# STACK_LIMIT - 경고에 포함할 스택 프레임 수
+QUERY_BUDGET = {
+    'ENABLED' : True,
+    'RAISE' : False,
+    'STACK_LIMIT' : 10,
+}
+
+# 테스트에서는 쿼리 예산을 넘으면 실패
+TEST_RUNNER = 'monitoring.testing.QueryBudgetTestRunner'
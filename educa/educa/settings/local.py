@@ -22,6 +22,17 @@ DATABASES = {
     }
 }
 
+# 로컬 환경에서는 memcached 서버 없이 로컬 메모리 캐시를 사용
+CACHES = {
+    'default' : {
+        'BACKEND' : 'monitoring.backends.LocMemCache',
+    }
+}
+
+# 디버그 툴바는 로컬 환경에서만 사용
+INSTALLED_APPS = INSTALLED_APPS + ['debug_toolbar']
+MIDDLEWARE = MIDDLEWARE[:1] + ['debug_toolbar.middleware.DebugToolbarMiddleware'] + MIDDLEWARE[1:]
+
 if DEBUG:
     import mimetypes
     mimetypes.add_type('application/javascript','.js',True)
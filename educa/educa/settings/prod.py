@@ -12,6 +12,9 @@ ADMINS = [
 
 ALLOWED_HOSTS = ['educaproject.com','www.educaproject.com']
 
+# 미디어 파일은 권한을 확인한 뒤 nginx가 전송
+MEDIA_ACCEL_REDIRECT = True
+
 DATABASES = {
     'default' : {
         'ENGINE' : 'django.db.backends.postgresql',
@@ -24,5 +27,14 @@ DATABASES = {
 }
 
 REDIS_URL = 'redis://cache:6379'
-CACHED['default']['LOCATION'] = REDIS_URL
-CHANNEL_LAYERS['default']['CONFIG']['hosts'] = [REDIS_URL]
\ No newline at end of file
+CACHES = {
+    'default' : {
+        'BACKEND' : 'monitoring.backends.RedisCache',
+        'LOCATION' : REDIS_URL,
+    }
+}
+CHANNEL_LAYERS['default']['CONFIG']['hosts'] = [REDIS_URL]
+# 모든 웹 프로세스의 측정값을 Redis에서 합친다.
+INSTRUMENTATION['REDIS_URL'] = REDIS_URL
+# 모든 웹 프로세스의 진도 이벤트를 Redis에 모은다.
+PROGRESS['REDIS_URL'] = REDIS_URL
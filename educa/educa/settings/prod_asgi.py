@@ -0,0 +1,10 @@
+# ASGI 서버(gunicorn + uvicorn 워커)로 HTTP와 WebSocket을 함께 처리하는 프로덕션 설정
+# docker compose -f docker-compose.yml -f docker-compose.asgi.yml up
+
+from .prod import *
+
+# 자주 사용하는 읽기 뷰를 비동기 뷰로 처리
+ASYNC_VIEWS = True
+
+# 비동기 뷰는 요청마다 다른 스레드에서 쿼리를 실행하므로 연결을 유지하지 않는다.
+DATABASES['default']['CONN_MAX_AGE'] = 0
@@ -17,22 +17,27 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 
-from courses.views import CourseListView
+from courses.views import CourseListView, AsyncCourseListView, ProtectedMediaView
+from monitoring.views import DashboardView
 
 urlpatterns = [
     path('accounts/login/', auth_views.LoginView.as_view(),name='login'),
     path('accounts/logout/', auth_views.LogoutView.as_view(),name='logout'),
+    # 엔드포인트별 성능 측정 (스태프만 볼 수 있다)
+    path('admin/monitoring/', admin.site.admin_view(DashboardView.as_view()), name='monitoring_dashboard'),
     path('admin/', admin.site.urls),
-    path('', CourseListView.as_view(), name='course_list'),
+    path('', (AsyncCourseListView if settings.ASYNC_VIEWS else CourseListView).as_view(), name='course_list'),
     path('course/', include('courses.urls')),
     path('students/',include('students.urls')),
-    path('__debug__/', include('debug_toolbar.urls')),
     path('api/',include('courses.api.urls', namespace='api')),
     path('chat/', include('chat.urls', namespace='chat')),
+    path('analytics/', include('analytics.urls')),
+    # 미디어 파일은 권한을 확인한 뒤 전송 (프로덕션에서는 nginx의 X-Accel-Redirect)
+    path(f'{settings.MEDIA_URL.strip("/")}/<path:path>', ProtectedMediaView.as_view(), name='protected_media'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# 디버그 툴바는 설치된 환경(로컬)에서만 사용
+if 'debug_toolbar' in settings.INSTALLED_APPS:
+    urlpatterns.append(path('__debug__/', include('debug_toolbar.urls')))
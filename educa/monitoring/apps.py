@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        # 새 데이터베이스 연결마다 쿼리 수와 시간을 기록하는 래퍼를 추가
+        from .metrics import install_execute_wrapper
+        connection_created.connect(install_execute_wrapper)
@@ -0,0 +1,69 @@
+import time
+
+from django.core.cache.backends import locmem, memcached, redis
+from django.template import TemplateDoesNotExist
+from django.template.backends import django
+
+from . import metrics
+
+# 현재 요청의 캐시 적중/실패를 기록하는 캐시 백엔드
+# CACHES의 BACKEND를 monitoring.backends.<백엔드 이름>으로 설정한다.
+
+_missing = object()
+
+class InstrumentedCacheMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        recorder = metrics.current()
+        if recorder is not None:
+            if value is _missing:
+                recorder.cache_misses += 1
+            else:
+                recorder.cache_hits += 1
+        return default if value is _missing else value
+
+# get_many()를 직접 구현하는 백엔드 (BaseCache.get_many()는 get()을 호출하므로 이미 기록된다)
+class InstrumentedGetManyMixin(InstrumentedCacheMixin):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        recorder = metrics.current()
+        if recorder is not None:
+            recorder.cache_hits += len(values)
+            recorder.cache_misses += len(keys) - len(values)
+        return values
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+class PyMemcacheCache(InstrumentedGetManyMixin, memcached.PyMemcacheCache):
+    pass
+
+class RedisCache(InstrumentedGetManyMixin, redis.RedisCache):
+    pass
+
+
+# 템플릿 렌더링 시간을 기록하는 템플릿 백엔드
+# include 처럼 렌더링 중에 다른 템플릿을 렌더링하면 가장 바깥쪽 렌더링 시간만 더한다.
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        recorder = metrics.current()
+        if recorder is None or recorder.template_depth:
+            return super().render(context, request)
+        recorder.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            recorder.template_depth -= 1
+            recorder.template_ms += (time.perf_counter() - started) * 1000
+
+class DjangoTemplates(django.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django.reraise(exc, self)
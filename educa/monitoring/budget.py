@@ -0,0 +1,166 @@
+import contextlib
+import contextvars
+import functools
+import logging
+import sys
+import traceback
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# 쿼리 예산
+# 뷰(요청 하나)나 시리얼라이저(객체 하나)가 실행할 수 있는 최대 쿼리 수를 선언한다.
+# 예산을 넘으면 QUERY_BUDGET['RAISE']가 True일 때(테스트) QueryBudgetExceeded를 발생시키고
+# 아니면(프로덕션) 예산을 넘은 첫번째 쿼리와 그 때의 스택, 렌더링 중인 템플릿을 경고로 기록한다.
+# 쿼리는 monitoring.metrics의 데이터베이스 실행 래퍼가 센다.
+
+MONITORING_DIR = str(Path(__file__).resolve().parent)
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+def get_setting(name):
+    return settings.QUERY_BUDGET[name]
+
+_budgets = contextvars.ContextVar('query_budgets', default=())
+
+# 실행 래퍼에서 쿼리마다 호출
+def count_query(sql):
+    for budget in _budgets.get():
+        budget.add(sql)
+
+# 요청과 관계없이 모아둔 쓰기를 저장하는 작업처럼 요청 중에 실행되지만 요청의 쿼리가 아닌 경우
+@contextlib.contextmanager
+def unbudgeted():
+    token = _budgets.set(())
+    try:
+        yield
+    finally:
+        _budgets.reset(token)
+
+# 쿼리가 실행된 위치 - 프로젝트 코드의 스택과 렌더링 중인 템플릿
+def sample_stack():
+    project_dir = str(settings.BASE_DIR)
+    frames = [frame for frame in traceback.extract_stack()
+              if frame.filename.startswith(project_dir) and not frame.filename.startswith(MONITORING_DIR)]
+    templates = []
+    frame = sys._getframe()
+    while frame is not None:
+        template = frame.f_locals.get('self')
+        if isinstance(template, Template) and template.origin.template_name and template.origin.template_name not in templates:
+            templates.append(template.origin.template_name)
+        frame = frame.f_back
+    return traceback.format_list(frames[-get_setting('STACK_LIMIT'):]), templates
+
+class QueryBudget:
+    def __init__(self, limit, name):
+        self.limit = limit
+        self.name = name
+        self.count = 0
+        self.sql = None
+        self.stack = []
+        self.templates = []
+        self.token = None
+
+    def add(self, sql):
+        self.count += 1
+        if self.count == self.limit + 1:
+            self.sql = sql
+            self.stack, self.templates = sample_stack()
+
+    def __enter__(self):
+        self.token = _budgets.set(_budgets.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _budgets.reset(self.token)
+        if exc_type is None and self.count > self.limit:
+            self.exceeded()
+
+    def report(self):
+        lines = [f'{self.name} ran {self.count} queries, budget is {self.limit}.',
+                 f'First query over the budget: {self.sql}']
+        if self.templates:
+            lines.append(f"While rendering: {', '.join(self.templates)}")
+        return '\n'.join(lines) + '\n' + ''.join(self.stack)
+
+    def exceeded(self):
+        if get_setting('RAISE'):
+            raise QueryBudgetExceeded(self.report())
+        logger.warning(self.report())
+
+def _render(response):
+    if callable(getattr(response, 'render', None)) and not response.is_rendered:
+        response.render()
+    return response
+
+# get_budget(request)가 반환하는 (최대 쿼리 수, 이름)으로 뷰 함수를 감싼다. None이면 확인하지 않는다.
+# 템플릿에서 실행되는 쿼리도 포함되도록 TemplateResponse는 예산 안에서 렌더링한다.
+def _wrap_view(view, get_budget):
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            budget = get_budget(request) if get_setting('ENABLED') else None
+            if budget is None:
+                return await view(request, *args, **kwargs)
+            with QueryBudget(*budget):
+                response = await view(request, *args, **kwargs)
+                return await sync_to_async(_render)(response)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            budget = get_budget(request) if get_setting('ENABLED') else None
+            if budget is None:
+                return view(request, *args, **kwargs)
+            with QueryBudget(*budget):
+                return _render(view(request, *args, **kwargs))
+    return wrapper
+
+# 뷰 함수의 쿼리 예산
+# @query_budget(5)
+# def course_list(request): ...
+def query_budget(limit, name=None):
+    def decorator(view):
+        budget = (limit, name or f'{view.__module__}.{view.__qualname__}')
+        return _wrap_view(view, lambda request: budget)
+    return decorator
+
+# 클래스 기반 뷰의 쿼리 예산
+# query_budget - 최대 쿼리 수 또는 {'get': 5, 'post': 8} 처럼 요청 메서드별 최대 쿼리 수 (없는 메서드는 확인하지 않는다)
+# ViewSet은 {'list': 5, 'contents': 9} 처럼 동작 이름별로 지정한다.
+# dispatch()를 재정의한 뷰의 쿼리도 포함되도록 as_view()가 반환하는 뷰 함수를 감싼다.
+class QueryBudgetMixin:
+    query_budget = None
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        view = super().as_view(*args, **initkwargs)
+        if cls.query_budget is None:
+            return view
+        # ViewSet.as_view(actions)는 요청 메서드별 동작 이름을 받는다.
+        actions = args[0] if args else initkwargs.get('actions')
+        name = f'{cls.__module__}.{cls.__qualname__}'
+
+        def get_budget(request):
+            if not isinstance(cls.query_budget, dict):
+                return cls.query_budget, name
+            key = request.method.lower()
+            if actions:
+                key = actions.get(key)
+            limit = cls.query_budget.get(key)
+            return None if limit is None else (limit, f'{name} {key}')
+        return _wrap_view(view, get_budget)
+
+# 시리얼라이저가 객체 하나를 직렬화할 때의 쿼리 예산 (many=True이면 객체마다 확인)
+class QueryBudgetSerializerMixin:
+    query_budget = None
+
+    def to_representation(self, instance):
+        if self.query_budget is None or not get_setting('ENABLED'):
+            return super().to_representation(instance)
+        with QueryBudget(self.query_budget, f'{type(self).__module__}.{type(self).__qualname__}'):
+            return super().to_representation(instance)
@@ -0,0 +1,19 @@
+from . import metrics
+
+# 컨슈머가 처리하는 메시지를 라우트 이름과 메시지 종류별로 측정
+# class ChatConsumer(InstrumentedConsumerMixin, AsyncWebsocketConsumer):
+#     instrumentation_route = 'chat_room'
+class InstrumentedConsumerMixin:
+    instrumentation_route = None
+
+    async def dispatch(self, message):
+        if not metrics.is_enabled():
+            return await super().dispatch(message)
+        recorder = metrics.start()
+        error = True
+        try:
+            await super().dispatch(message)
+            error = False
+        finally:
+            route = self.instrumentation_route or type(self).__name__
+            metrics.finish(recorder, 'websocket', f"{route} {message['type']}", self.scope.get('path', ''), error)
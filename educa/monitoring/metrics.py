@@ -0,0 +1,278 @@
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .budget import count_query
+
+logger = logging.getLogger(__name__)
+
+# 엔드포인트별 성능 측정
+# 요청(또는 WebSocket 메시지)마다 Recorder를 contextvar에 두고
+# 데이터베이스 실행 래퍼, 캐시 백엔드, 템플릿 백엔드가 현재 Recorder에 값을 더한다.
+# contextvar는 sync_to_async로 실행되는 스레드에도 전달되므로 비동기 뷰와 컨슈머에서도 측정된다.
+# 측정값은 URL 이름(WebSocket은 라우트와 메시지 종류)마다 합계와 응답 시간 히스토그램으로 모으고
+# REDIS_URL이 있으면 FLUSH_INTERVAL마다 백그라운드 스레드에서 Redis에 더해서 모든 프로세스의 값을 합친다.
+
+# 합계를 저장하는 필드
+COUNT_FIELDS = ('count', 'errors', 'db_queries', 'cache_hits', 'cache_misses')
+TIME_FIELDS = ('total_ms', 'db_ms', 'template_ms')
+# 느린 요청 기록에 저장하는 최대 쿼리 수
+TRACE_QUERIES = 50
+KEY_PREFIX = 'monitoring'
+
+def get_setting(name):
+    return settings.INSTRUMENTATION[name]
+
+def is_enabled():
+    return get_setting('ENABLED')
+
+_current = contextvars.ContextVar('monitoring_recorder', default=None)
+
+def current():
+    return _current.get()
+
+# 요청 하나의 측정값
+class Recorder:
+    def __init__(self, trace=False):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        # 표본으로 선택된 요청만 느린 요청 기록을 위해 쿼리를 저장
+        self.queries = [] if trace else None
+        self.token = None
+
+    def add_query(self, sql, ms):
+        self.db_queries += 1
+        self.db_ms += ms
+        if self.queries is not None and len(self.queries) < TRACE_QUERIES:
+            self.queries.append((sql, ms))
+
+def start():
+    recorder = Recorder(trace=random.random() < get_setting('SLOW_SAMPLE_RATE'))
+    recorder.token = _current.set(recorder)
+    return recorder
+
+# 측정을 끝내고 kind(http, websocket)와 name으로 저장
+def finish(recorder, kind, name, path='', error=False):
+    _current.reset(recorder.token)
+    elapsed = (time.perf_counter() - recorder.started) * 1000
+    trace = None
+    if recorder.queries is not None and elapsed >= get_setting('SLOW_THRESHOLD'):
+        trace = {
+            'name': f'{kind}:{name}',
+            'path': path,
+            'time': timezone.now().isoformat(),
+            'ms': round(elapsed, 2),
+            'db_queries': recorder.db_queries,
+            'db_ms': round(recorder.db_ms, 2),
+            'template_ms': round(recorder.template_ms, 2),
+            'queries': [{'sql': sql, 'ms': round(ms, 2)} for sql, ms in sorted(recorder.queries, key=lambda query: -query[1])],
+        }
+    get_store().record(f'{kind}:{name}', elapsed, recorder, error, trace)
+    return elapsed
+
+# connection_created 수신기 - 연결마다 한번만 추가
+def install_execute_wrapper(sender, connection, **kwargs):
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+# 요청의 측정값과 쿼리 예산(monitoring.budget)에 쿼리를 더한다.
+def execute_wrapper(execute, sql, params, many, context):
+    count_query(sql)
+    recorder = _current.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add_query(sql, (time.perf_counter() - started) * 1000)
+
+
+# 히스토그램 구간 필드 이름, 마지막 구간은 'le:inf'
+def bucket_field(ms):
+    for bound in get_setting('BUCKETS'):
+        if ms <= bound:
+            return f'le:{bound}'
+    return 'le:inf'
+
+# 프로세스 안에서 측정값을 모아두는 집계
+class Aggregate:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.traces = []
+
+    def add(self, key, elapsed, recorder, error, trace):
+        values = {
+            'count': 1,
+            'errors': int(error),
+            'db_queries': recorder.db_queries,
+            'cache_hits': recorder.cache_hits,
+            'cache_misses': recorder.cache_misses,
+            'total_ms': elapsed,
+            'db_ms': recorder.db_ms,
+            'template_ms': recorder.template_ms,
+            bucket_field(elapsed): 1,
+        }
+        with self.lock:
+            stats = self.endpoints.setdefault(key, {})
+            for field, value in values.items():
+                stats[field] = stats.get(field, 0) + value
+            if trace is not None:
+                self.traces.insert(0, trace)
+                del self.traces[get_setting('SLOW_TRACES'):]
+
+    # 모아둔 값을 반환하고 비운다.
+    def take(self):
+        with self.lock:
+            endpoints, traces = self.endpoints, self.traces
+            self.endpoints, self.traces = {}, []
+        return endpoints, traces
+
+    def snapshot(self):
+        with self.lock:
+            return {key: dict(stats) for key, stats in self.endpoints.items()}, list(self.traces)
+
+# 프로세스 메모리에 저장 (개발 환경, 테스트)
+class MemoryStore:
+    def __init__(self):
+        self.aggregate = Aggregate()
+
+    def record(self, key, elapsed, recorder, error, trace):
+        self.aggregate.add(key, elapsed, recorder, error, trace)
+
+    # (엔드포인트별 측정값, 느린 요청 기록)
+    def read(self):
+        return self.aggregate.snapshot()
+
+    def reset(self):
+        self.aggregate.take()
+
+# 프로세스에 모아둔 값을 FLUSH_INTERVAL마다 Redis 해시에 더한다.
+# 비동기 뷰와 컨슈머의 이벤트 루프를 막지 않도록 Redis에 보내는 일은 백그라운드 스레드에서 하나씩 실행한다.
+# Redis에 연결할 수 없으면 모아둔 값을 버리고 요청은 계속 처리한다.
+class RedisStore(MemoryStore):
+    def __init__(self, url):
+        super().__init__()
+        import redis
+        self.error = redis.RedisError
+        self.client = redis.Redis.from_url(url)
+        self.flushed = time.monotonic()
+        self.flushing = threading.Lock()
+
+    def record(self, key, elapsed, recorder, error, trace):
+        super().record(key, elapsed, recorder, error, trace)
+        if time.monotonic() - self.flushed >= get_setting('FLUSH_INTERVAL') and self.flushing.acquire(blocking=False):
+            self.flushed = time.monotonic()
+            threading.Thread(target=self._flush_in_background, name='monitoring-flush', daemon=True).start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            self.flushing.release()
+
+    def flush(self):
+        self.flushed = time.monotonic()
+        endpoints, traces = self.aggregate.take()
+        if not endpoints and not traces:
+            return
+        pipeline = self.client.pipeline(transaction=False)
+        for key, stats in endpoints.items():
+            pipeline.sadd(f'{KEY_PREFIX}:endpoints', key)
+            for field, value in stats.items():
+                if field in TIME_FIELDS:
+                    pipeline.hincrbyfloat(f'{KEY_PREFIX}:endpoint:{key}', field, value)
+                else:
+                    pipeline.hincrby(f'{KEY_PREFIX}:endpoint:{key}', field, value)
+        if traces:
+            pipeline.lpush(f'{KEY_PREFIX}:traces', *[json.dumps(trace) for trace in reversed(traces)])
+            pipeline.ltrim(f'{KEY_PREFIX}:traces', 0, get_setting('SLOW_TRACES') - 1)
+        try:
+            pipeline.execute()
+        except self.error:
+            logger.warning('Could not send metrics to Redis', exc_info=True)
+
+    # Redis에 연결할 수 없으면 이 프로세스에 모아둔 값을 반환
+    def read(self):
+        local = super().read()
+        try:
+            self.flush()
+            keys = sorted(key.decode() for key in self.client.smembers(f'{KEY_PREFIX}:endpoints'))
+            pipeline = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipeline.hgetall(f'{KEY_PREFIX}:endpoint:{key}')
+            endpoints = {key: {field.decode(): float(value) for field, value in stats.items()} for key, stats in zip(keys, pipeline.execute())}
+            traces = [json.loads(trace) for trace in self.client.lrange(f'{KEY_PREFIX}:traces', 0, -1)]
+        except self.error:
+            logger.warning('Could not read metrics from Redis', exc_info=True)
+            return local
+        return endpoints, traces
+
+    def reset(self):
+        super().reset()
+        try:
+            keys = [f'{KEY_PREFIX}:endpoint:{key.decode()}' for key in self.client.smembers(f'{KEY_PREFIX}:endpoints')]
+            self.client.delete(f'{KEY_PREFIX}:endpoints', f'{KEY_PREFIX}:traces', *keys)
+        except self.error:
+            logger.warning('Could not reset metrics in Redis', exc_info=True)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                url = get_setting('REDIS_URL')
+                _store = RedisStore(url) if url else MemoryStore()
+    return _store
+
+
+# 히스토그램에서 백분위 응답 시간(구간의 상한)을 계산, 마지막 구간이면 None
+def percentile(stats, p):
+    target = stats.get('count', 0) * p
+    seen = 0
+    for bound in get_setting('BUCKETS'):
+        seen += stats.get(f'le:{bound}', 0)
+        if seen >= target:
+            return bound
+    return None
+
+# 대시보드에 표시할 엔드포인트별 요약, 전체 응답 시간이 긴 순서
+def summarize(endpoints):
+    rows = []
+    for key, stats in endpoints.items():
+        count = stats.get('count', 0)
+        if not count:
+            continue
+        kind, name = key.split(':', 1)
+        lookups = stats.get('cache_hits', 0) + stats.get('cache_misses', 0)
+        rows.append({
+            'kind': kind,
+            'name': name,
+            'count': int(count),
+            'errors': int(stats.get('errors', 0)),
+            'total_ms': stats.get('total_ms', 0),
+            'mean_ms': stats.get('total_ms', 0) / count,
+            'p50_ms': percentile(stats, 0.50),
+            'p95_ms': percentile(stats, 0.95),
+            'p99_ms': percentile(stats, 0.99),
+            'db_queries': stats.get('db_queries', 0) / count,
+            'db_ms': stats.get('db_ms', 0) / count,
+            'template_ms': stats.get('template_ms', 0) / count,
+            'cache_hit_ratio': stats.get('cache_hits', 0) / lookups if lookups else None,
+        })
+    return sorted(rows, key=lambda row: -row['total_ms'])
@@ -0,0 +1,37 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+
+# 요청을 URL 이름별로 측정하는 미들웨어
+# 다른 미들웨어의 시간도 포함되도록 MIDDLEWARE의 처음에 둔다.
+# 동기/비동기 요청을 모두 처리하므로 ASGI 서버에서 요청이 스레드로 전환되지 않는다.
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics.is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = metrics.start()
+        response = self.get_response(request)
+        self.finish(recorder, request, response)
+        return response
+
+    async def __acall__(self, request):
+        recorder = metrics.start()
+        response = await self.get_response(request)
+        self.finish(recorder, request, response)
+        return response
+
+    def finish(self, recorder, request, response):
+        match = request.resolver_match
+        metrics.finish(recorder, 'http', match.view_name if match else '<unresolved>', request.path, response.status_code >= 500)
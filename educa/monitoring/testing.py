@@ -0,0 +1,35 @@
+import contextlib
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from .budget import QueryBudget
+
+# 테스트에서 뷰와 시리얼라이저가 쿼리 예산을 넘으면 예외를 발생시켜 테스트가 실패하게 하는 테스트 실행기
+# TEST_RUNNER = 'monitoring.testing.QueryBudgetTestRunner'
+class QueryBudgetTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_budget_settings = override_settings(QUERY_BUDGET={**settings.QUERY_BUDGET, 'RAISE': True})
+        self.query_budget_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_budget_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+class _TestCaseBudget(QueryBudget):
+    def __init__(self, testcase, limit, name):
+        super().__init__(limit, name)
+        self.testcase = testcase
+
+    def exceeded(self):
+        self.testcase.fail(self.report())
+
+# with self.assertMaxQueries(5): 블록에서 실행한 쿼리가 5개를 넘으면 실패
+# assertNumQueries()와 달리 쿼리 수가 정확히 같을 필요는 없다.
+class QueryBudgetTestMixin:
+    @contextlib.contextmanager
+    def assertMaxQueries(self, limit):
+        with _TestCaseBudget(self, limit, self.id()) as budget:
+            yield budget
@@ -0,0 +1,181 @@
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User, AnonymousUser
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.response import TemplateResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+
+from courses.models import Subject, Course, Module, Content, Text
+from courses.api.serializers import CourseSerializer
+from chat.consumer import ChatConsumer
+from . import metrics
+from .budget import QueryBudgetExceeded, query_budget
+from .testing import QueryBudgetTestMixin
+
+# Create your tests here.
+
+def instrumentation(**options):
+    return override_settings(INSTRUMENTATION={**settings.INSTRUMENTATION, **options})
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        metrics.get_store().reset()
+        cache.clear()
+        owner = User.objects.create(username='instructor')
+        subject = Subject.objects.create(title='Programming', slug='programming')
+        self.course = Course.objects.create(owner=owner, subject=subject, title='Python', slug='python', overview='')
+
+    def get_stats(self, key):
+        endpoints, traces = metrics.get_store().read()
+        return endpoints.get(key, {})
+
+    def test_request_is_recorded_by_url_name(self):
+        self.client.get(reverse('course_list'))
+        self.client.get(reverse('course_list'))
+        stats = self.get_stats('http:course_list')
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(sum(stats.get(f'le:{bound}', 0) for bound in settings.INSTRUMENTATION['BUCKETS']) + stats.get('le:inf', 0), 2)
+        self.assertGreater(stats['db_queries'], 0)
+        self.assertGreater(stats['template_ms'], 0)
+        # 첫번째 요청은 목록 캐시를 채우고 두번째 요청은 캐시를 사용
+        self.assertGreater(stats['cache_misses'], 0)
+        self.assertGreater(stats['cache_hits'], 0)
+        self.assertEqual(self.get_stats('http:course_detail'), {})
+
+    @instrumentation(SLOW_THRESHOLD=0, SLOW_SAMPLE_RATE=1)
+    def test_slow_requests_are_traced(self):
+        self.client.get(reverse('course_detail', args=[self.course.slug]))
+        endpoints, traces = metrics.get_store().read()
+        self.assertEqual(traces[0]['name'], 'http:course_detail')
+        self.assertEqual(traces[0]['path'], f'/course/{self.course.slug}/')
+        self.assertEqual(len(traces[0]['queries']), traces[0]['db_queries'])
+        self.assertTrue(any('courses_course' in query['sql'] for query in traces[0]['queries']))
+
+    @instrumentation(SLOW_THRESHOLD=60 * 1000, SLOW_SAMPLE_RATE=1)
+    def test_fast_requests_are_not_traced(self):
+        self.client.get(reverse('course_list'))
+        endpoints, traces = metrics.get_store().read()
+        self.assertEqual(traces, [])
+
+    def test_dashboard_is_staff_only(self):
+        url = reverse('monitoring_dashboard')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        self.client.get(reverse('course_list'))
+        response = self.client.get(url)
+        self.assertContains(response, 'course_list')
+        self.client.post(url)
+        self.assertEqual(self.get_stats('http:course_list'), {})
+
+    def test_summary_percentiles(self):
+        stats = {'count': 4, 'total_ms': 120, 'le:10': 2, 'le:50': 1, 'le:inf': 1}
+        with instrumentation(BUCKETS=[10, 50]):
+            row, = metrics.summarize({'http:course_list': stats})
+        self.assertEqual((row['p50_ms'], row['p95_ms']), (10, None))
+        self.assertEqual(row['mean_ms'], 30)
+        self.assertIsNone(row['cache_hit_ratio'])
+
+    @async_to_sync
+    async def test_consumer_messages_are_recorded(self):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/room/{self.course.id}/')
+        communicator.scope['user'] = AnonymousUser()
+        communicator.scope['url_route'] = {'kwargs': {'course_id': str(self.course.id)}}
+        # 등록되지 않은 사용자는 연결이 거부된다.
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        await communicator.disconnect()
+        endpoints, traces = metrics.get_store().read()
+        self.assertEqual(endpoints['websocket:chat_room websocket.connect']['count'], 1)
+
+    # Redis에 보내는 일은 요청을 처리하는 스레드가 아닌 백그라운드 스레드에서 실행된다.
+    def test_redis_flush_runs_in_background(self):
+        threads = []
+        class Store(metrics.RedisStore):
+            def flush(self):
+                threads.append(threading.current_thread())
+        store = Store('redis://127.0.0.1:6379/0')
+        with instrumentation(FLUSH_INTERVAL=0):
+            store.record('http:course_list', 1.0, metrics.Recorder(), False, None)
+        while store.flushing.locked():
+            time.sleep(0.01)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+
+    # Redis에 연결할 수 없으면 대시보드는 이 프로세스에 모아둔 값을 보여준다.
+    def test_redis_errors_fall_back_to_local_metrics(self):
+        store = metrics.RedisStore('redis://127.0.0.1:1/0')
+        store.record('http:course_list', 1.0, metrics.Recorder(), False, None)
+        with self.assertLogs('monitoring.metrics', 'WARNING'):
+            endpoints, traces = store.read()
+        self.assertEqual(endpoints['http:course_list']['count'], 1)
+        with self.assertLogs('monitoring.metrics', 'WARNING'):
+            store.reset()
+
+
+@query_budget(1)
+def two_queries(request):
+    User.objects.count()
+    User.objects.count()
+    return HttpResponse()
+
+# 템플릿에서 실행되는 쿼리도 예산에 포함된다.
+@query_budget(0)
+def template_queries(request):
+    return TemplateResponse(request, 'courses/manage/course/list.html', {'object_list': Course.objects.all()})
+
+class QueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='instructor')
+        self.owner.user_permissions.add(Permission.objects.get(codename='view_course'))
+        self.subject = Subject.objects.create(title='Programming', slug='programming')
+        self.request = RequestFactory().get('/')
+
+    def create_course(self, slug, num_modules=1, num_contents=0):
+        course = Course.objects.create(owner=self.owner, subject=self.subject, title=slug, slug=slug, overview='')
+        for i in range(num_modules):
+            module = Module.objects.create(course=course, title=f'Module {i}')
+            for j in range(num_contents):
+                Content.objects.create(module=module, item=Text.objects.create(owner=self.owner, title=f'Text {j}', content=''))
+        return course
+
+    # 테스트 실행기는 예산을 넘으면 예외를 발생시킨다.
+    def test_exceeding_budget_raises_in_tests(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'two_queries ran 2 queries, budget is 1.'):
+            two_queries(self.request)
+
+    def test_exceeding_budget_logs_in_production(self):
+        self.create_course('python')
+        with override_settings(QUERY_BUDGET={**settings.QUERY_BUDGET, 'RAISE': False}):
+            with self.assertLogs('monitoring.budget', 'WARNING') as logs:
+                template_queries(self.request)
+        self.assertIn('First query over the budget: SELECT', logs.output[0])
+        self.assertIn('While rendering: base.html, courses/manage/course/list.html', logs.output[0])
+
+    def test_serializer_budget(self):
+        course = self.create_course('python')
+        with self.assertRaises(QueryBudgetExceeded):
+            CourseSerializer(course).data
+        CourseSerializer(Course.objects.prefetch_related('modules').get(id=course.id)).data
+
+    def test_assert_max_queries(self):
+        with self.assertMaxQueries(1):
+            User.objects.count()
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(1):
+                two_queries.__wrapped__(self.request)
+
+    # 강좌와 콘텐츠가 늘어나도 관리 페이지의 쿼리 수가 예산을 넘지 않는다.
+    def test_manage_views_stay_within_budget(self):
+        for i in range(5):
+            course = self.create_course(f'course-{i}', num_modules=2, num_contents=5)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(reverse('manage_course_list')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('module_content_list', args=[course.modules.first().id])).status_code, 200)
@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.shortcuts import redirect
+from django.views.generic.base import TemplateView
+
+from . import metrics
+
+# 엔드포인트별 측정값과 느린 요청 기록 (관리자 사이트의 admin_view로 스태프만 볼 수 있다)
+class DashboardView(TemplateView):
+    template_name = 'monitoring/dashboard.html'
+
+    def get_context_data(self, **kwargs):
+        endpoints, traces = metrics.get_store().read()
+        return super().get_context_data(**admin.site.each_context(self.request),
+                                        title='Performance',
+                                        endpoints=metrics.summarize(endpoints),
+                                        traces=traces,
+                                        buckets=metrics.get_setting('BUCKETS'),
+                                        **kwargs)
+
+    # 측정값 초기화
+    def post(self, request, *args, **kwargs):
+        metrics.get_store().reset()
+        return redirect('monitoring_dashboard')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from students.progress import flush
+
+# Redis에 모아둔 진도 이벤트를 모두 저장 (배포하거나 Redis를 재시작하기 전에 사용)
+# 프로세스 메모리에 모아둔 이벤트는 각 웹 프로세스가 저장한다.
+class Command(BaseCommand):
+    help = 'Save buffered student progress events'
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            saved = flush()
+            if not saved:
+                break
+            total += saved
+        self.stdout.write(f'Saved progress for {total} students')
@@ -1,3 +1,23 @@
 from django.db import models
+from django.contrib.auth.models import User
+
+from courses.models import Course
 
 # Create your models here.
+
+# 학생의 강좌 진도
+# 본 콘텐츠와 완료한 콘텐츠를 콘텐츠의 progress_index 위치의 비트로 저장한다.
+# 비트는 바이트마다 상위 비트부터 채운다. (Redis의 SETBIT과 같은 순서)
+# 이벤트는 students.progress 에서 모아두었다가 한번에 저장한다.
+class Progress(models.Model):
+    user = models.ForeignKey(User, related_name='progress', on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, related_name='progress', on_delete=models.CASCADE)
+    viewed = models.BinaryField(default=b'')
+    completed = models.BinaryField(default=b'')
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user','course']
+
+    def __str__(self) -> str:
+        return f'{self.user} {self.course}'
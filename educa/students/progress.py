@@ -0,0 +1,282 @@
+import atexit
+import functools
+import logging
+import operator
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from courses.models import Course, Content
+from monitoring.budget import unbudgeted
+from .models import Progress
+
+logger = logging.getLogger(__name__)
+
+# 학생 진도 기록
+# 콘텐츠를 보거나 완료한 이벤트를 (학생, 강좌)마다 비트맵으로 합쳐서 모아두고
+# FLUSH_INTERVAL이 지나거나 FLUSH_SIZE만큼 모이면 이벤트를 기록한 요청에서 한번에 Progress에 저장한다.
+# 같은 페이지를 여러번 보더라도 저장할 때는 (학생, 강좌)마다 행 하나만 갱신된다.
+# REDIS_URL이 있으면 모든 프로세스의 이벤트를 Redis의 비트맵에 모으고, 없으면 프로세스 메모리에 모은다.
+# 진도를 읽을 때는 저장된 비트맵과 아직 저장되지 않은 비트맵을 합치므로 기록한 직후에도 반영된다.
+
+KEY_PREFIX = 'progress'
+KINDS = ('viewed', 'completed')
+
+def get_setting(name):
+    return settings.PROGRESS[name]
+
+
+# 비트맵
+
+# 바이트 값마다 설정된 비트의 위치
+_BITS = [tuple(bit for bit in range(8) if value & (0x80 >> bit)) for value in range(256)]
+
+def set_bits(bitmap, indices):
+    bitmap = bytearray(bitmap)
+    for index in indices:
+        if index // 8 >= len(bitmap):
+            bitmap.extend(bytes(index // 8 + 1 - len(bitmap)))
+        bitmap[index // 8] |= 0x80 >> (index % 8)
+    return bytes(bitmap)
+
+def bit_indices(bitmap):
+    return [i * 8 + bit for i, value in enumerate(bytes(bitmap)) if value for bit in _BITS[value]]
+
+# 두 비트맵의 합집합
+def merge(a, b):
+    a, b = bytes(a), bytes(b)
+    if len(a) < len(b):
+        a, b = b, a
+    return bytes(x | y for x, y in zip(a, b)) + a[len(b):]
+
+# 비트맵에서 mask에 설정된 비트만 남긴다.
+def intersect(bitmap, mask):
+    return bytes(x & y for x, y in zip(bytes(bitmap), mask))
+
+
+# 이벤트 버퍼
+
+# 프로세스 메모리에 모아둔다 (개발 환경, 테스트)
+class MemoryBuffer:
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.flushed = time.monotonic()
+
+    def add(self, user_id, course_id, indices, completed):
+        with self.lock:
+            bitmaps = self.pending.setdefault((user_id, course_id), {kind: b'' for kind in KINDS})
+            bitmaps['viewed'] = set_bits(bitmaps['viewed'], indices)
+            if completed:
+                bitmaps['completed'] = set_bits(bitmaps['completed'], indices)
+
+    # 아직 저장되지 않은 (학생, 강좌)의 비트맵
+    def get(self, user_id, course_id):
+        with self.lock:
+            return dict(self.pending.get((user_id, course_id), {}))
+
+    # 모아둔 비트맵을 모두 가져오고 비운다. {(학생 id, 강좌 id): {'viewed': 비트맵, 'completed': 비트맵}}
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        return pending
+
+    def due(self):
+        return len(self.pending) >= get_setting('FLUSH_SIZE') or time.monotonic() - self.flushed >= get_setting('FLUSH_INTERVAL')
+
+# Redis의 비트맵(SETBIT)에 모으고 저장할 (학생, 강좌)를 집합에 추가
+# 저장할 때는 SPOP으로 FLUSH_SIZE개씩 가져오므로 여러 프로세스가 같은 이벤트를 중복해서 저장하지 않는다.
+# Redis에 연결할 수 없으면 이벤트를 버리고 요청은 계속 처리한다.
+class RedisBuffer:
+    def __init__(self, url):
+        import redis
+        self.error = redis.RedisError
+        self.client = redis.Redis.from_url(url)
+        self.flushed = time.monotonic()
+
+    def key(self, user_id, course_id, kind):
+        return f'{KEY_PREFIX}:{user_id}:{course_id}:{kind}'
+
+    def add(self, user_id, course_id, indices, completed):
+        pipeline = self.client.pipeline()
+        for kind in KINDS if completed else KINDS[:1]:
+            for index in indices:
+                pipeline.setbit(self.key(user_id, course_id, kind), index, 1)
+        pipeline.sadd(f'{KEY_PREFIX}:pending', f'{user_id}:{course_id}')
+        try:
+            pipeline.execute()
+        except self.error:
+            logger.warning('Could not record progress in Redis', exc_info=True)
+
+    def get(self, user_id, course_id):
+        try:
+            values = self.client.mget([self.key(user_id, course_id, kind) for kind in KINDS])
+        except self.error:
+            logger.warning('Could not read progress from Redis', exc_info=True)
+            return {}
+        return {kind: value for kind, value in zip(KINDS, values) if value}
+
+    def take(self):
+        try:
+            members = self.client.spop(f'{KEY_PREFIX}:pending', get_setting('FLUSH_SIZE'))
+            if not members:
+                return {}
+            pairs = [tuple(int(id) for id in member.decode().split(':')) for member in members]
+            # 읽고 삭제하는 사이에 기록된 비트를 잃지 않도록 트랜잭션으로 실행
+            pipeline = self.client.pipeline()
+            for pair in pairs:
+                for kind in KINDS:
+                    pipeline.get(self.key(*pair, kind))
+                    pipeline.delete(self.key(*pair, kind))
+            values = iter(pipeline.execute()[::2])
+        except self.error:
+            logger.warning('Could not read progress from Redis', exc_info=True)
+            return {}
+        return {pair: {kind: next(values) or b'' for kind in KINDS} for pair in pairs}
+
+    def due(self):
+        return time.monotonic() - self.flushed >= get_setting('FLUSH_INTERVAL')
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                url = get_setting('REDIS_URL')
+                _buffer = RedisBuffer(url) if url else MemoryBuffer()
+    return _buffer
+
+# 모아둔 비트맵을 Progress에 합친다.
+# 없는 행을 먼저 만들고 잠근 뒤 비트맵을 합치므로 여러 프로세스가 동시에 저장해도 비트를 잃지 않는다.
+def save(pending):
+    pairs = list(pending)
+    size = get_setting('FLUSH_SIZE')
+    for i in range(0, len(pairs), size):
+        batch = pairs[i:i + size]
+        # 이벤트를 기록한 뒤 삭제된 학생과 강좌는 건너뛴다.
+        user_ids = set(User.objects.filter(id__in={user_id for user_id, course_id in batch}).values_list('id', flat=True))
+        course_ids = set(Course.objects.filter(id__in={course_id for user_id, course_id in batch}).order_by().values_list('id', flat=True))
+        batch = {(user_id, course_id) for user_id, course_id in batch if user_id in user_ids and course_id in course_ids}
+        if not batch:
+            continue
+        with transaction.atomic():
+            Progress.objects.bulk_create([Progress(user_id=user_id, course_id=course_id) for user_id, course_id in batch], ignore_conflicts=True)
+            # 배치의 (학생, 강좌) 행만 잠근다.
+            pairs = functools.reduce(operator.or_, (Q(user_id=user_id, course_id=course_id) for user_id, course_id in batch))
+            rows = list(Progress.objects.select_for_update().filter(pairs))
+            now = timezone.now()
+            for row in rows:
+                bitmaps = pending[(row.user_id, row.course_id)]
+                row.viewed = merge(row.viewed, bitmaps['viewed'])
+                row.completed = merge(row.completed, bitmaps['completed'])
+                row.updated = now
+            Progress.objects.bulk_update(rows, ['viewed','completed','updated'])
+
+# 모아둔 이벤트를 저장하고 저장한 (학생, 강좌) 수를 반환
+# 다른 스레드가 저장하는 중이면 기다리지 않고 0을 반환한다.
+# 저장하지 못하면 이벤트를 다시 버퍼에 넣는다.
+def flush():
+    if not _flush_lock.acquire(blocking=False):
+        return 0
+    try:
+        buffer = get_buffer()
+        buffer.flushed = time.monotonic()
+        pending = buffer.take()
+        if not pending:
+            return 0
+        try:
+            with unbudgeted():
+                save(pending)
+        except Exception:
+            logger.exception('Could not save progress for %d students', len(pending))
+            for (user_id, course_id), bitmaps in pending.items():
+                buffer.add(user_id, course_id, bit_indices(bitmaps['viewed']), False)
+                buffer.add(user_id, course_id, bit_indices(bitmaps['completed']), True)
+            return 0
+        return len(pending)
+    finally:
+        _flush_lock.release()
+
+# 프로세스 메모리에 모아둔 이벤트는 프로세스가 종료될 때 저장한다.
+def _flush_at_exit():
+    if isinstance(_buffer, MemoryBuffer):
+        flush()
+
+atexit.register(_flush_at_exit)
+
+# 학생이 강좌의 콘텐츠를 보거나(completed=False) 완료한 이벤트를 기록
+# indices - 콘텐츠의 progress_index 목록, 완료한 콘텐츠는 본 콘텐츠에도 포함된다.
+def record(user_id, course_id, indices, completed=False):
+    indices = list(indices)
+    if not indices:
+        return
+    buffer = get_buffer()
+    buffer.add(user_id, course_id, indices, completed)
+    if buffer.due():
+        flush()
+
+
+# 진도 조회
+
+# 강좌의 (콘텐츠 id, 모듈 id, progress_index) 목록을 모듈, 콘텐츠 순서대로 반환
+def course_contents(course_id):
+    return list(Content.objects.filter(module__course_id=course_id).order_by('module__order','module_id','order','id').values_list('id','module_id','progress_index'))
+
+# 저장된 비트맵과 아직 저장되지 않은 비트맵을 합친 (본 콘텐츠, 완료한 콘텐츠) 비트맵
+def get_bitmaps(user_id, course_id):
+    row = Progress.objects.filter(user_id=user_id, course_id=course_id).values_list('viewed','completed').first() or (b'', b'')
+    pending = get_buffer().get(user_id, course_id)
+    return tuple(merge(bitmap, pending.get(kind, b'')) for kind, bitmap in zip(KINDS, row))
+
+def _percent(part, total):
+    return round(part * 100 / total, 1) if total else 0.0
+
+# 학생의 강좌 진도
+def student_progress(user_id, course_id):
+    contents = course_contents(course_id)
+    viewed, completed = (set(bit_indices(bitmap)) for bitmap in get_bitmaps(user_id, course_id))
+    completed_ids = [content_id for content_id, module_id, index in contents if index in completed]
+    return {
+        'course': course_id,
+        'contents': len(contents),
+        'viewed': [content_id for content_id, module_id, index in contents if index in viewed],
+        'completed': completed_ids,
+        'percent': _percent(len(completed_ids), len(contents)),
+    }
+
+# 강좌의 진도 요약
+# 이벤트 행을 세지 않고 등록된 학생마다 저장된 비트맵 하나를 읽어서 계산한다.
+# 삭제된 콘텐츠의 비트는 현재 콘텐츠의 비트맵(mask)으로 제외한다. 아직 저장되지 않은 이벤트는 포함하지 않는다.
+def course_summary(course):
+    contents = course_contents(course.id)
+    mask = set_bits(b'', [index for content_id, module_id, index in contents])
+    viewed_counts, completed_counts = Counter(), Counter()
+    completed_all = total_completed = 0
+    rows = Progress.objects.filter(course=course, user__courses_joined=course).values_list('viewed','completed')
+    for viewed, completed in rows.iterator(chunk_size=2000):
+        viewed = bit_indices(intersect(viewed, mask))
+        completed = bit_indices(intersect(completed, mask))
+        viewed_counts.update(viewed)
+        completed_counts.update(completed)
+        total_completed += len(completed)
+        if contents and len(completed) == len(contents):
+            completed_all += 1
+    return {
+        'course': course.id,
+        'students': course.num_students,
+        'contents': len(contents),
+        'average_percent': _percent(total_completed, course.num_students * len(contents)),
+        'completed_all': completed_all,
+        'items': [{'id': content_id, 'module': module_id, 'viewed': viewed_counts[index], 'completed': completed_counts[index]}
+                  for content_id, module_id, index in contents],
+    }
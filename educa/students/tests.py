@@ -1,3 +1,147 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from courses.models import Subject, Course, Module, Content, Text
+from courses import enrollment
+from . import progress
+from .models import Progress
 
 # Create your tests here.
+
+# 테스트 중에는 직접 flush()를 호출할 때만 저장한다.
+@override_settings(PROGRESS={**settings.PROGRESS, 'FLUSH_INTERVAL': 3600})
+class ProgressTest(TestCase):
+    def setUp(self):
+        progress.get_buffer().take()
+        self.owner = User.objects.create(username='instructor')
+        self.student = User.objects.create(username='student')
+        self.course = Course.objects.create(owner=self.owner, subject=Subject.objects.create(title='Programming', slug='programming'), title='Python', slug='python')
+        self.contents = []
+        for i in range(2):
+            module = Module.objects.create(course=self.course, title=f'Module {i}')
+            for j in range(10):
+                self.contents.append(Content.objects.create(module=module, item=Text.objects.create(owner=self.owner, title=f'Text {j}', content='')))
+        self.course.students.add(self.student)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_bitmaps(self):
+        bitmap = progress.set_bits(b'', [0, 9, 17])
+        self.assertEqual(bitmap, bytes([0x80, 0x40, 0x40]))
+        self.assertEqual(progress.bit_indices(progress.merge(bitmap, progress.set_bits(b'', [1]))), [0, 1, 9, 17])
+        self.assertEqual(progress.bit_indices(progress.intersect(bitmap, progress.set_bits(b'', [9]))), [9])
+
+    def test_progress_indexes_are_stable(self):
+        self.assertEqual([content.progress_index for content in self.contents], list(range(20)))
+        self.contents[0].delete()
+        module = self.contents[1].module
+        self.assertEqual(Content.objects.create(module=module, item=self.contents[1].item).progress_index, 20)
+
+    def test_events_are_coalesced(self):
+        self.client.force_login(self.student)
+        module = self.contents[0].module
+        for i in range(5):
+            self.assertEqual(self.client.get(f'/students/courses/{self.course.id}/{module.id}/').status_code, 200)
+        # 저장하기 전에도 진도에 반영된다.
+        self.assertEqual(self.client.get(f'/api/courses/{self.course.id}/progress/').json()['viewed'], [content.id for content in self.contents[:10]])
+        self.assertFalse(Progress.objects.exists())
+        other = User.objects.create(username='other')
+        progress.record(other.id, self.course.id, [0])
+        # 이벤트 수와 관계없이 학생, 강좌 확인과 트랜잭션 안의 생성, 잠금, 갱신 쿼리만 실행된다.
+        with self.assertNumQueries(7):
+            self.assertEqual(progress.flush(), 2)
+        self.assertEqual(progress.bit_indices(Progress.objects.get(user=other).viewed), [0])
+        row = Progress.objects.get(user=self.student)
+        self.assertEqual(progress.bit_indices(row.viewed), list(range(10)))
+        self.assertEqual(bytes(row.completed), b'')
+
+    def test_progress_api(self):
+        response = self.client.post(f'/api/courses/{self.course.id}/progress/', {'completed': [self.contents[0].id, self.contents[15].id, 0]}, format='json')
+        self.assertEqual(response.status_code, 202)
+        progress.flush()
+        self.client.post(f'/api/courses/{self.course.id}/progress/', {'viewed': [self.contents[1].id]}, format='json')
+        data = self.client.get(f'/api/courses/{self.course.id}/progress/').json()
+        self.assertEqual(data['viewed'], [self.contents[0].id, self.contents[1].id, self.contents[15].id])
+        self.assertEqual(data['completed'], [self.contents[0].id, self.contents[15].id])
+        self.assertEqual(data['percent'], 10.0)
+        # 등록하지 않은 강좌
+        other = Course.objects.create(owner=self.owner, subject=self.course.subject, title='Django', slug='django')
+        self.assertEqual(self.client.get(f'/api/courses/{other.id}/progress/').status_code, 403)
+
+    def test_course_summary(self):
+        other = User.objects.create(username='other')
+        self.course.students.add(other)
+        progress.record(self.student.id, self.course.id, [content.progress_index for content in self.contents], completed=True)
+        progress.record(other.id, self.course.id, [self.contents[0].progress_index, self.contents[1].progress_index])
+        progress.record(other.id, self.course.id, [self.contents[0].progress_index], completed=True)
+        progress.flush()
+        # 삭제된 콘텐츠는 요약에 포함하지 않는다.
+        self.contents[-1].delete()
+
+        self.assertEqual(self.client.get(f'/api/courses/{self.course.id}/progress/summary/').status_code, 403)
+        self.client.force_authenticate(self.owner)
+        data = self.client.get(f'/api/courses/{self.course.id}/progress/summary/').json()
+        self.assertEqual((data['students'], data['contents'], data['completed_all']), (2, 19, 1))
+        self.assertEqual(data['average_percent'], round(20 * 100 / 38, 1))
+        self.assertEqual(data['items'][0], {'id': self.contents[0].id, 'module': self.contents[0].module_id, 'viewed': 2, 'completed': 2})
+        self.assertEqual(data['items'][1], {'id': self.contents[1].id, 'module': self.contents[1].module_id, 'viewed': 2, 'completed': 1})
+
+
+class StudentCourseDetailTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrollment._local.clear()
+        self.owner = User.objects.create(username='instructor')
+        self.student = User.objects.create(username='student')
+        self.course = Course.objects.create(owner=self.owner, subject=Subject.objects.create(title='Programming', slug='programming'), title='Python', slug='python')
+        self.modules = [Module.objects.create(course=self.course, title=f'Module {i}') for i in range(3)]
+        Content.objects.create(module=self.modules[0], item=Text.objects.create(owner=self.owner, title='Text', content=''))
+        self.course.students.add(self.student)
+        self.client.force_login(self.student)
+
+    # 페이지를 볼 때 기록된 진도는 저장하지 않는다.
+    def tearDown(self):
+        progress.get_buffer().take()
+
+    def get(self, *args):
+        return self.client.get('/students/courses/' + ''.join(f'{arg}/' for arg in args))
+
+    # 강좌 개요와 등록 여부가 캐시되면 모듈 수와 관계없이 세션, 사용자, 콘텐츠 쿼리만 실행된다.
+    def test_query_count_is_constant(self):
+        self.get(self.course.id)
+        for i in range(20):
+            Module.objects.create(course=self.course, title=f'Extra {i}')
+        self.get(self.course.id)
+        with self.assertNumQueries(5):
+            response = self.get(self.course.id)
+        self.assertEqual(len(response.context['course']['modules']), 23)
+        self.assertTrue(response.context['course']['enrolled'])
+
+    def test_outline_follows_module_changes(self):
+        self.assertContains(self.get(self.course.id), 'Module 1')
+        self.modules[1].title = 'Renamed'
+        self.modules[1].save()
+        self.assertContains(self.get(self.course.id), 'Renamed')
+        self.client.force_login(self.owner)
+        self.client.post('/course/module/order/', {self.modules[2].id: 0, self.modules[0].id: 1, self.modules[1].id: 2}, content_type='application/json')
+        self.client.force_login(self.student)
+        self.assertEqual([m['id'] for m in self.get(self.course.id).context['course']['modules']], [self.modules[2].id, self.modules[0].id, self.modules[1].id])
+        self.modules[2].delete()
+        self.assertEqual(self.get(self.course.id, self.modules[2].id).status_code, 404)
+
+    # 모듈이 없는 강좌도 페이지를 보여준다.
+    def test_course_without_modules(self):
+        course = Course.objects.create(owner=self.owner, subject=self.course.subject, title='Django', slug='django')
+        course.students.add(self.student)
+        self.assertContains(self.get(course.id), 'No modules yet.')
+
+    def test_only_enrolled_students(self):
+        self.assertEqual(self.get(self.course.id, self.modules[1].id).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.students.remove(self.student)
+        self.assertEqual(self.get(self.course.id).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.get(self.course.id).status_code, 404)
@@ -1,5 +1,5 @@
+from django.conf import settings
 from django.urls import path
-from django.views.decorators.cache import cache_page
 
 from . import views
 
@@ -7,6 +7,16 @@ urlpatterns = [
     path('register/',views.StudentRegistrationsView.as_view(), name='student_registration'),
     path('enroll-course/', views.StudentEnrollCourseView.as_view(), name='student_enroll_course'),
     path('courses/', views.StudentCourseListView.as_view(), name='student_course_list'),
-    path('courses/<pk>/', cache_page(60*15)(views.StudentCourseDetailView.as_view()), name='student_course_detail'),
-    path('courses/<pk>/<module_id>/', cache_page(60*15)(views.StudentCourseDetailView.as_view()), name='student_course_detail_module'),
+]
+
+# ASGI 서버에서는 비동기 뷰를 사용
+# 페이지를 볼 때마다 학생의 진도를 기록하므로 cache_page로 캐시하지 않는다.
+if settings.ASYNC_VIEWS:
+    course_detail = views.AsyncStudentCourseDetailView.as_view()
+else:
+    course_detail = views.StudentCourseDetailView.as_view()
+
+urlpatterns += [
+    path('courses/<int:pk>/', course_detail, name='student_course_detail'),
+    path('courses/<int:pk>/<int:module_id>/', course_detail, name='student_course_detail_module'),
 ]
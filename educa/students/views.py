@@ -1,15 +1,24 @@
+from asgiref.sync import sync_to_async
 from django.urls import reverse_lazy
+from django.http import Http404
 from django.views import generic
 from django.contrib.auth.forms  import UserCreationForm
-from django.contrib.auth import authenticate, login
+from django.contrib.auth import authenticate, login, get_user
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 from .forms import CourseEnrollForm
 from courses.models import Course
+from courses.enrollment import enrolled_courses
+from courses.loaders import load_module_contents, aload_module_contents
+from courses.outline import get_student_outline, aget_student_outline
+from courses.pagination import KeysetPaginationMixin
+from monitoring.budget import QueryBudgetMixin
+from . import progress
 
 # Create your views here.
 
-class StudentRegistrationsView(generic.CreateView):
+class StudentRegistrationsView(QueryBudgetMixin, generic.CreateView):
+    query_budget = {'get': 2, 'post': 8}
     template_name = 'students/student/registrations.html'
     # 객체를 생성하는데 사용되는 폼
     form_class = UserCreationForm
@@ -23,7 +32,8 @@ class StudentRegistrationsView(generic.CreateView):
         login(self.request, user)
         return result
     
-class StudentEnrollCourseView(LoginRequiredMixin, generic.FormView):
+class StudentEnrollCourseView(QueryBudgetMixin, LoginRequiredMixin, generic.FormView):
+    query_budget = 8
     course = None
     form_class = CourseEnrollForm
 
@@ -35,29 +45,58 @@ class StudentEnrollCourseView(LoginRequiredMixin, generic.FormView):
     def get_success_url(self):
         return reverse_lazy('student_course_detail', args=[self.course.id])
     
-class StudentCourseListView(LoginRequiredMixin, generic.ListView):
+class StudentCourseListView(QueryBudgetMixin, LoginRequiredMixin, KeysetPaginationMixin, generic.ListView):
+    query_budget = 4
     model = Course
     template_name = 'students/course/list.html'
 
     def get_queryset(self):
+        # 중간 테이블과 조인하지 않고 캐시된 등록 강좌 id로 가져온다.
         qs = super().get_queryset()
-        return qs.filter(students__in = [self.request.user])
+        return qs.filter(id__in=enrolled_courses(self.request.user.id))
     
-class StudentCourseDetailView(generic.DetailView):
-    model = Course
-    template_name = 'students/course/detail.html'
+# 강좌 개요에서 module_id의 모듈을 반환, module_id가 없으면 첫번째 모듈
+# 모듈이 없는 강좌는 None을 반환하여 모듈 없이 페이지를 보여준다.
+def select_module(outline, module_id):
+    modules = outline['modules']
+    if module_id is None:
+        return modules[0] if modules else None
+    module = next((m for m in modules if m['id'] == module_id), None)
+    if module is None:
+        raise Http404('No Module matches the given query.')
+    return module
 
-    def get_queryset(self):
-        qs = super().get_queryset()
-        return qs.filter(students__in = [self.request.user])
+class StudentCourseDetailView(QueryBudgetMixin, generic.TemplateView):
+    # 강좌 개요와 등록 여부는 캐시에서 가져오므로 모듈의 콘텐츠를 가져오는 쿼리만 실행된다.
+    # 콘텐츠 아이템은 콘텐츠 종류별로 한번씩 가져온다.
+    # 캐시가 비어있으면 강좌 개요, 등록 여부와 렌더링한 HTML 저장이 더해진다.
+    query_budget = 14
+    template_name = 'students/course/detail.html'
 
-    # module_id URL 매개변수가 주어지면 코스 모듈을 context에 설정
+    # 등록한 학생만 볼 수 있다.
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course = self.get_object()
-        
-        if 'module_id' in self.kwargs:
-            context['module'] = course.modules.get(id=self.kwargs['module_id'])
-        else:
-            context['module'] = course.modules.all()[0]
-        return context
\ No newline at end of file
+        user = self.request.user
+        course = get_student_outline(user.id, self.kwargs['pk'])
+        if course is None or not course['enrolled']:
+            raise Http404('No Course matches the given query.')
+        context['course'] = course
+        context['module'] = select_module(course, self.kwargs.get('module_id'))
+        # 모듈의 콘텐츠는 저장된 HTML을 사용하여 렌더링
+        context['contents'] = load_module_contents(context['module']['id']) if context['module'] else []
+        # 모듈의 콘텐츠를 본 것으로 기록
+        progress.record(user.id, course['id'], [content['content'].progress_index for content in context['contents']])
+        return context
+
+# ASGI 서버(settings.ASYNC_VIEWS)에서 사용하는 비동기 뷰
+# request.user는 처음 사용할 때 동기 쿼리를 실행하므로 스레드에서 사용자를 가져온다.
+class AsyncStudentCourseDetailView(StudentCourseDetailView):
+    async def get(self, request, pk, module_id=None):
+        user = await sync_to_async(get_user)(request)
+        course = await aget_student_outline(user.id, pk)
+        if course is None or not course['enrolled']:
+            raise Http404('No Course matches the given query.')
+        module = select_module(course, module_id)
+        contents = await aload_module_contents(module['id']) if module else []
+        await sync_to_async(progress.record)(user.id, course['id'], [content['content'].progress_index for content in contents])
+        return self.render_to_response({'course':course, 'view':self, 'module':module, 'contents':contents})